@@ -0,0 +1,52 @@
+from timeit import timeit
+
+from zipgen import ZipBuilder, COMPRESSION_STORED
+from zipgen.constant import HEADER_LOCAL_FILE, HEADER_CENTRAL_DIRECTORY
+from zipgen.pack import CentralDirectory, LocalFile, STRUCT_CENTRAL_DIRECTORY, STRUCT_LOCAL_FILE, pack_header_with_data
+
+
+ENTRIES = 100000
+PATH = b"folder/file-000000.txt"
+
+
+def pack_tuples() -> None:
+    # Headers through NamedTuples and format strings
+    for _ in range(ENTRIES):
+        pack_header_with_data(HEADER_LOCAL_FILE, LocalFile(45, 8, 0, 0, 0, 0, 0, 0, len(PATH), 0), PATH)
+        pack_header_with_data(HEADER_CENTRAL_DIRECTORY, CentralDirectory(45, 45, 8, 0, 0, 0, 0, 0, 0, 0, len(PATH), 0, 0, 0, 0, 0, 0), PATH, b"", b"")
+
+
+def pack_structs() -> None:
+    # Headers through precompiled structs
+    for _ in range(ENTRIES):
+        STRUCT_LOCAL_FILE.pack(HEADER_LOCAL_FILE[1], 45, 8, 0, 0, 0, 0, 0, 0, len(PATH), 0) + PATH
+        STRUCT_CENTRAL_DIRECTORY.pack(HEADER_CENTRAL_DIRECTORY[1], 45, 45, 8, 0, 0, 0, 0, 0, 0, 0, len(PATH), 0, 0, 0, 0, 0, 0) + PATH + b"" + b""
+
+
+def add_buf() -> None:
+    # Whole entries without data
+    builder = ZipBuilder()
+    for i in range(ENTRIES):
+        for _ in builder.add_buf(b"%d" % i, b"", 0.0, COMPRESSION_STORED):
+            pass
+
+    builder.end()
+
+
+def add_bufs() -> None:
+    # Whole entries without data in batches
+    builder = ZipBuilder()
+    for _ in builder.add_bufs(((b"%d" % i, b"", 0.0,) for i in range(ENTRIES)), COMPRESSION_STORED):
+        pass
+
+    builder.end()
+
+
+def main() -> None:
+    for func in (pack_tuples, pack_structs, add_buf, add_bufs):
+        seconds = timeit(func, number=1)
+        print(f"{func.__name__:<16}{seconds * 1e9 / ENTRIES:>10.0f} ns/entry")
+
+
+if __name__ == "__main__":
+    main()
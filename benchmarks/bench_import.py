@@ -0,0 +1,74 @@
+from argparse import ArgumentParser
+from os import environ
+from statistics import median
+from subprocess import PIPE, run
+from sys import executable, exit
+from typing import Dict, List, Tuple
+
+
+# Modules which must only be loaded on first use
+LAZY_MODULES = (
+    "asyncio", "bz2", "lzma", "concurrent.futures", "dataclasses", "hashlib", "threading", "queue", "mmap",
+    "zipgen.checkpoint", "zipgen.dedup", "zipgen.index", "zipgen.template", "zipgen.pipeline", "zipgen.memory",
+)
+
+# Modules the command needs but the package must only load on first use
+COMMAND_MODULES = ("json", "zipgen.metrics")
+
+
+def import_time(module: str) -> Tuple[int, Dict[str, int]]:
+    """Imports module in a fresh interpreter. Returns cumulative microseconds of module and of every imported module."""
+    proc = run([executable, "-X", "importtime", "-c", f"import {module}"], stderr=PIPE, env=environ, check=True)
+    times: Dict[str, int] = {}
+
+    # Lines are "import time: self [us] | cumulative | imported package"
+    for line in proc.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times[module], times
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Measures import time of zipgen with -X importtime.")
+    parser.add_argument("--module", default="zipgen", help="Module to import.")
+    parser.add_argument("--repeat", type=int, default=10, help="Imports in fresh interpreters.")
+    parser.add_argument("--top", type=int, default=10, help="Prints slowest imported modules of the last run.")
+    parser.add_argument("--max-us", dest="max_us", type=int, default=0, help="Fails when median import time exceeds microseconds.")
+    args = parser.parse_args()
+
+    # Warm up bytecode cache
+    import_time(args.module)
+
+    totals: List[int] = []
+    times: Dict[str, int] = {}
+    for _ in range(args.repeat):
+        total, times = import_time(args.module)
+        totals.append(total)
+
+    for name, cumulative in sorted(times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<40}{cumulative:>10} us")
+
+    result = median(totals)
+    print(f"{'median ' + args.module:<40}{result:>10.0f} us")
+
+    failed = False
+    lazy = LAZY_MODULES if args.module == "zipgen.__main__" else LAZY_MODULES + COMMAND_MODULES
+    loaded = [name for name in lazy if name in times]
+    if loaded:
+        print(f"Eagerly imported: {', '.join(loaded)}.")
+        failed = True
+
+    if args.max_us and result > args.max_us:
+        print(f"Import time {result:.0f} us exceeds {args.max_us} us.")
+        failed = True
+
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+from argparse import ArgumentParser
+from asyncio import AbstractEventLoop, StreamReader, StreamWriter, gather, get_running_loop, open_connection, run, sleep, start_server
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from json import dumps
+from random import Random
+from statistics import mean
+from sys import stdout
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from zipgen import *
+
+
+UTC_TIME = 1600000000.0
+
+try:
+    from os import sysconf
+    PAGE_SIZE = sysconf("SC_PAGE_SIZE")
+except (ImportError, ValueError):  # Not available on Windows
+    PAGE_SIZE = 0
+
+
+class StreamResult(NamedTuple):
+    slow: bool
+    ttfb: float
+    seconds: float
+    size: int
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Returns nearest rank percentile of values."""
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100.0), len(values) - 1)]
+
+
+def current_rss() -> Optional[int]:
+    """Returns resident memory of this process from procfs."""
+    try:
+        with open("/proc/self/statm", "rb") as fs:
+            return int(fs.read().split()[1]) * PAGE_SIZE or None
+    except (OSError, ValueError):
+        return None
+
+
+class Monitor(object):
+    """Samples event loop lag, executor queue depth and memory of the server."""
+
+    def __init__(self, executor: ThreadPoolExecutor, interval=0.01) -> None:
+        self.executor = executor
+        self.interval = interval
+        self.lags: List[float] = []
+        self.queue: List[int] = []
+        self.rss: List[int] = []
+        self.running = True
+
+    async def run(self) -> None:
+        loop = get_running_loop()
+
+        while self.running:
+            start = loop.time()
+            await sleep(self.interval)
+            self.lags.append(max(loop.time() - start - self.interval, 0.0))
+            self.queue.append(self.executor._work_queue.qsize())
+
+            rss = current_rss()
+            if rss is not None:
+                self.rss.append(rss)
+
+
+class Server(object):
+    """Streams an archive of generated files to every connection."""
+
+    def __init__(self, files: int, size: int, compression: int, buffer_size: int, write_size: int) -> None:
+        rand = Random(0)
+        block = bytes(rand.getrandbits(8) & 0x3F for _ in range(65536))
+
+        self.data = (block * (size // len(block) + 1))[:size]
+        self.files = files
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.write_size = write_size
+
+    async def handle(self, reader: StreamReader, writer: StreamWriter) -> None:
+        try:
+            await reader.readline()
+
+            async with ZipStreamWriter(writer, self.buffer_size, write_size=self.write_size) as zsw:
+                for i in range(self.files):
+                    await zsw.add_io_async(f"{i}.bin", BytesIO(self.data), UTC_TIME, self.compression)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _client(port: int, slow: bool, rate: int, read_size: int) -> StreamResult:
+    """Downloads one archive. Slow clients read at most rate bytes per second."""
+    start = perf_counter()
+    reader, writer = await open_connection("127.0.0.1", port)
+    writer.write(b"\n")
+
+    ttfb = 0.0
+    size = 0
+
+    while True:
+        buf = await reader.read(read_size)
+        if not buf:
+            break
+
+        if size == 0:
+            ttfb = perf_counter() - start
+
+        size += len(buf)
+
+        if slow:
+            await sleep(len(buf) / rate)
+
+    writer.close()
+    return StreamResult(slow, ttfb, perf_counter() - start, size)
+
+
+def run_clients(port: int, streams: int, slow: float, rate: int, read_size: int) -> List[StreamResult]:
+    """Runs concurrent clients on own event loop. Called in a separate process to keep server loop measurement clean."""
+    async def clients() -> List[StreamResult]:
+        return await gather(*(
+            _client(port, i < int(streams * slow), rate, read_size)
+            for i in range(streams)
+        ))
+
+    return run(clients())
+
+
+def summarize(results: List[StreamResult], monitor: Monitor, base_rss: Optional[int], streams: int) -> Dict[str, Any]:
+    """Returns summary of stream results and monitor samples."""
+    def throughputs(slow: bool) -> List[float]:
+        return [result.size / result.seconds for result in results if result.slow == slow and result.seconds > 0]
+
+    ttfb = [result.ttfb for result in results]
+    fast, slow = throughputs(False), throughputs(True)
+
+    return {
+        "streams": streams,
+        "bytes": sum(result.size for result in results),
+        "ttfb_p50": percentile(ttfb, 50),
+        "ttfb_p99": percentile(ttfb, 99),
+        "fast_throughput_p50": percentile(fast, 50),
+        "fast_throughput_min": min(fast, default=0.0),
+        "slow_throughput_p50": percentile(slow, 50),
+        "loop_lag_p50": percentile(monitor.lags, 50),
+        "loop_lag_p99": percentile(monitor.lags, 99),
+        "loop_lag_max": max(monitor.lags, default=0.0),
+        "executor_queue_mean": mean(monitor.queue) if monitor.queue else 0.0,
+        "executor_queue_max": max(monitor.queue, default=0),
+        "rss_per_stream": (max(monitor.rss) - base_rss) / streams if monitor.rss and base_rss is not None else None,
+    }
+
+
+async def load_test(streams: int, slow: float, rate: int, files: int, size: int, compression: int, workers: int,
+                    buffer_size: int, write_size: int, read_size: int) -> Dict[str, Any]:
+    """Serves archives to concurrent clients and returns summary."""
+    loop: AbstractEventLoop = get_running_loop()
+    executor = ThreadPoolExecutor(workers)
+    loop.set_default_executor(executor)
+
+    handler = Server(files, size, compression, buffer_size, write_size)
+    server = await start_server(handler.handle, "127.0.0.1", 0, backlog=max(streams, 100))
+    port = server.sockets[0].getsockname()[1]
+
+    base_rss = current_rss()
+    monitor = Monitor(executor)
+    monitor_task = loop.create_task(monitor.run())
+
+    with ProcessPoolExecutor(1) as clients:
+        results = await loop.run_in_executor(clients, run_clients, port, streams, slow, rate, read_size)
+
+    monitor.running = False
+    await monitor_task
+    server.close()
+    await server.wait_closed()
+
+    return summarize(results, monitor, base_rss, streams)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Load tests async archive streams with many concurrent local clients.")
+    parser.add_argument("--streams", type=int, default=100, help="Concurrent clients.")
+    parser.add_argument("--slow", type=float, default=0.2, help="Fraction of slow clients.")
+    parser.add_argument("--rate", type=int, default=262144, help="Bytes per second read by slow clients.")
+    parser.add_argument("--files", type=int, default=8, help="Files in each archive.")
+    parser.add_argument("--size", type=int, default=262144, help="Size of each file.")
+    parser.add_argument("--comp", type=int, default=COMPRESSION_DEFLATED, help="Compression format.")
+    parser.add_argument("--workers", type=int, default=4, help="Threads of default executor.")
+    parser.add_argument("--buffer-size", dest="buffer_size", type=int, default=65536, help="Read buffer size of each stream.")
+    parser.add_argument("--write-size", dest="write_size", type=int, default=65536, help="Write size of each stream.")
+    parser.add_argument("--read-size", dest="read_size", type=int, default=65536, help="Read size of clients.")
+    parser.add_argument("--json", type=str, default=None, help="Writes summary as JSON to the file.")
+    args = parser.parse_args()
+
+    summary = run(load_test(args.streams, args.slow, args.rate, args.files, args.size, args.comp, args.workers,
+                            args.buffer_size, args.write_size, args.read_size))
+
+    for key, value in summary.items():
+        print(f"{key:<24}{value}")
+
+    stdout.flush()
+
+    if args.json is not None:
+        with open(args.json, "w") as fs:
+            fs.write(dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
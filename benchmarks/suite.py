@@ -0,0 +1,323 @@
+from argparse import ArgumentParser
+from asyncio import run
+from io import BytesIO
+from json import dumps, loads
+from os import makedirs
+from os.path import join
+from platform import platform, python_version
+from random import Random
+from statistics import median
+from sys import exit, stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from zipgen import *
+
+
+# Benchmark factory does setup and returns the timed callable.
+BenchmarkFactory = Callable[[], Callable[[], None]]
+
+BENCHMARKS: Dict[str, BenchmarkFactory] = {}
+
+COMPRESSIONS = (
+    ("stored", COMPRESSION_STORED,),
+    ("deflated", COMPRESSION_DEFLATED,),
+    ("bzip2", COMPRESSION_BZIP2,),
+    ("lzma", COMPRESSION_LZMA,),
+)
+
+TINY_COUNT = 2000
+TINY_SIZE = 100
+LARGE_SIZE = 1048576
+WALK_COUNT = 200
+END_COUNTS = (1000, 10000, 100000)
+UTC_TIME = 1600000000.0
+
+
+def _data(size: int) -> bytes:
+    """Returns deterministic data which is compressible but not trivially."""
+    rand = Random(0)
+    block = bytes(rand.getrandbits(8) & 0x3F for _ in range(min(size, 65536)))
+    return (block * (size // len(block) + 1))[:size]
+
+
+TINY = _data(TINY_SIZE)
+LARGE = _data(LARGE_SIZE)
+
+
+class NullWriter(object):
+    """Stream which discards written data."""
+
+    def write(self, buf: bytes) -> int:
+        return len(buf)
+
+    def writelines(self, bufs: List[bytes]) -> None:
+        pass
+
+    async def drain(self) -> None:
+        pass
+
+
+def benchmark(name: str) -> Callable[[BenchmarkFactory], BenchmarkFactory]:
+    """Registers benchmark factory."""
+    def register(factory: BenchmarkFactory) -> BenchmarkFactory:
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+def _consume(gen: Any) -> None:
+    for _ in gen:
+        pass
+
+
+async def _consume_async(gen: Any) -> None:
+    async for _ in gen:
+        pass
+
+
+def _register_compressions() -> None:
+    """Registers benchmarks of each compression method."""
+    for label, compression in COMPRESSIONS:
+        def add_buf_tiny(compression=compression) -> Callable[[], None]:
+            def run_bench() -> None:
+                builder = ZipBuilder()
+                for i in range(TINY_COUNT):
+                    _consume(builder.add_buf(f"{i}.txt", TINY, UTC_TIME, compression))
+                builder.end()
+
+            return run_bench
+
+        def add_buf_large(compression=compression) -> Callable[[], None]:
+            def run_bench() -> None:
+                builder = ZipBuilder()
+                _consume(builder.add_buf("large.bin", LARGE, UTC_TIME, compression))
+                builder.end()
+
+            return run_bench
+
+        def add_io_large(compression=compression) -> Callable[[], None]:
+            def run_bench() -> None:
+                builder = ZipBuilder()
+                _consume(builder.add_io("large.bin", BytesIO(LARGE), UTC_TIME, compression))
+                builder.end()
+
+            return run_bench
+
+        def add_io_large_async(compression=compression) -> Callable[[], None]:
+            async def bench() -> None:
+                builder = ZipBuilder()
+                await _consume_async(builder.add_io_async("large.bin", BytesIO(LARGE), UTC_TIME, compression))
+                builder.end()
+
+            return lambda: run(bench())
+
+        benchmark(f"add_buf.tiny.{label}")(add_buf_tiny)
+        benchmark(f"add_buf.large.{label}")(add_buf_large)
+        benchmark(f"add_io.large.{label}")(add_io_large)
+        benchmark(f"add_io_async.large.{label}")(add_io_large_async)
+
+
+_register_compressions()
+
+
+@benchmark("add_bufs.tiny.stored")
+def add_bufs_tiny() -> Callable[[], None]:
+    def run_bench() -> None:
+        builder = ZipBuilder()
+        _consume(builder.add_bufs(((f"{i}.txt", TINY, UTC_TIME,) for i in range(TINY_COUNT)), COMPRESSION_STORED))
+        builder.end()
+
+    return run_bench
+
+
+@benchmark("add_gen.large.stored")
+def add_gen_large() -> Callable[[], None]:
+    def gen():
+        for i in range(0, LARGE_SIZE, 65536):
+            yield LARGE[i:i+65536]
+
+    def run_bench() -> None:
+        builder = ZipBuilder()
+        _consume(builder.add_gen("large.bin", gen(), UTC_TIME))
+        builder.end()
+
+    return run_bench
+
+
+@benchmark("add_gen_async.large.stored")
+def add_gen_large_async() -> Callable[[], None]:
+    async def gen():
+        for i in range(0, LARGE_SIZE, 65536):
+            yield LARGE[i:i+65536]
+
+    async def bench() -> None:
+        builder = ZipBuilder()
+        await _consume_async(builder.add_gen_async("large.bin", gen(), UTC_TIME))
+        builder.end()
+
+    return lambda: run(bench())
+
+
+@benchmark("stream.tiny.stored")
+def stream_tiny() -> Callable[[], None]:
+    def run_bench() -> None:
+        with ZipStreamWriter(NullWriter()) as stream:
+            for i in range(TINY_COUNT):
+                stream.add_buf(f"{i}.txt", TINY, UTC_TIME)
+
+    return run_bench
+
+
+@benchmark("stream_async.tiny.stored")
+def stream_tiny_async() -> Callable[[], None]:
+    async def bench() -> None:
+        async with ZipStreamWriter(NullWriter()) as stream:
+            for i in range(TINY_COUNT):
+                await stream.add_buf_async(f"{i}.txt", TINY, UTC_TIME)
+
+    return lambda: run(bench())
+
+
+def _walk_tree(path: str) -> None:
+    """Creates folders of tiny files."""
+    for i in range(WALK_COUNT):
+        folder = join(path, str(i % 10))
+        makedirs(folder, exist_ok=True)
+
+        with open(join(folder, f"{i}.txt"), "wb") as fs:
+            fs.write(TINY)
+
+
+@benchmark("walk.tiny.stored")
+def walk_tiny() -> Callable[[], None]:
+    # Directory is removed when the callable is released
+    tmp = TemporaryDirectory()
+    _walk_tree(tmp.name)
+
+    def run_bench() -> None:
+        builder = ZipBuilder()
+        _consume(builder.walk(tmp.name, "/", UTC_TIME))
+        builder.end()
+
+    return run_bench
+
+
+@benchmark("walk_async.tiny.stored")
+def walk_tiny_async() -> Callable[[], None]:
+    tmp = TemporaryDirectory()
+    _walk_tree(tmp.name)
+
+    async def bench() -> None:
+        builder = ZipBuilder()
+        await _consume_async(builder.walk_async(tmp.name, "/", UTC_TIME))
+        builder.end()
+
+    return lambda: run(bench())
+
+
+def _register_end() -> None:
+    """Registers benchmarks of end with growing count of entries."""
+    for count in END_COUNTS:
+        def end(count=count) -> Callable[[], None]:
+            builder = ZipBuilder()
+            _consume(builder.add_bufs(((f"{i}", b"", UTC_TIME,) for i in range(count)), COMPRESSION_STORED))
+
+            def run_bench() -> None:
+                builder.end()
+
+            return run_bench
+
+        benchmark(f"end.{count}")(end)
+
+
+_register_end()
+
+
+def run_benchmark(factory: BenchmarkFactory, repeat: int) -> Dict[str, Any]:
+    """Returns min and median seconds of repeated runs. Setup is not timed."""
+    times: List[float] = []
+
+    for _ in range(repeat):
+        func = factory()
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+
+    return {
+        "min": min(times),
+        "median": median(times),
+        "repeat": repeat,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[Tuple[str, float]]:
+    """Returns benchmarks and ratios which are slower than baseline by more than threshold."""
+    regressions: List[Tuple[str, float]] = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["min"] / baseline[name]["min"]
+        if ratio > 1.0 + threshold:
+            regressions.append((name, ratio,))
+
+    return regressions
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Runs zipgen micro-benchmarks.")
+    parser.add_argument("-k", dest="filter", default="", help="Runs only benchmarks with name containing text.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each benchmark.")
+    parser.add_argument("--output", default=None, help="Writes results as JSON to path.")
+    parser.add_argument("--baseline", default=None, help="Compares results to JSON of earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown compared to baseline. 0.1 is 10%%.")
+    parser.add_argument("--list", action="store_true", help="Lists benchmarks.")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+
+    if args.list:
+        print("\n".join(names))
+        return
+
+    baseline: Optional[Dict[str, Dict[str, Any]]] = None
+    if args.baseline is not None:
+        with open(args.baseline) as fs:
+            baseline = loads(fs.read())["results"]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        results[name] = run_benchmark(BENCHMARKS[name], args.repeat)
+
+        line = f"{name:<32}{results[name]['min'] * 1000:>12.3f} ms"
+        if baseline is not None and name in baseline:
+            line += f"{results[name]['min'] / baseline[name]['min']:>10.2f}x"
+
+        print(line)
+        stdout.flush()
+
+    if args.output is not None:
+        with open(args.output, "w") as fs:
+            fs.write(dumps({
+                "version": 1,
+                "python": python_version(),
+                "platform": platform(),
+                "results": results,
+            }, indent=2))
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+
+        for name, ratio in regressions:
+            print(f"Regression: {name} is {ratio:.2f}x baseline.")
+
+        if regressions:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ import zipgen
 async def create_async() -> None:
     # Async methods end with suffix _async
     # ZipStreamWriter supports regular Streams and asyncio.StreamWriter
-    # If stream provides awaitable .drain() method such as asyncio.StreamWriter, it will be awaited after each write.
+    # If stream provides awaitable .drain() method such as asyncio.StreamWriter, it will be awaited after each flush.
+    # Writes are queued until write_size bytes are pending, then written at once.
 
     # Do not call ZipStreamWriter.end() if with clause is used
     with (
@@ -4,9 +4,12 @@ from unittest import IsolatedAsyncioTestCase, main
 from io import BytesIO
 from sys import argv
 from os import listdir
-from os.path import dirname
+from os.path import dirname, join
+from tempfile import TemporaryDirectory
+from threading import get_ident
 from zipfile import ZipFile
-from zipgen import ZipBuilder
+from zipgen import ZipBuilder, COMPRESSION_DEFLATED
+import zipgen.build
 
 
 class TestGenAsync(IsolatedAsyncioTestCase):
@@ -93,6 +96,72 @@ class TestGenAsync(IsolatedAsyncioTestCase):
             for name in file.namelist():
                 self.assertEqual(file.read(name), b"".join(data))
 
+    async def test_add_io_pipelined_async(self) -> None:
+        """Test pipelined io asynchronously."""
+        io = BytesIO()
+        builder = ZipBuilder(buffer_size=4096)
+        content = b"This is read in pipeline. " * 65536
+
+        async for buf in builder.add_io_async("io.txt", BytesIO(content), compression=COMPRESSION_DEFLATED, pipelined=True):
+            io.write(buf)
+
+        # End
+        io.write(builder.end())
+
+        # Check existence
+        with ZipFile(io, "r") as file:
+            self.assertEqual(file.read("io.txt"), content)
+
+    async def test_add_io_interrupted_async(self) -> None:
+        """Test closing or throwing into async entry mid data releases BytesIO's buffer and keeps the error."""
+        content = b"This is interrupted. " * 65536
+
+        gen = ZipBuilder(buffer_size=4096).add_io_async("io.txt", BytesIO(content), compression=COMPRESSION_DEFLATED)
+        await gen.__anext__()
+        await gen.__anext__()
+        await gen.aclose()
+
+        gen = ZipBuilder(buffer_size=4096).add_io_async("io.txt", BytesIO(content), compression=COMPRESSION_DEFLATED)
+        await gen.__anext__()
+        await gen.__anext__()
+        with self.assertRaises(ConnectionResetError):
+            await gen.athrow(ConnectionResetError())
+
+    async def test_walk_prefetch_async(self) -> None:
+        """Test prefetched files are compressed off the event loop with same output as sync walk."""
+        compress_buf = zipgen.build.compress_buf
+        threads = set()
+
+        def compress_buf_thread(*args):
+            threads.add(get_ident())
+            return compress_buf(*args)
+
+        with TemporaryDirectory() as path:
+            for i in range(10):
+                with open(join(path, f"{i}.txt"), "wb") as fs:
+                    fs.write(b"This is prefetched. %d " % i * 1024)
+
+            io1 = BytesIO()
+            io2 = BytesIO()
+            builder1 = ZipBuilder()
+            builder2 = ZipBuilder()
+
+            for buf in builder1.walk(path, "/", 1600000000.0, COMPRESSION_DEFLATED, no_compress=None, prefetch=4):
+                io1.write(buf)
+            io1.write(builder1.end())
+
+            zipgen.build.compress_buf = compress_buf_thread
+            try:
+                async for buf in builder2.walk_async(path, "/", 1600000000.0, COMPRESSION_DEFLATED, no_compress=None, prefetch=4):
+                    io2.write(buf)
+            finally:
+                zipgen.build.compress_buf = compress_buf
+            io2.write(builder2.end())
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+            self.assertTrue(threads)
+            self.assertNotIn(get_ident(), threads)
+
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,23 @@
 from typing import Generator
 from unittest import TestCase, main
 from io import BytesIO
-from sys import argv
-from os import listdir
-from os.path import dirname
+from sys import argv, executable
+from subprocess import check_output
+from os import environ, listdir, makedirs, link
+from os.path import abspath, dirname, join
 from zipfile import ZipFile
-from zipgen import ZipBuilder, COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA
+from json import loads
+from hashlib import sha256, blake2b
+from tempfile import TemporaryFile, TemporaryDirectory
+from zipgen.compress import CompressorContext, CompressorStored
+from zipgen.dedup import DedupCache
+from zipgen.pipeline import compress_io_pipelined
+from zipgen.index import INDEX_JSON, INDEX_BINARY, get_index, unpack_index
+from zipgen.template import relocate_central_directory
+from zipgen.shard import SHARD_GREEDY, SHARD_HASH, partition_entries, build_shards
+from zipgen.positional import write_stored
+from zipgen.memory import MemoryWriter, estimate_size, build_bufs
+from zipgen import ZipBuilder, walk_entries, read_paths, list_entries, MMAP_MIN_SIZE, PREFETCH_MAX_SIZE, COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA
 
 
 class TestGenSync(TestCase):
@@ -155,6 +167,517 @@ class TestGenSync(TestCase):
             for name in file.namelist():
                 self.assertEqual(file.read(name), b"".join(data))
 
+    def test_add_bufs(self) -> None:
+        """Test batched buffers produce same output as add_buf."""
+        items = [
+            (f"bufs/buf{i}.txt", f"hello from buf{i}.txt".encode() * (i % 7), 1600000000.0 + i)
+            for i in range(1000)
+        ]
+
+        for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA):
+            builder1 = ZipBuilder()
+            builder2 = ZipBuilder()
+            io1 = BytesIO()
+            io2 = BytesIO()
+
+            for path, data, utc_time in items:
+                for buf in builder1.add_buf(path, data, utc_time, compression):
+                    io1.write(buf)
+
+            for buf in builder2.add_bufs(items, compression):
+                io2.write(buf)
+
+            io1.write(builder1.end())
+            io2.write(builder2.end())
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+
+            # Check existence
+            with ZipFile(io2, "r") as file:
+                self.assertEqual(len(file.namelist()), len(items))
+
+                for path, data, _ in items:
+                    self.assertEqual(file.read(path), data)
+
+    def test_add_bufs_duplicate(self) -> None:
+        """Test data of items before duplicate path is yielded so archive stays valid."""
+        io = BytesIO()
+        builder = ZipBuilder()
+
+        with self.assertRaises(ValueError):
+            for buf in builder.add_bufs([("a", b"a" * 10, None), ("b", b"b" * 10, None), ("a", b"c" * 10, None)]):
+                io.write(buf)
+
+        for buf in builder.add_bufs([("c", b"c" * 10, None)]):
+            io.write(buf)
+        io.write(builder.end())
+
+        with ZipFile(io, "r") as file:
+            self.assertIsNone(file.testzip())
+            self.assertEqual(file.namelist(), ["a", "b", "c"])
+            self.assertEqual(file.read("a"), b"a" * 10)
+
+    def test_write_to(self) -> None:
+        """Test push based methods produce same output as generators."""
+        content = b"This is written to sink. " * 4096
+        utc_time = 1600000000.0
+
+        def gen_data() -> Generator[bytes, None, None]:
+            for _ in range(16):
+                yield content[:1024]
+
+        for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA):
+            builder1 = ZipBuilder(buffer_size=4096)
+            builder2 = ZipBuilder(buffer_size=4096)
+            io1 = BytesIO()
+            io2 = BytesIO()
+
+            for buf in builder1.add_buf("buf.txt", content, utc_time, compression=compression):
+                io1.write(buf)
+            for buf in builder1.add_io("io.txt", BytesIO(content), utc_time, compression=compression):
+                io1.write(buf)
+            for buf in builder1.add_gen("gen.txt", gen_data(), utc_time, compression=compression):
+                io1.write(buf)
+
+            builder2.write_buf_to(io2.write, "buf.txt", content, utc_time, compression=compression)
+            builder2.write_io_to(io2.write, "io.txt", BytesIO(content), utc_time, compression=compression)
+            builder2.write_gen_to(io2.write, "gen.txt", gen_data(), utc_time, compression=compression)
+
+            io1.write(builder1.end())
+            io2.write(builder2.end())
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+
+    def test_add_io_views(self) -> None:
+        """Test BytesIO and mapped file data is read from its position."""
+        content = bytes(range(256)) * (MMAP_MIN_SIZE // 128)
+
+        for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED):
+            io = BytesIO()
+            builder = ZipBuilder()
+
+            with TemporaryFile() as tmp:
+                tmp.write(content)
+                tmp.seek(100)
+
+                for buf in builder.add_io("mapped.bin", open(tmp.fileno(), "rb", closefd=False), compression=compression, use_mmap=True):
+                    io.write(buf)
+
+                tmp.seek(300)
+                builder.write_io_to(io.write, "read.bin", open(tmp.fileno(), "rb", closefd=False), compression=compression)
+
+            bytes_io = BytesIO(content)
+            bytes_io.seek(200)
+
+            builder.write_io_to(io.write, "bytesio.bin", bytes_io, compression=compression)
+            self.assertTrue(bytes_io.closed)
+
+            io.write(builder.end())
+
+            with ZipFile(io, "r") as file:
+                self.assertEqual(file.read("mapped.bin"), content[100:])
+                self.assertEqual(file.read("read.bin"), content[300:])
+                self.assertEqual(file.read("bytesio.bin"), content[200:])
+
+    def test_add_io_interrupted(self) -> None:
+        """Test closing or throwing into entry mid data releases BytesIO's buffer and keeps the error."""
+        content = b"This is interrupted. " * 65536
+
+        for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED):
+            gen = ZipBuilder(buffer_size=4096).add_io("io.txt", BytesIO(content), compression=compression)
+            next(gen)
+            next(gen)
+            gen.close()
+
+            gen = ZipBuilder(buffer_size=4096).add_io("io.txt", BytesIO(content), compression=compression)
+            next(gen)
+            next(gen)
+            with self.assertRaises(OSError):
+                gen.throw(OSError("sink failed"))
+
+            def sink(buf) -> None:
+                raise OSError("sink failed")
+
+            with self.assertRaises(OSError):
+                ZipBuilder(buffer_size=4096).write_io_to(sink, "io.txt", BytesIO(content), compression=compression)
+
+    def test_add_io_pipelined(self) -> None:
+        """Test pipelined io produces same output as sequential io."""
+        content = b"This is read in pipeline. " * 65536
+
+        for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA):
+            builder1 = ZipBuilder(buffer_size=4096)
+            builder2 = ZipBuilder(buffer_size=4096)
+            io1 = BytesIO()
+            io2 = BytesIO()
+
+            for buf in builder1.add_io("io.txt", BytesIO(content), utc_time=1600000000.0, compression=compression):
+                io1.write(buf)
+
+            for buf in builder2.add_io("io.txt", BytesIO(content), utc_time=1600000000.0, compression=compression, pipelined=True):
+                io2.write(buf)
+
+            builder1.write_io_to(io1.write, "io_to.txt", BytesIO(content), utc_time=1600000000.0, compression=compression)
+            builder2.write_io_to(io2.write, "io_to.txt", BytesIO(content), utc_time=1600000000.0, compression=compression, pipelined=True)
+
+            io1.write(builder1.end())
+            io2.write(builder2.end())
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+
+    def test_pipelined_digest_error(self) -> None:
+        """Test error in CRC32 and digest thread is raised instead of blocking."""
+        class BrokenContext(CompressorContext):
+            def update_hashes(self, rbuf: bytes) -> None:
+                raise RuntimeError("digest failed")
+
+        context = BrokenContext(("sha256",))
+
+        with self.assertRaises(RuntimeError):
+            for _ in compress_io_pipelined(CompressorStored(), context, BytesIO(b"hello" * 4096), 4096):
+                pass
+
+    def test_walk_prefetch(self) -> None:
+        """Test prefetched walk produces same output as walk."""
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, "empty"))
+            makedirs(join(tmp, "files"))
+
+            for i in range(50):
+                with open(join(tmp, "files", f"file{i}.txt"), "wb") as f:
+                    f.write(f"hello from file{i}.txt ".encode() * i * 10)
+
+            with open(join(tmp, "files", "large.bin"), "wb") as f:
+                f.write(b"large" * PREFETCH_MAX_SIZE)
+
+            for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED):
+                builder1 = ZipBuilder()
+                builder2 = ZipBuilder()
+                io1 = BytesIO()
+                io2 = BytesIO()
+
+                for buf in builder1.walk(tmp, "/", 1600000000.0, compression=compression):
+                    io1.write(buf)
+
+                for buf in builder2.walk(tmp, "/", 1600000000.0, compression=compression, prefetch=4):
+                    io2.write(buf)
+
+                io1.write(builder1.end())
+                io2.write(builder2.end())
+
+                self.assertEqual(io1.getvalue(), io2.getvalue())
+
+    def test_walk_dedup(self) -> None:
+        """Test deduplicated walk produces same output as walk."""
+        with TemporaryDirectory() as tmp:
+            content = b"This is duplicated content. " * 1024
+
+            for i in range(10):
+                with open(join(tmp, f"copy{i}.txt"), "wb") as f:
+                    f.write(content)
+
+            with open(join(tmp, "unique.txt"), "wb") as f:
+                f.write(b"This is unique content.")
+
+            link(join(tmp, "unique.txt"), join(tmp, "link.txt"))
+
+            builder1 = ZipBuilder()
+            builder2 = ZipBuilder()
+            io1 = BytesIO()
+            io2 = BytesIO()
+            dedup = DedupCache()
+
+            for buf in builder1.walk(tmp, "/", 1600000000.0, compression=COMPRESSION_DEFLATED, no_compress=None):
+                io1.write(buf)
+
+            for buf in builder2.walk(tmp, "/", 1600000000.0, compression=COMPRESSION_DEFLATED, no_compress=None, dedup=dedup):
+                io2.write(buf)
+
+            io1.write(builder1.end())
+            io2.write(builder2.end())
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+            self.assertEqual(dedup.inode_hits, 1)
+            self.assertEqual(dedup.content_hits, 9)
+            self.assertEqual(dedup.saved_compress, len(content) * 9 + len(b"This is unique content."))
+
+    def test_dedup_memory(self) -> None:
+        """Test hard linked files are not stored beyond memory."""
+        with TemporaryDirectory() as tmp:
+            for i in range(20):
+                with open(join(tmp, f"file{i}.txt"), "wb") as f:
+                    f.write(b"This is linked content %d. " % i * 64)
+
+                link(join(tmp, f"file{i}.txt"), join(tmp, f"link{i}.txt"))
+
+            dedup = DedupCache(memory=1024)
+            builder = ZipBuilder()
+
+            for _ in builder.walk(tmp, "/", 1600000000.0, compression=COMPRESSION_DEFLATED, no_compress=None, dedup=dedup):
+                pass
+
+            self.assertLessEqual(dedup.used, 1024)
+            self.assertLess(len(dedup.inodes), 20)
+
+    def test_manifest(self) -> None:
+        """Test manifest digests of files."""
+        io = BytesIO()
+        builder = ZipBuilder(buffer_size=4096)
+        content = b"This is hashed. " * 4096
+        builder.set_digests("sha256", "blake2b")
+
+        for buf in builder.add_io("io.txt", BytesIO(content), compression=COMPRESSION_DEFLATED):
+            io.write(buf)
+
+        for buf in builder.add_io("pipelined.txt", BytesIO(content), compression=COMPRESSION_DEFLATED, pipelined=True):
+            io.write(buf)
+
+        for buf in builder.add_bufs([("bufs.txt", content, None)]):
+            io.write(buf)
+
+        for buf in builder.add_manifest():
+            io.write(buf)
+
+        io.write(builder.end())
+
+        with ZipFile(io, "r") as file:
+            lines = [loads(line) for line in file.read("MANIFEST.jsonl").splitlines()]
+
+            self.assertEqual([line["path"] for line in lines], ["io.txt", "pipelined.txt", "bufs.txt"])
+
+            for line in lines:
+                self.assertEqual(line["size"], len(content))
+                self.assertEqual(line["sha256"], sha256(content).hexdigest())
+                self.assertEqual(line["blake2b"], blake2b(content).hexdigest())
+
+    def test_index(self) -> None:
+        """Test index offsets point to file data."""
+        io = BytesIO()
+        builder = ZipBuilder()
+        contents = [f"This is indexed file{i}. ".encode() * i for i in range(10)]
+
+        io.write(builder.add_folder("folder"))
+
+        for i, content in enumerate(contents):
+            for buf in builder.add_buf(f"folder/file{i}.txt", content):
+                io.write(buf)
+
+        indexes = [builder.get_index(INDEX_JSON), builder.get_index(INDEX_BINARY)]
+
+        for buf in builder.add_index():
+            io.write(buf)
+
+        io.write(builder.end())
+        archive = io.getvalue()
+
+        with ZipFile(io, "r") as file:
+            indexes.append(file.read("INDEX.json"))
+
+        for index in indexes:
+            entries = unpack_index(index)
+            self.assertEqual(len(entries), len(contents) + 1)
+            self.assertEqual(entries[0].path, b"folder/")
+
+            for entry, content in zip(entries[1:], contents):
+                data = archive[entry.data_offset:entry.data_offset+entry.compressed_size]
+                self.assertEqual(data, content)
+                self.assertEqual(archive[entry.header_offset:entry.header_offset+4], b"PK\x03\x04")
+
+    def test_template(self) -> None:
+        """Test template files are relocated to produce same output as building directly."""
+        utc_time = 1600000000.0
+        static = [(f"static/file{i}.txt", f"This is static file{i}. ".encode() * i * 16) for i in range(10)]
+
+        def add_static(builder: ZipBuilder) -> Generator[bytes, None, None]:
+            yield builder.add_folder("static", utc_time)
+
+            for path, content in static:
+                for buf in builder.add_buf(path, content, utc_time, COMPRESSION_DEFLATED):
+                    yield buf
+
+        # Template
+        builder = ZipBuilder()
+        template = builder.get_template(b"".join(add_static(builder)))
+
+        for before in (b"", b"This is added before template. " * 100):
+            builder1 = ZipBuilder()
+            builder2 = ZipBuilder()
+            io1 = BytesIO()
+            io2 = BytesIO()
+
+            for builder, io in ((builder1, io1,), (builder2, io2,),):
+                if before:
+                    for buf in builder.add_buf("before.txt", before, utc_time):
+                        io.write(buf)
+
+                if builder is builder1:
+                    for buf in add_static(builder):
+                        io.write(buf)
+                else:
+                    io.write(builder.add_template(template))
+
+                for buf in builder.add_buf("license.json", b'{"user": 1}', utc_time):
+                    io.write(buf)
+
+                io.write(builder.end())
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+
+            with ZipFile(io2, "r") as file:
+                for path, content in static:
+                    self.assertEqual(file.read(path), content)
+
+        # Path already added
+        builder = ZipBuilder()
+        builder.add_template(template)
+
+        with self.assertRaises(ValueError):
+            builder.add_template(template)
+
+    def test_relocate_zip64(self) -> None:
+        """Test relocating headers past 4GB adds zip64 extended information."""
+        builder = ZipBuilder()
+
+        for buf in builder.add_buf("file.txt", b"hello", comment="comment"):
+            pass
+
+        header = builder.headers[b"file.txt"]
+        relocated = relocate_central_directory(header, 0x100000000)
+        entry = get_index([relocated])[0]
+
+        self.assertEqual(entry.path, b"file.txt")
+        self.assertEqual(entry.header_offset, 0x100000000)
+        self.assertEqual(entry.uncompressed_size, 5)
+        self.assertTrue(relocated.endswith(b"comment"))
+        self.assertEqual(get_index([relocate_central_directory(relocated, 16)])[0].header_offset, 0x100000010)
+
+    def test_shards(self) -> None:
+        """Test files are partitioned into shard archives."""
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, "src", "empty"))
+
+            for i in range(40):
+                with open(join(tmp, "src", f"file{i}.txt"), "wb") as f:
+                    f.write(f"hello from file{i}.txt ".encode() * (i * 37 % 101))
+
+            entries = list(walk_entries(join(tmp, "src"), "/"))
+
+            # Greedy is balanced and hash is stable
+            sizes = [sum(entry.stat.st_size for entry in shard) for shard in partition_entries(entries, 4, SHARD_GREEDY)]
+            self.assertLess(max(sizes) - min(sizes), max(entry.stat.st_size for entry in entries))
+            self.assertEqual(
+                [{entry.dest for entry in shard} for shard in partition_entries(entries, 4, SHARD_HASH)],
+                [{entry.dest for entry in shard} for shard in partition_entries(entries[::-1], 4, SHARD_HASH)],
+            )
+
+            for method in (SHARD_GREEDY, SHARD_HASH):
+                manifest = build_shards(join(tmp, "src"), "/", join(tmp, "shard{shard}.zip"), 3, method, manifest=join(tmp, "manifest.json"))
+
+                with open(join(tmp, "manifest.json")) as f:
+                    self.assertEqual(loads(f.read()), manifest)
+
+                self.assertEqual(len(manifest["paths"]), 41)
+
+                for path, shard in manifest["paths"].items():
+                    with ZipFile(manifest["shards"][shard]["path"], "r") as file:
+                        if path.endswith("/"):
+                            self.assertIn(path, file.namelist())
+                        else:
+                            with open(join(tmp, "src", path), "rb") as f:
+                                self.assertEqual(file.read(path), f.read())
+
+    def test_write_stored(self) -> None:
+        """Test positional writer produces same archive as walk."""
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, "src", "empty"))
+            makedirs(join(tmp, "src", "sub"))
+
+            for i in range(20):
+                with open(join(tmp, "src", "sub" if i % 3 else "", f"file{i}.txt"), "wb") as f:
+                    f.write(f"hello from file{i}.txt ".encode() * (i * 997 % 4099))
+
+            builder = ZipBuilder()
+            expected = b"".join(builder.walk(join(tmp, "src"), "/", 1600000000.0)) + builder.end()
+
+            size = write_stored(join(tmp, "out.zip"), join(tmp, "src"), "/", 1600000000.0, workers=4, buffer_size=4096)
+
+            with open(join(tmp, "out.zip"), "rb") as f:
+                self.assertEqual(f.read(), expected)
+
+            self.assertEqual(size, len(expected))
+
+    def test_build_bufs(self) -> None:
+        """Test archive built into single buffer."""
+        items = [(f"buf{i}.txt", f"hello from buf{i}.txt ".encode() * i, 1600000000.0) for i in range(100)]
+
+        for compression in (COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA):
+            builder = ZipBuilder()
+            expected = b"".join(buf for path, data, utc_time in items for buf in builder.add_buf(path, data, utc_time, compression)) + builder.end()
+
+            for use_mmap in (False, True):
+                view = build_bufs(items, compression, use_mmap=use_mmap)
+                self.assertIsInstance(view, memoryview)
+                self.assertEqual(view, expected)
+                self.assertLessEqual(len(view), estimate_size(((path, len(data),) for path, data, _ in items), compression))
+
+            if compression == COMPRESSION_STORED:
+                self.assertEqual(len(expected), estimate_size(((path, len(data),) for path, data, _ in items)))
+
+        # Growing
+        for use_mmap in (False, True):
+            writer = MemoryWriter(4, use_mmap)
+            writer.writelines([b"hello", b" ", b"world" * 100])
+            self.assertEqual(writer.getbuffer(), b"hello world" + b"world" * 99)
+
+    def test_list_entries(self) -> None:
+        """Test listed paths are read lazily and added like walked files."""
+        self.assertEqual(list(read_paths(BytesIO(b"a.txt\r\nb c.txt\n\nd"), buffer_size=3)), ["a.txt", "b c.txt", "d"])
+        self.assertEqual(list(read_paths(BytesIO(b"a\nb\0c\0"), b"\0", 2)), ["a\nb", "c"])
+
+        with TemporaryDirectory() as path:
+            makedirs(join(path, "folder"))
+            with open(join(path, "folder", "file.txt"), "wb") as fs:
+                fs.write(b"hello list " * 100)
+            with open(join(path, "image.jpg"), "wb") as fs:
+                fs.write(b"jpg" * 100)
+
+            errors = []
+            paths = [join(path, "folder"), join(path, "folder", "file.txt"), join(path, "image.jpg"), join(path, "missing")]
+            entries = list(list_entries(paths, "list", COMPRESSION_DEFLATED, on_error=lambda path, ex: errors.append(path)))
+
+            self.assertEqual(errors, [join(path, "missing")])
+            self.assertEqual([(entry.folder, entry.compression) for entry in entries], [(True, COMPRESSION_STORED), (False, COMPRESSION_DEFLATED), (False, COMPRESSION_STORED)])
+            self.assertTrue(all(entry.dest.startswith("list/") and ".." not in entry.dest for entry in entries))
+
+            with self.assertRaises(OSError):
+                list(list_entries(paths, "list"))
+
+            io = BytesIO()
+            builder = ZipBuilder()
+            for buf in builder.add_entries(entries, 1600000000.0):
+                io.write(buf)
+            io.write(builder.end())
+
+            with ZipFile(io, "r") as file:
+                self.assertIsNone(file.testzip())
+                self.assertEqual(len(file.namelist()), 3)
+
+    def test_lazy_imports(self) -> None:
+        """Test codecs, asyncio, hashlib, threads and helper modules are not imported with zipgen."""
+        env = dict(environ, PYTHONPATH=dirname(dirname(abspath(__file__))))
+        code = "import sys, zipgen; print(' '.join(sorted(sys.modules)))"
+        modules = check_output([executable, "-c", code], env=env).decode().split()
+
+        for module in ("asyncio", "bz2", "lzma", "concurrent.futures", "dataclasses", "hashlib", "threading", "queue", "json", "mmap",
+                       "zipgen.checkpoint", "zipgen.dedup", "zipgen.index", "zipgen.metrics", "zipgen.template", "zipgen.pipeline", "zipgen.memory"):
+            self.assertNotIn(module, modules)
+
+        code = "import sys, zipgen.__main__; print(' '.join(sorted(sys.modules)))"
+        modules = check_output([executable, "-c", code], env=env).decode().split()
+
+        for module in ("asyncio", "bz2", "lzma", "concurrent.futures", "dataclasses", "hashlib"):
+            self.assertNotIn(module, modules)
+
 
 if __name__ == "__main__":
     main()
@@ -3,10 +3,14 @@ from typing import AsyncGenerator
 from unittest import IsolatedAsyncioTestCase, main
 from io import BytesIO
 from sys import argv
-from os import listdir
-from os.path import dirname
+from os import listdir, makedirs
+from os.path import dirname, join
 from zipfile import ZipFile
-from zipgen import ZipStreamWriter
+from tempfile import TemporaryDirectory
+from zipgen import ZipStreamWriter, COMPRESSION_DEFLATED, walk_entries
+from zipgen.asgi import ZipApp, ZipIterator
+from zipgen.metrics import BuildMetrics
+from zipgen.sink import TEE_DETACH, TEE_DROP, TeeWriter, PartWriter
 
 
 class TestAsyncStream(IsolatedAsyncioTestCase):
@@ -81,6 +85,245 @@ class TestAsyncStream(IsolatedAsyncioTestCase):
             for name in file.namelist():
                 self.assertEqual(file.read(name), b"".join(data))
 
+    async def test_drain_high_water(self) -> None:
+        """Test stream is drained only when queued writes are flushed."""
+        io = BytesIO()
+        drains = 0
+
+        class DrainIO(object):
+            def write(self, buf) -> None:
+                io.write(buf)
+
+            async def drain(self) -> None:
+                nonlocal drains
+                drains += 1
+
+        stream = ZipStreamWriter(DrainIO())
+
+        for i in range(100):
+            await stream.add_buf_async(f"buf{i}.txt", b"hello")
+
+        await stream.end_async()
+
+        self.assertEqual(drains, 1)
+
+        with ZipFile(io, "r") as file:
+            self.assertEqual(len(file.namelist()), 100)
+
+    async def test_walk_prefetch_async(self) -> None:
+        """Test prefetched walk produces same output as walk."""
+        with TemporaryDirectory() as path:
+            makedirs(join(path, "files"))
+
+            for i in range(20):
+                with open(join(path, "files", f"{i}.txt"), "wb") as fs:
+                    fs.write(b"This is prefetched. %d " % i * (i * 64))
+
+            io1 = BytesIO()
+            io2 = BytesIO()
+
+            with ZipStreamWriter(io1) as stream:
+                stream.walk(path, "/", 1600000000.0, COMPRESSION_DEFLATED, no_compress=None)
+
+            with ZipStreamWriter(io2) as stream:
+                await stream.walk_async(path, "/", 1600000000.0, COMPRESSION_DEFLATED, no_compress=None, prefetch=4)
+
+            self.assertEqual(io1.getvalue(), io2.getvalue())
+
+            with ZipFile(io2, "r") as file:
+                self.assertEqual(len(file.namelist()), 21)
+
+    async def test_tee_async(self) -> None:
+        """Test slow sinks do not block tee."""
+        class DrainIO(BytesIO):
+            def __init__(self, delay: float) -> None:
+                super().__init__()
+                self.delay = delay
+                self.drains = 0
+
+            async def drain(self) -> None:
+                self.drains += 1
+                await sleep(self.delay)
+
+        fast = DrainIO(0)
+        slow_drop = DrainIO(10)
+        slow_detach = DrainIO(10)
+        tee = TeeWriter((fast,), timeout=0.01)
+        dropped = tee.add_sink(slow_drop, TEE_DROP)
+        detached = tee.add_sink(slow_detach, TEE_DETACH)
+
+        async with ZipStreamWriter(tee, write_size=1024) as stream:
+            for i in range(10):
+                await stream.add_buf_async(f"buf{i}.txt", b"hello tee " * 1024)
+
+        self.assertGreater(fast.drains, 1)
+        self.assertEqual(slow_drop.drains, 1)
+        self.assertGreater(dropped.dropped, 0)
+        self.assertTrue(detached.detached)
+
+        with ZipFile(fast, "r") as file:
+            self.assertEqual(len(file.namelist()), 10)
+
+    async def test_asgi(self) -> None:
+        """Test ASGI app with length and ranges."""
+        async def request(app: ZipApp, headers=(), method="GET"):
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                messages.append(message)
+
+            await app({"type": "http", "method": method, "headers": [(k.encode(), v.encode()) for k, v in headers]}, receive, send)
+
+            self.assertEqual(messages[0]["type"], "http.response.start")
+            self.assertFalse(messages[-1].get("more_body", False))
+            return messages[0]["status"], dict(messages[0]["headers"]), b"".join(m["body"] for m in messages[1:])
+
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, "sub"))
+            makedirs(join(tmp, "empty"))
+
+            for i in range(20):
+                with open(join(tmp, "sub" if i % 2 else "", f"file{i}.txt"), "wb") as fs:
+                    fs.write(f"hello from file{i}.txt ".encode() * i * 256)
+
+            entries = list(walk_entries(tmp, "/"))
+            app = ZipApp(entries, utc_time=1600000000.0, write_size=4096)
+
+            # Full
+            status, headers, body = await request(app)
+            self.assertEqual(status, 200)
+            self.assertEqual(int(headers[b"content-length"]), len(body))
+            self.assertEqual(headers[b"etag"].decode(), app.etag)
+
+            with ZipFile(BytesIO(body), "r") as file:
+                self.assertEqual(len(file.namelist()), 21)
+
+            # Ranges
+            for value, start, end in (("bytes=100-9999", 100, 10000,), ("bytes=5000-", 5000, len(body),), ("bytes=-100", len(body) - 100, len(body),),):
+                status, headers, part = await request(app, (("range", value,),))
+                self.assertEqual(status, 206)
+                self.assertEqual(part, body[start:end])
+                self.assertEqual(int(headers[b"content-length"]), end - start)
+                self.assertEqual(headers[b"content-range"].decode(), f"bytes {start}-{end - 1}/{len(body)}")
+
+            status, _, _ = await request(app, (("range", f"bytes={len(body)}-",),))
+            self.assertEqual(status, 416)
+
+            status, _, part = await request(app, (("range", "bytes=0-9",), ("if-range", "\"old\"",),))
+            self.assertEqual(status, 200)
+            self.assertEqual(part, body)
+
+            status, headers, part = await request(app, method="HEAD")
+            self.assertEqual(part, b"")
+            self.assertEqual(int(headers[b"content-length"]), len(body))
+
+            # Compressed length is not known
+            app = ZipApp(list(walk_entries(tmp, "/", COMPRESSION_DEFLATED, no_compress=None)))
+            status, headers, body = await request(app)
+            self.assertNotIn(b"content-length", headers)
+            self.assertNotIn(b"etag", headers)
+
+            with ZipFile(BytesIO(body), "r") as file:
+                self.assertEqual(len(file.namelist()), 21)
+
+    async def test_zip_iterator(self) -> None:
+        """Test archive is built only as fast as it is consumed."""
+        added = []
+
+        async def build(stream: ZipStreamWriter) -> None:
+            for i in range(100):
+                added.append(i)
+                await stream.add_buf_async(f"buf{i}.txt", b"hello iterator " * 1024)
+
+        iterator = ZipIterator(build, write_size=4096)
+        await iterator.__anext__()
+        await sleep(0.01)
+        self.assertLess(len(added), 5)
+
+        body = b"".join([buf async for buf in iterator])
+        self.assertEqual(len(added), 100)
+        self.assertTrue(body.endswith(b"\0\0"))
+
+    async def test_parts_async(self) -> None:
+        """Test parts are uploaded concurrently with a cap."""
+        parts = {}
+        in_flight = [0, 0]
+
+        async def upload(number: int, data: bytearray) -> int:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await sleep(0.001)
+            parts[number] = bytes(data)
+            in_flight[0] -= 1
+            return number
+
+        writer = PartWriter(upload, part_size=16384, max_pending=3)
+
+        async with ZipStreamWriter(writer, write_size=4096) as stream:
+            for i in range(10):
+                await stream.add_buf_async(f"buf{i}.txt", b"hello parts " * 4096)
+
+        results = await writer.close_async()
+
+        self.assertEqual(sorted(results), list(range(1, len(parts) + 1)))
+        self.assertGreater(in_flight[1], 1)
+        self.assertLessEqual(in_flight[1], 3)
+
+        with ZipFile(BytesIO(b"".join(parts[number] for number in sorted(parts))), "r") as file:
+            self.assertEqual(len(file.namelist()), 10)
+
+    async def test_parts_close_async(self) -> None:
+        """Test sync close is rejected with coroutine upload without losing parts."""
+        parts = {}
+
+        async def upload(number: int, data: bytearray) -> None:
+            await sleep(0.001)
+            parts[number] = bytes(data)
+
+        writer = PartWriter(upload, part_size=4096)
+        writer.write(b"hello parts " * 1024)
+
+        with self.assertRaises(ValueError):
+            writer.close()
+
+        await writer.close_async()
+        self.assertEqual(b"".join(parts[number] for number in sorted(parts)), b"hello parts " * 1024)
+
+    async def test_metrics_async(self) -> None:
+        """Test metrics include time spent draining the stream."""
+        drained = []
+
+        class Stream(object):
+            def __init__(self) -> None:
+                self.io = BytesIO()
+
+            def write(self, buf: bytes) -> int:
+                return self.io.write(buf)
+
+            async def drain(self) -> None:
+                drained.append(True)
+                await sleep(0.001)
+
+        metrics = BuildMetrics()
+        output = Stream()
+
+        async with ZipStreamWriter(output, write_size=4096) as stream:
+            stream.set_metrics(metrics)
+
+            for i in range(4):
+                await stream.add_io_async(f"{i}.txt", BytesIO(b"hello metrics " * 1024), compression=COMPRESSION_DEFLATED)
+
+        self.assertEqual(metrics.files, 4)
+        self.assertEqual(metrics.drains, len(drained))
+        self.assertGreater(metrics.drain_time, 0)
+        self.assertGreater(sum(entry.compress_time for entry in metrics.entries), 0)
+
+        with ZipFile(output.io, "r") as file:
+            self.assertIsNone(file.testzip())
+
 
 if __name__ == "__main__":
     main()
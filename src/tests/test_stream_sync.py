@@ -1,11 +1,16 @@
 from typing import Generator
+from hashlib import sha256
 from unittest import TestCase, main
 from io import BytesIO
 from sys import argv
-from os import listdir
-from os.path import dirname
+from os import listdir, makedirs
+from os.path import dirname, join
 from zipfile import ZipFile
-from zipgen import ZipStreamWriter, COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA
+from tempfile import TemporaryFile, TemporaryDirectory
+from zipgen.checkpoint import Checkpoint
+from zipgen.metrics import BuildMetrics
+from zipgen.sink import TEE_DROP, TEE_DETACH, TeeWriter, HashWriter, PartWriter
+from zipgen import ZipBuilder, ZipStreamWriter, COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA
 
 
 print(argv[0], dirname(argv[0]))
@@ -136,6 +141,282 @@ class TestStreamSync(TestCase):
             for name in file.namelist():
                 self.assertEqual(file.read(name), b"".join(data))
 
+    def test_add_bufs(self) -> None:
+        """Test adding batched buffers."""
+        io = BytesIO()
+        items = [(f"buf{i}.txt", f"hello from buf{i}.txt".encode(), None) for i in range(100)]
+
+        with ZipStreamWriter(io) as stream:
+            stream.add_bufs(items, compression=COMPRESSION_DEFLATED)
+
+        # Check existence
+        with ZipFile(io, "r") as file:
+            self.assertEqual(file.namelist(), [path for path, _, _ in items])
+
+            for path, data, _ in items:
+                self.assertEqual(file.read(path), data)
+
+    def test_write_coalescing(self) -> None:
+        """Test small writes are coalesced without changing output."""
+        builder = ZipBuilder()
+        expected = BytesIO()
+
+        class CountingIO(BytesIO):
+            writes = 0
+
+            def write(self, buf) -> int:
+                self.writes += 1
+                return super().write(buf)
+
+        io = CountingIO()
+
+        with ZipStreamWriter(io) as stream:
+            for i in range(100):
+                stream.add_buf(f"buf{i}.txt", b"hello", 1600000000.0)
+
+        for i in range(100):
+            for buf in builder.add_buf(f"buf{i}.txt", b"hello", 1600000000.0):
+                expected.write(buf)
+        expected.write(builder.end())
+
+        self.assertEqual(io.getvalue(), expected.getvalue())
+        self.assertLess(io.writes, 100)
+
+    def test_write_keeps_chunks(self) -> None:
+        """Test streams keeping written chunks receive data which stays valid."""
+        content = bytes(range(256)) * 1200
+
+        class ListIO(object):
+            def __init__(self) -> None:
+                self.chunks = []
+
+            def write(self, buf) -> int:
+                self.chunks.append(buf)
+                return len(buf)
+
+        io = ListIO()
+
+        with ZipStreamWriter(io) as stream:
+            stream.add_io("io.bin", BytesIO(content), 1600000000.0)
+            stream.add_buf("buf.bin", content, 1600000000.0, COMPRESSION_DEFLATED)
+
+        with ZipFile(BytesIO(b"".join(io.chunks)), "r") as file:
+            self.assertIsNone(file.testzip())
+            self.assertEqual(file.read("io.bin"), content)
+            self.assertEqual(file.read("buf.bin"), content)
+
+    def test_write_vectored(self) -> None:
+        """Test vectored writes to raw file."""
+        content = b"hello from writev " * 1024
+
+        with TemporaryFile() as tmp:
+            with open(tmp.fileno(), "wb", buffering=0, closefd=False) as raw:
+                with ZipStreamWriter(raw, write_size=4096) as stream:
+                    for i in range(10):
+                        stream.add_buf(f"buf{i}.txt", content)
+
+            tmp.seek(0)
+
+            with ZipFile(tmp, "r") as file:
+                self.assertEqual(len(file.namelist()), 10)
+
+                for name in file.namelist():
+                    self.assertEqual(file.read(name), content)
+
+    def test_checkpoint_resume(self) -> None:
+        """Test resuming interrupted walk from checkpoint."""
+        with TemporaryDirectory() as tmp:
+            src = join(tmp, "src")
+            makedirs(join(src, "sub"))
+
+            for i in range(10):
+                with open(join(src, "sub" if i % 2 else "", f"file{i}.txt"), "wb") as fs:
+                    fs.write(f"hello from file{i}.txt ".encode() * (i + 1) * 64)
+
+            # Uninterrupted
+            with TemporaryFile() as expected:
+                with ZipStreamWriter(expected) as stream:
+                    stream.walk(src, "/", 1600000000.0, compression=COMPRESSION_DEFLATED)
+
+                expected.seek(0)
+                expected_data = expected.read()
+
+            with open(join(tmp, "out.zip"), "w+b") as out:
+                seen = []
+
+                def crash(path, ext, folder, stat) -> bool:
+                    seen.append(path)
+                    if len(seen) > 7:
+                        raise KeyboardInterrupt()
+                    return False
+
+                # Interrupted
+                stream = ZipStreamWriter(out)
+                stream.set_checkpoint(Checkpoint(join(tmp, "out.ckpt"), entries=2))
+
+                with self.assertRaises(KeyboardInterrupt):
+                    stream.walk(src, "/", 1600000000.0, compression=COMPRESSION_DEFLATED, ignore=crash)
+
+                stream.checkpoint.close()
+
+                # Resumed
+                with ZipStreamWriter(out) as stream:
+                    stream.resume(Checkpoint(join(tmp, "out.ckpt"), entries=2))
+                    self.assertGreater(len(stream.builder.headers), 0)
+                    self.assertLess(len(stream.builder.headers), 8)
+                    stream.walk(src, "/", 1600000000.0, compression=COMPRESSION_DEFLATED, skip_existing=True)
+
+                out.seek(0)
+                self.assertEqual(out.read(), expected_data)
+
+    def test_tee(self) -> None:
+        """Test same archive is written to multiple sinks."""
+        class BrokenIO(object):
+            def write(self, buf) -> int:
+                raise OSError("broken")
+
+        io1 = BytesIO()
+        io2 = BytesIO()
+        hash = HashWriter("sha256")
+        tee = TeeWriter((io1, io2, hash,))
+        dropped = tee.add_sink(BrokenIO(), TEE_DROP)
+        detached = tee.add_sink(BrokenIO(), TEE_DETACH)
+
+        with ZipStreamWriter(tee) as stream:
+            for i in range(10):
+                stream.add_buf(f"buf{i}.txt", b"hello tee " * 1024, compression=COMPRESSION_DEFLATED)
+
+        self.assertEqual(io1.getvalue(), io2.getvalue())
+        self.assertEqual(hash.hexdigest(), sha256(io1.getvalue()).hexdigest())
+        self.assertEqual(dropped.dropped, len(io1.getvalue()))
+        self.assertFalse(dropped.detached)
+        self.assertTrue(detached.detached)
+        self.assertIsInstance(detached.error, OSError)
+
+        with ZipFile(io1, "r") as file:
+            self.assertEqual(len(file.namelist()), 10)
+
+        # Block policy raises
+        tee = TeeWriter((BytesIO(), BrokenIO(),))
+
+        with self.assertRaises(OSError):
+            with ZipStreamWriter(tee) as stream:
+                stream.add_buf("buf.txt", b"hello tee")
+
+    def test_tee_borrow(self) -> None:
+        """Test tee passes views without copying only when every sink copies them."""
+        content = bytes(range(256)) * 1200
+
+        class CopyingIO(object):
+            copies_buffers = True
+
+            def __init__(self) -> None:
+                self.io = BytesIO()
+                self.views = 0
+
+            def write(self, buf) -> int:
+                self.views += isinstance(buf, memoryview)
+                return self.io.write(buf)
+
+        class ListIO(object):
+            def __init__(self) -> None:
+                self.chunks = []
+
+            def write(self, buf) -> int:
+                self.chunks.append(buf)
+                return len(buf)
+
+        copying = CopyingIO()
+        hash = HashWriter("sha256")
+
+        with ZipStreamWriter(TeeWriter((copying, hash,))) as stream:
+            stream.add_io("io.bin", BytesIO(content), 1600000000.0)
+
+        self.assertGreater(copying.views, 0)
+        self.assertEqual(hash.hexdigest(), sha256(copying.io.getvalue()).hexdigest())
+
+        copying = CopyingIO()
+        keeping = ListIO()
+
+        with ZipStreamWriter(TeeWriter((copying, keeping,))) as stream:
+            stream.add_io("io.bin", BytesIO(content), 1600000000.0)
+
+        self.assertEqual(copying.views, 0)
+        self.assertEqual(b"".join(keeping.chunks), copying.io.getvalue())
+
+    def test_parts(self) -> None:
+        """Test output is split into fixed size parts."""
+        expected = BytesIO()
+
+        with ZipStreamWriter(expected) as stream:
+            for i in range(10):
+                stream.add_buf(f"buf{i}.txt", b"hello parts " * 4096, 1600000000.0)
+
+        for workers in (0, 4):
+            parts = {}
+
+            def upload(number: int, data: bytearray) -> str:
+                parts[number] = bytes(data)
+                return f"etag{number}"
+
+            writer = PartWriter(upload, part_size=65536, max_pending=2, workers=workers)
+
+            with ZipStreamWriter(writer) as stream:
+                for i in range(10):
+                    stream.add_buf(f"buf{i}.txt", b"hello parts " * 4096, 1600000000.0)
+
+            results = writer.close()
+
+            self.assertEqual(sorted(parts), list(range(1, len(parts) + 1)))
+            self.assertEqual(results, {number: f"etag{number}" for number in parts})
+            self.assertTrue(all(len(parts[number]) == 65536 for number in range(1, len(parts))))
+            self.assertEqual(b"".join(parts[number] for number in sorted(parts)), expected.getvalue())
+
+    def test_metrics(self) -> None:
+        """Test metrics are collected per file and do not change output."""
+        expected = BytesIO()
+        io = BytesIO()
+        finished = []
+        metrics = BuildMetrics(on_entry=lambda entry: finished.append(entry.path))
+
+        for output, enabled in ((expected, False), (io, True)):
+            with ZipStreamWriter(output) as stream:
+                if enabled:
+                    stream.set_metrics(metrics)
+
+                stream.add_io("io.txt", BytesIO(b"hello metrics " * 8192), 1600000000.0, COMPRESSION_DEFLATED)
+                stream.add_buf("buf.txt", b"hello", 1600000000.0)
+                stream.add_bufs([("a.txt", b"a", 1600000000.0), ("b.txt", b"b", 1600000000.0)])
+                stream.add_folder("folder", 1600000000.0)
+
+        self.assertEqual(io.getvalue(), expected.getvalue())
+        self.assertEqual(finished, [b"io.txt", b"buf.txt", b"a.txt", b"b.txt"])
+        self.assertEqual((metrics.files, metrics.folders), (4, 1))
+
+        entry = metrics.entries[0]
+        self.assertEqual(entry.bytes_in, 14 * 8192)
+        self.assertLess(entry.bytes_out, entry.bytes_in)
+        self.assertGreater(entry.compress_time, 0)
+        self.assertGreater(entry.read_time, 0)
+        self.assertGreater(entry.chunks, 0)
+        self.assertEqual(metrics.bytes_in, 14 * 8192 + 7)
+        self.assertGreater(metrics.writes, 0)
+        self.assertEqual(metrics.as_dict()["entries"][1]["path"], "buf.txt")
+
+    def test_metrics_pipelined(self) -> None:
+        """Test pipelined entries count chunks and CRC32 time."""
+        metrics = BuildMetrics()
+
+        with ZipStreamWriter(BytesIO()) as stream:
+            stream.set_metrics(metrics)
+            stream.add_io("io.txt", BytesIO(b"hello pipeline " * 8192), 1600000000.0, COMPRESSION_DEFLATED, pipelined=True)
+
+        entry = metrics.entries[0]
+        self.assertEqual(entry.bytes_in, 15 * 8192)
+        self.assertEqual(entry.chunks, 2)
+        self.assertGreater(entry.crc_time, 0)
+        self.assertEqual(entry.read_time, 0)
+
 
 if __name__ == "__main__":
     main()
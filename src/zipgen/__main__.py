@@ -1,33 +1,51 @@
-from sys import stderr, stdout, exit
+from sys import stderr, stdin, stdout, exit, platform
+from time import monotonic, perf_counter
 from os import stat, stat_result
 from os.path import isdir, join, basename, abspath, dirname, relpath, splitext
-from dataclasses import dataclass, field
 from argparse import ArgumentParser, Namespace
-from typing import Any, AnyStr, Iterable, cast
+from json import dumps
+from typing import Any, AnyStr, Dict, Iterable, List, Optional, Tuple, cast
 
-from .build import BuilderCallableContext, walk_no_compress_default
+from .build import BuilderCallableContext, ZipBuilder, list_entries, read_paths, walk_entries, walk_no_compress_default
+from .compress import CompressorContext
+from .metrics import BuildMetrics, EntryMetrics
 from .stream import ZipStreamWriter
 from .constant import *
 
 
-@dataclass
 class Arguments(Namespace):
     dest: str = ""
     dest_stdout: bool = False
-    src: Iterable[str] = field(default_factory=lambda: [])
+    src: Iterable[str] = ()
     path: str = "/"
     comment: str = ""
     buf: int = 262144
     comp: int = COMPRESSION_STORED
     include_parent_folder: bool = True
     verbose: bool = True
+    digests: List[str] = []
+    manifest: str = ""
+    manifest_entry: str = ""
+    index: str = ""
+    index_format: str = "json"
+    metrics: str = ""
+    progress: bool = False
+    stats_json: str = ""
+    files_from: str = ""
+    null: bool = False
 
 
-@dataclass
 class VerboseExra(object):
-    path: str
-    walk: bool = False
-    cwd: bool = False
+    __slots__ = (
+        "path",
+        "walk",
+        "cwd",
+    )
+
+    def __init__(self, path: str, walk=False, cwd=False) -> None:
+        self.path = path
+        self.walk = walk
+        self.cwd = cwd
 
 
 def cb_verbose(bctx: BuilderCallableContext, extra: Any) -> None:
@@ -58,15 +76,182 @@ def cb_verbose(bctx: BuilderCallableContext, extra: Any) -> None:
             print(f" (stored)", file=stderr)
 
 
+# Seconds between progress refreshes.
+PROGRESS_INTERVAL = 0.5
+
+COMPRESSION_NAMES = {
+    COMPRESSION_STORED: "stored",
+    COMPRESSION_DEFLATED: "deflated",
+    COMPRESSION_BZIP2: "bzip2",
+    COMPRESSION_LZMA: "lzma",
+}
+
+
+def peak_rss() -> Optional[int]:
+    """Returns peak resident memory of the process in bytes."""
+    try:
+        from resource import RUSAGE_SELF, getrusage
+    except ImportError:  # Not available on Windows
+        return None
+
+    return getrusage(RUSAGE_SELF).ru_maxrss * (1 if platform == "darwin" else 1024)
+
+
+def format_eta(seconds: float) -> str:
+    """Returns seconds as h:mm:ss."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+class RunStats(BuildMetrics):
+    """Metrics of the command which prints progress at fixed rate and totals files by compression method."""
+    __slots__ = (
+        "builder",
+        "progress",
+        "total_files",
+        "total_bytes",
+        "scan_time",
+        "refreshed",
+        "methods",
+    )
+
+    def __init__(self, builder: ZipBuilder, progress: bool, keep_entries: bool) -> None:
+        super().__init__(keep_entries)
+        self.builder = builder
+        self.progress = progress
+        self.total_files = 0
+        self.total_bytes = 0
+        self.scan_time = 0.0
+        self.refreshed = monotonic()
+        self.methods: Dict[str, List[int]] = {}
+
+    def scan(self, srcs: Iterable[str], ignore_path: str) -> None:
+        """Counts files and bytes of sources for progress."""
+        start = perf_counter()
+
+        for src in srcs:
+            if isdir(src):
+                for entry in walk_entries(abspath(src), "", COMPRESSION_STORED, lambda path, *_: path == ignore_path, None):
+                    if not entry.folder:
+                        self.total_files += 1
+                        self.total_bytes += entry.stat.st_size
+            elif abspath(src) != ignore_path:
+                self.total_files += 1
+                self.total_bytes += stat(src).st_size
+
+        self.scan_time = perf_counter() - start
+
+    def finish_entry(self, entry: EntryMetrics, context: CompressorContext) -> None:
+        super().finish_entry(entry, context)
+
+        method = self.methods.setdefault(COMPRESSION_NAMES.get(entry.compression, str(entry.compression)), [0, 0, 0])
+        method[0] += 1
+        method[1] += entry.bytes_in
+        method[2] += entry.bytes_out
+
+        self.refresh()
+
+    def add_write(self, seconds: float) -> None:
+        super().add_write(seconds)
+        self.refresh()
+
+    def refresh(self, last=False) -> None:
+        """Prints bytes/s, files/s and ETA if refresh interval has passed."""
+        if not self.progress:
+            return
+
+        now = monotonic()
+        if not last and now - self.refreshed < PROGRESS_INTERVAL:
+            return
+
+        self.refreshed = now
+
+        # Bytes of current file
+        done = self.bytes_in
+        if self.builder.ctx is not None:
+            done += self.builder.ctx.compressor_ctx.uncompressed_size
+
+        elapsed = max(self.elapsed - self.scan_time, 1e-9)
+        rate = done / elapsed
+        line = f"\r{rate / 1048576:8.1f} MB/s {self.files / elapsed:8.1f} files/s {self.files}"
+
+        if self.total_files > 0:
+            line += f"/{self.total_files}"
+
+        line += " files"
+
+        # Totals are not known for lists
+        if self.total_bytes > 0:
+            line += f" {min(done / self.total_bytes, 1.0) * 100:5.1f}%"
+
+            if rate > 0 and not last:
+                line += f" ETA {format_eta(max(self.total_bytes - done, 0) / rate)}"
+
+        # Padded to overwrite longer previous line
+        print(line.ljust(79), end="\n" if last else "", file=stderr, flush=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns totals, ratios by compression method, time split by phase and peak memory."""
+        elapsed = self.elapsed
+        build_time = elapsed - self.scan_time
+        phases = {
+            "scan": self.scan_time,
+            "read": self.read_time,
+            "crc": self.crc_time,
+            "compress": self.compress_time,
+            "write": self.write_time,
+        }
+        phases["other"] = max(elapsed - sum(phases.values()), 0.0)
+
+        return {
+            "files": self.files,
+            "folders": self.folders,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_out / self.bytes_in if self.bytes_in > 0 else 1.0,
+            "elapsed": elapsed,
+            "bytes_per_second": self.bytes_in / build_time if build_time > 0 else 0.0,
+            "files_per_second": self.files / build_time if build_time > 0 else 0.0,
+            "methods": {
+                name: {
+                    "files": files,
+                    "bytes_in": bytes_in,
+                    "bytes_out": bytes_out,
+                    "ratio": bytes_out / bytes_in if bytes_in > 0 else 1.0,
+                }
+                for name, (files, bytes_in, bytes_out) in self.methods.items()
+            },
+            "phases": phases,
+            "peak_rss": peak_rss(),
+        }
+
+
 def main(args: Arguments) -> None:
     """Builds zip file with given arguments."""
     out_file = stdout.buffer if args.dest_stdout else open(args.dest, "wb")
+    metrics: Optional[RunStats] = None
 
     with out_file, ZipStreamWriter(out_file, args.buf) as zsw:
         # Absolute path
         out_file_abs = abspath(out_file.name)
         cwd_abs = abspath(".")
 
+        # Digests for manifest
+        if args.digests:
+            zsw.builder.set_digests(*args.digests)
+
+        # Timing of files
+        if args.metrics or args.stats_json or args.progress:
+            metrics = RunStats(zsw.builder, args.progress, bool(args.metrics))
+            zsw.set_metrics(metrics)
+
+            # Progress replaces printing of each file. Totals of a list are not known before reading it.
+            if args.progress:
+                args.verbose = False
+                if not args.files_from:
+                    metrics.scan(args.src, out_file_abs)
+
         # Write srcs
         for src_file in args.src:
             try:
@@ -117,9 +302,60 @@ def main(args: Arguments) -> None:
             except Exception as ex:
                 print(str(ex), file=stderr)
 
+        # Write listed paths
+        if args.files_from:
+            # Ignore self
+            def ignore_list_self(path: AnyStr, ext: AnyStr, folder: bool, stat: stat_result) -> bool:
+                return path == out_file_abs
+
+            # Print and skip paths which can not be accessed
+            def list_error(path: str, ex: OSError) -> None:
+                print(str(ex), file=stderr)
+
+            # Verbose
+            if args.verbose:
+                zsw.builder.set_callback(
+                    cb_verbose, VerboseExra(path=cwd_abs, walk=True, cwd=True))
+
+            list_file = stdin.buffer if args.files_from == "-" else open(args.files_from, "rb")
+
+            with list_file:
+                paths = read_paths(list_file, b"\0" if args.null else b"\n")
+                zsw.add_entries(list_entries(paths, args.path, args.comp, ignore_list_self, walk_no_compress_default, list_error))
+
+        # Manifest
+        if args.manifest:
+            with open(args.manifest, "wb") as manifest_file:
+                manifest_file.write(zsw.builder.get_manifest())
+
+        # Index
+        if args.index:
+            with open(args.index, "wb") as index_file:
+                index_file.write(zsw.builder.get_index(args.index_format))
+
+        if args.manifest_entry:
+            # Verbose
+            if args.verbose:
+                zsw.builder.set_callback(
+                    cb_verbose, VerboseExra(path=args.manifest_entry))
+
+            zsw.add_manifest(args.manifest_entry)
+
         # End
         zsw.set_comment(args.comment)
 
+    # Metrics are complete after end
+    if metrics is not None:
+        metrics.refresh(last=True)
+
+        if args.metrics:
+            with open(args.metrics, "w") as metrics_file:
+                metrics_file.write(dumps(metrics.as_dict()))
+
+        if args.stats_json:
+            with open(args.stats_json, "w") as stats_file:
+                stats_file.write(dumps(metrics.stats()))
+
 
 if __name__ == "__main__":
     parser = ArgumentParser(prog="zipgen")
@@ -127,8 +363,12 @@ if __name__ == "__main__":
                         help="Destination file.")
     parser.add_argument("--dest-stdout", dest="dest_stdout", action="store_true",
                         help="Sets dest output to stdout.")
-    parser.add_argument("src", metavar="N src file", type=str, nargs="+",
+    parser.add_argument("src", metavar="N src file", type=str, nargs="*",
                         help="Source files.")
+    parser.add_argument("--files-from", dest="files_from", type=str, default=Arguments.files_from,
+                        help="Adds files and folders listed in the file, one per line. - reads the list from stdin.")
+    parser.add_argument("-0", "--null", dest="null", action="store_true",
+                        help="Paths of --files-from are separated by NUL such as output of find -print0.")
     parser.add_argument("--path", type=str, default=Arguments.path,
                         help="Internal dest folder in zip.")
     parser.add_argument("--no-ipf", dest="include_parent_folder", action="store_false",
@@ -141,14 +381,35 @@ if __name__ == "__main__":
                         help="Compression format. 0 = STORED, 8 = DEFLATED, 12 = BZIP2 and 14 = LZMA.")
     parser.add_argument("-q", dest="verbose", action="store_false",
                         help="Sets verbose mode off.")
+    parser.add_argument("--digest", dest="digests", type=str, action="append",
+                        help="Digest calculated for manifest such as sha256 or blake2b. Can be given multiple times.")
+    parser.add_argument("--manifest", type=str, default=Arguments.manifest,
+                        help="Writes JSON lines manifest of path, size and digests of files to the file.")
+    parser.add_argument("--index", type=str, default=Arguments.index,
+                        help="Writes index of offsets, sizes and crc32 of files to the file.")
+    parser.add_argument("--index-format", dest="index_format", type=str, choices=("json", "binary"), default=Arguments.index_format,
+                        help="Format of the index file.")
+    parser.add_argument("--metrics", type=str, default=Arguments.metrics,
+                        help="Writes JSON of sizes and read, crc32, compress and write times of each file and totals to the file.")
+    parser.add_argument("--progress", action="store_true",
+                        help="Prints bytes/s, files/s and ETA at fixed rate instead of each file. Sources are scanned first for totals.")
+    parser.add_argument("--stats-json", dest="stats_json", type=str, default=Arguments.stats_json,
+                        help="Writes JSON of totals, ratios by compression method, time by phase and peak memory to the file.")
+    parser.add_argument("--manifest-entry", dest="manifest_entry", type=str, default=Arguments.manifest_entry,
+                        help="Adds JSON lines manifest of path, size and digests of files as the last file in zip.")
 
     parser.set_defaults(include_parent_folder=Arguments.include_parent_folder)
     parser.set_defaults(dest_stdout=Arguments.dest_stdout)
     parser.set_defaults(verbose=Arguments.verbose)
+    parser.set_defaults(null=Arguments.null)
 
     try:
         namespace = Arguments()
         args = parser.parse_args(namespace=namespace)
+
+        if not args.src and not args.files_from:
+            parser.error("Source files or --files-from is required.")
+
         main(args)
     except Exception as ex:
         print(str(ex), file=stderr)
@@ -0,0 +1,294 @@
+from asyncio import Event, Task, ensure_future
+from collections import deque
+from hashlib import sha256
+from os import name
+from struct import calcsize
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .build import WalkEntry, get_version_system
+from .constant import *
+from .convert import norm_path
+from .stream import ZipStreamWriter
+
+
+__all__ = (
+    "ZipBuildCallable",
+    "archive_size",
+    "archive_etag",
+    "parse_range",
+    "ZipIterator",
+    "ZipApp",
+)
+
+
+# Build callable which adds files to the writer.
+ZipBuildCallable = Callable[[ZipStreamWriter], Awaitable[None]]
+
+SIZE_LOCAL_FILE = calcsize(HEADER_LOCAL_FILE[0])
+SIZE_DATA_DESCRIPTOR = calcsize(HEADER_DATA_DESCRIPTOR64[0])
+SIZE_CENTRAL_DIRECTORY = calcsize(HEADER_CENTRAL_DIRECTORY[0])
+SIZE_EXTRA = calcsize(TAG_EXTENDED_INFORMATION64[0])
+SIZE_END = (
+    calcsize(HEADER_CENTRAL_DIRECTORY_RECORD64[0]),
+    calcsize(HEADER_CENTRAL_DIRECTORY_LOCATOR64[0]),
+    calcsize(HEADER_END_OF_CENTRAL_DIRECTORY[0]),
+)
+
+
+def archive_size(entries: Iterable[WalkEntry], comment=b"") -> Optional[int]:
+    """Returns size of archive built from entries. Returns None if size is not known before compressing."""
+    offset = 0
+    size = 0
+    count = 0
+
+    for entry in entries:
+        path = norm_path(entry.dest, entry.folder)
+        use_zip64 = offset >= INT32_MAX
+        count += 1
+
+        if entry.folder:
+            offset += SIZE_LOCAL_FILE + len(path)
+        elif entry.compression == COMPRESSION_STORED:
+            use_zip64 = use_zip64 or entry.stat.st_size >= INT32_MAX
+            offset += SIZE_LOCAL_FILE + len(path) + entry.stat.st_size + SIZE_DATA_DESCRIPTOR
+        else:
+            return None
+
+        size += SIZE_CENTRAL_DIRECTORY + len(path) + (SIZE_EXTRA if use_zip64 else 0)
+
+    # Zip64 record and locator
+    if offset + size >= INT32_MAX or count >= 0xFFFF:
+        size += SIZE_END[0] + SIZE_END[1]
+
+    return offset + size + SIZE_END[2] + len(comment)
+
+
+def archive_etag(entries: Iterable[WalkEntry], utc_time: Optional[float] = None) -> str:
+    """Returns ETag of paths, sizes, modified times and compressions of entries."""
+    etag = sha256(repr(utc_time).encode())
+
+    for entry in entries:
+        etag.update(norm_path(entry.dest, entry.folder))
+        etag.update(b"\0%d\0%d\0%d\0" % (entry.stat.st_size, entry.stat.st_mtime_ns, entry.compression,))
+
+    return f"\"{etag.hexdigest()[:32]}\""
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """Returns start and end exclusive of a single bytes range. Returns None if range is not supported. Raises ValueError if range is not satisfiable."""
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if not first:
+            # Suffix
+            start, end = max(size - int(last), 0), size
+        else:
+            start, end = int(first), min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+
+    if start >= end:
+        raise ValueError("Range not satisfiable.")
+
+    return start, end
+
+
+class ZipIterator(object):
+    __slots__ = (
+        "build",
+        "buffer_size",
+        "write_size",
+        "system",
+        "chunks",
+        "task",
+        "ready",
+        "wanted",
+    )
+
+    def __init__(self, build: ZipBuildCallable, buffer_size=65536, write_size=65536, system=get_version_system(name)) -> None:
+        self.build = build
+        self.buffer_size = buffer_size
+        self.write_size = write_size
+        self.system = system
+        self.chunks: Deque[bytes] = deque()
+        self.task: Optional[Task] = None
+        self.ready = Event()
+        self.wanted = Event()
+
+    def write(self, buf: Union[bytes, memoryview]) -> int:
+        """Queues the buffer for the consumer. Memoryviews are only valid during the call."""
+        self.chunks.append(bytes(buf) if isinstance(buf, memoryview) else buf)
+        return len(buf)
+
+    def writelines(self, bufs: List[Union[bytes, memoryview]]) -> None:
+        """Queues the buffers for the consumer."""
+        for buf in bufs:
+            self.write(buf)
+
+    async def drain(self) -> None:
+        """Waits until the consumer wants more data."""
+        self.ready.set()
+        await self.wanted.wait()
+        self.wanted.clear()
+
+    async def _run(self) -> None:
+        """Builds the archive into queued chunks."""
+        try:
+            stream = ZipStreamWriter(self, self.buffer_size, self.system, self.write_size)
+            await self.build(stream)
+            await stream.end_async()
+        finally:
+            self.ready.set()
+
+    def __aiter__(self) -> "ZipIterator":
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self.task is None:
+            self.task = ensure_future(self._run())
+
+        while not self.chunks:
+            if self.task.done():
+                # Raise build errors
+                self.task.result()
+                raise StopAsyncIteration
+
+            # Let builder continue
+            self.ready.clear()
+            self.wanted.set()
+            await self.ready.wait()
+
+        return self.chunks.popleft()
+
+    async def aclose(self) -> None:
+        """Cancels the build."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+            try:
+                await self.task
+            except BaseException:
+                pass
+
+        self.chunks.clear()
+
+
+class ZipApp(object):
+    __slots__ = (
+        "build",
+        "entries",
+        "filename",
+        "utc_time",
+        "buffer_size",
+        "write_size",
+        "size",
+        "etag",
+    )
+
+    def __init__(self, entries: Optional[Sequence[WalkEntry]] = None, build: Optional[ZipBuildCallable] = None, filename="archive.zip",
+                 utc_time: Optional[float] = None, buffer_size=65536, write_size=65536) -> None:
+        if (entries is None) == (build is None):
+            raise ValueError("Either entries or build has to be given.")
+
+        self.build = build
+        self.entries = entries
+        self.filename = filename
+        self.utc_time = utc_time
+        self.buffer_size = buffer_size
+        self.write_size = write_size
+        self.size: Optional[int] = None
+        self.etag: Optional[str] = None
+
+        # Length and ETag are known if files are stored and folders have fixed time
+        if entries is not None:
+            self.size = archive_size(entries)
+
+            if self.size is not None and (utc_time is not None or not any(entry.folder for entry in entries)):
+                self.etag = archive_etag(entries, utc_time)
+
+    async def _build(self, stream: ZipStreamWriter) -> None:
+        """Adds entries to the stream."""
+        if self.build is not None:
+            await self.build(stream)
+        elif self.entries is not None:
+            await stream.add_entries_async(self.entries, self.utc_time)
+
+    def _headers(self) -> List[Tuple[bytes, bytes]]:
+        """Returns common response headers."""
+        headers = [
+            (b"content-type", b"application/zip",),
+            (b"content-disposition", f"attachment; filename=\"{self.filename}\"".encode("utf8"),),
+        ]
+
+        if self.etag is not None:
+            headers.append((b"etag", self.etag.encode(),))
+            headers.append((b"accept-ranges", b"bytes",))
+
+        return headers
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[[], Awaitable[Dict[str, Any]]], send: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        if scope["type"] != "http":
+            raise ValueError("Only http scope is supported.")
+
+        request_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", ())}
+        headers = self._headers()
+        status = 200
+        start, end = 0, self.size
+
+        # Range of known archive
+        if self.etag is not None and self.size is not None and "range" in request_headers:
+            if request_headers.get("if-range", self.etag) == self.etag:
+                try:
+                    body_range = parse_range(request_headers["range"], self.size)
+                except ValueError:
+                    headers.append((b"content-range", f"bytes */{self.size}".encode(),))
+                    await send({"type": "http.response.start", "status": 416, "headers": headers})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+                if body_range is not None:
+                    start, end = body_range
+                    status = 206
+                    headers.append((b"content-range", f"bytes {start}-{end - 1}/{self.size}".encode(),))
+
+        if end is not None:
+            headers.append((b"content-length", str(end - start).encode(),))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        # Stream the archive or its range
+        iterator = ZipIterator(self._build, self.buffer_size, self.write_size)
+        offset = 0
+
+        try:
+            async for buf in iterator:
+                chunk_start = offset
+                offset += len(buf)
+
+                # Before range
+                if offset <= start:
+                    continue
+
+                # Trim to range
+                if chunk_start < start or (end is not None and offset > end):
+                    buf = buf[max(start - chunk_start, 0):len(buf) if end is None else end - chunk_start]
+
+                await send({"type": "http.response.body", "body": buf, "more_body": True})
+
+                # After range
+                if end is not None and offset >= end:
+                    break
+        finally:
+            await iterator.aclose()
+
+        await send({"type": "http.response.body", "body": b""})
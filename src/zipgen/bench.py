@@ -0,0 +1,312 @@
+from argparse import SUPPRESS, ArgumentParser
+from json import dumps
+from os import makedirs, remove, walk
+from os.path import dirname, exists, getsize, join, relpath
+from random import Random
+from shutil import which
+from subprocess import DEVNULL, Popen
+from sys import executable, platform, stderr
+from tempfile import mkdtemp
+from time import perf_counter, sleep
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .constant import COMPRESSION_DEFLATED, COMPRESSION_STORED
+
+try:
+    from os import WNOHANG, wait4, waitstatus_to_exitcode
+except ImportError:  # Not available on Windows or before Python 3.9
+    wait4 = None  # type: ignore
+
+
+__all__ = (
+    "BenchResult",
+    "CORPORA",
+    "METHODS",
+    "make_corpus",
+    "run_method",
+    "main",
+)
+
+
+# Suffix of file next to corpus which marks it fully written.
+CORPUS_DONE = ".done"
+
+MIB = 1048576
+
+WORDS = (
+    b"archive", b"stream", b"header", b"central", b"directory", b"deflate", b"offset", b"buffer",
+    b"entry", b"folder", b"record", b"local", b"file", b"size", b"crc", b"data", b"zip", b"write",
+)
+
+MEDIA_EXTS = (".jpg", ".png", ".mp4", ".gz")
+TEXT_EXTS = (".txt", ".json", ".csv", ".log")
+
+
+class BenchResult(NamedTuple):
+    corpus: str
+    method: str
+    files: int
+    size: int
+    seconds: float
+    cpu: Optional[float]
+    rss: Optional[int]
+    output_size: int
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.size / MIB / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds > 0 else 0.0
+
+
+def _random_bytes(rand: Random, size: int) -> bytes:
+    """Returns deterministic incompressible bytes."""
+    return rand.getrandbits(size * 8).to_bytes(size, "little") if size > 0 else b""
+
+
+def _text_bytes(rand: Random, size: int) -> bytes:
+    """Returns deterministic highly compressible text."""
+    lines = [b" ".join(rand.choice(WORDS) for _ in range(rand.randint(4, 12))) + b"\n" for _ in range(256)]
+    buf = bytearray()
+
+    while len(buf) < size:
+        buf += rand.choice(lines)
+
+    return bytes(buf[:size])
+
+
+def _write(path: str, data: bytes) -> None:
+    makedirs(dirname(path), exist_ok=True)
+    with open(path, "wb") as fs:
+        fs.write(data)
+
+
+def _corpus_tiny(path: str, rand: Random, scale: float) -> None:
+    """Many tiny files in nested folders."""
+    for i in range(int(10000 * scale)):
+        _write(join(path, str(i % 100), str(i % 7), f"{i}.txt"), _text_bytes(rand, rand.randint(0, 2048)))
+
+
+def _corpus_huge(path: str, rand: Random, scale: float) -> None:
+    """Few huge incompressible files."""
+    block = _random_bytes(rand, MIB)
+
+    for i in range(3):
+        with open(join(path, f"huge-{i}.bin"), "wb") as fs:
+            # Rotated blocks are further apart than deflate window
+            for j in range(max(int(32 * scale), 1)):
+                shift = rand.randrange(MIB)
+                fs.write(block[shift:])
+                fs.write(block[:shift])
+
+
+def _corpus_mixed(path: str, rand: Random, scale: float) -> None:
+    """Already compressed media files mixed with text."""
+    for i in range(int(200 * scale)):
+        if rand.random() < 0.3:
+            data = _random_bytes(rand, rand.randint(64 * 1024, 4 * MIB))
+            ext = rand.choice(MEDIA_EXTS)
+        else:
+            data = _text_bytes(rand, rand.randint(1024, 256 * 1024))
+            ext = rand.choice(TEXT_EXTS)
+
+        _write(join(path, str(i % 10), f"{i}{ext}"), data)
+
+
+def _corpus_text(path: str, rand: Random, scale: float) -> None:
+    """Highly compressible text files."""
+    for i in range(max(int(64 * scale), 1)):
+        _write(join(path, f"{i}.txt"), _text_bytes(rand, MIB))
+
+
+CORPORA: Dict[str, Callable[[str, Random, float], None]] = {
+    "tiny": _corpus_tiny,
+    "huge": _corpus_huge,
+    "mixed": _corpus_mixed,
+    "text": _corpus_text,
+}
+
+
+def make_corpus(name: str, path: str, scale=1.0, seed=0) -> Tuple[int, int]:
+    """Writes deterministic corpus to path unless already written. Returns count and total size of files."""
+    if not exists(path + CORPUS_DONE):
+        makedirs(path, exist_ok=True)
+        CORPORA[name](path, Random(f"{name}:{seed}:{scale}"), scale)
+
+        with open(path + CORPUS_DONE, "wb"):
+            pass
+
+    files = 0
+    size = 0
+
+    for root, _, names in walk(path):
+        for fname in names:
+            files += 1
+            size += getsize(join(root, fname))
+
+    return files, size
+
+
+def _peak_rss(pid: int) -> Optional[int]:
+    """Returns peak resident memory of running process from procfs."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as fs:
+            for line in fs:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def _command(method: str, src: str, dest: str, compression: int) -> Optional[Tuple[List[str], Optional[str]]]:
+    """Returns command and working directory of method. Returns None if method is not installed."""
+    deflated = compression == COMPRESSION_DEFLATED
+
+    if method == "zipgen":
+        return [executable, "-m", "zipgen", dest, src, "-q", "--no-ipf", "--comp", str(compression)], None
+    elif method in ("zipgen-stream", "zipfile"):
+        return [executable, "-m", "zipgen.bench", "--worker", method, src, dest, "--comp", str(compression)], None
+    elif method == "zip":
+        if which("zip") is None:
+            return None
+
+        return ["zip", "-q", "-r", "-6" if deflated else "-0", dest, "."], src
+    elif method == "7z":
+        tool = which("7z") or which("7za")
+        if tool is None:
+            return None
+
+        return [tool, "a", "-bd", "-tzip", f"-mm={'Deflate' if deflated else 'Copy'}", dest, "."], src
+
+    raise ValueError(f"Unknown method {method}.")
+
+
+METHODS = ("zipgen", "zipgen-stream", "zipfile", "zip", "7z")
+
+
+def _worker(method: str, src: str, dest: str, compression: int) -> None:
+    """Builds archive of src in this process."""
+    if method == "zipgen-stream":
+        from .stream import ZipStreamWriter
+
+        with open(dest, "wb") as fs, ZipStreamWriter(fs) as zsw:
+            zsw.walk(src, "/", compression=compression)
+    elif method == "zipfile":
+        from zipfile import ZipFile
+
+        with ZipFile(dest, "w", compression) as zf:
+            for root, _, names in walk(src):
+                for fname in names:
+                    path = join(root, fname)
+                    zf.write(path, relpath(path, src))
+
+
+def run_method(corpus: str, method: str, src: str, dest: str, compression: int, files: int, size: int) -> Optional[BenchResult]:
+    """Times method building archive of src in a child process. Returns None if method is not installed."""
+    command = _command(method, src, dest, compression)
+    if command is None:
+        return None
+
+    args, cwd = command
+    cpu: Optional[float] = None
+    rss: Optional[int] = None
+
+    start = perf_counter()
+    proc = Popen(args, cwd=cwd, stdout=DEVNULL, stderr=DEVNULL)
+
+    if wait4 is not None:
+        # Max RSS of rusage includes memory of this process before exec so procfs is polled when available
+        while True:
+            rss = _peak_rss(proc.pid) or rss
+            pid, status, usage = wait4(proc.pid, WNOHANG)
+            if pid != 0:
+                break
+
+            sleep(0.005)
+
+        status = waitstatus_to_exitcode(status)
+        proc.returncode = status
+        cpu = usage.ru_utime + usage.ru_stime
+
+        if rss is None:
+            rss = usage.ru_maxrss * (1 if platform == "darwin" else 1024)
+    else:
+        status = proc.wait()
+
+    seconds = perf_counter() - start
+
+    if status != 0:
+        raise RuntimeError(f"{method} failed with status {status}.")
+
+    output_size = getsize(dest)
+    remove(dest)
+
+    return BenchResult(corpus, method, files, size, seconds, cpu, rss, output_size)
+
+
+def _format(result: BenchResult) -> str:
+    cpu = "-" if result.cpu is None else f"{result.cpu:.2f}"
+    rss = "-" if result.rss is None else f"{result.rss / MIB:.1f}"
+
+    return (
+        f"{result.corpus:<8}{result.method:<15}{result.seconds:>9.2f}{result.mb_per_second:>10.1f}"
+        f"{result.files_per_second:>12.0f}{cpu:>9}{rss:>10}{result.output_size / MIB:>11.1f}"
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="zipgen.bench", description="Benchmarks zipgen against zipfile, zip and 7z on generated corpora.")
+    parser.add_argument("--corpus", dest="corpora", action="append", choices=tuple(CORPORA),
+                        help="Corpus to benchmark. Can be given multiple times. Defaults to all.")
+    parser.add_argument("--method", dest="methods", action="append", choices=METHODS,
+                        help="Method to benchmark. Can be given multiple times. Defaults to all installed.")
+    parser.add_argument("--comp", type=int, choices=(COMPRESSION_STORED, COMPRESSION_DEFLATED), default=COMPRESSION_DEFLATED,
+                        help="Compression format. 0 = STORED and 8 = DEFLATED.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplies count and size of generated files.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of generated files.")
+    parser.add_argument("--dir", type=str, default=None,
+                        help="Folder where corpora are generated and kept between runs. Defaults to temporary folder.")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Writes results as JSON to the file.")
+    parser.add_argument("--worker", type=str, default=None, help=SUPPRESS)
+    parser.add_argument("worker_args", nargs="*", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        _worker(args.worker, args.worker_args[0], args.worker_args[1], args.comp)
+        return
+
+    workdir = args.dir or mkdtemp(prefix="zipgen-bench-")
+    results: List[BenchResult] = []
+
+    print(f"{'corpus':<8}{'method':<15}{'seconds':>9}{'MB/s':>10}{'files/s':>12}{'cpu s':>9}{'rss MB':>10}{'output MB':>11}")
+
+    for corpus in args.corpora or CORPORA:
+        src = join(workdir, f"{corpus}-{args.seed}-{args.scale}")
+        print(f"generating {corpus} corpus in {src}", file=stderr, flush=True)
+        files, size = make_corpus(corpus, src, args.scale, args.seed)
+
+        for method in args.methods or METHODS:
+            result = run_method(corpus, method, src, join(workdir, f"{corpus}-{method}.zip"), args.comp, files, size)
+            if result is None:
+                continue
+
+            results.append(result)
+            print(_format(result), flush=True)
+
+    if args.json is not None:
+        with open(args.json, "w") as fs:
+            fs.write(dumps([
+                dict(result._asdict(), mb_per_second=result.mb_per_second, files_per_second=result.files_per_second)
+                for result in results
+            ], indent=2))
+
+
+if __name__ == "__main__":
+    main()
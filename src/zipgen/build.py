@@ -1,14 +1,22 @@
-from asyncio import StreamReader
-from dataclasses import dataclass
 from io import BufferedIOBase, RawIOBase, UnsupportedOperation
-from os import name, stat, walk, stat_result
-from os.path import relpath, join, splitext, dirname, abspath
-from typing import AnyStr, Dict, AsyncGenerator, Generator, Tuple, Union, Optional, cast, Callable, Any
+from os import fsdecode, name, stat, walk, stat_result
+from os.path import relpath, join, splitext, splitdrive, dirname, abspath, normpath
+from stat import S_ISDIR
+from typing import TYPE_CHECKING, AnyStr, Dict, AsyncGenerator, Generator, Iterable, List, NamedTuple, Tuple, Union, Optional, cast, Callable, Any
+from zlib import compressobj, crc32
 
 from .compress import *
 from .constant import *
 from .convert import *
 from .pack import *
+from .prefetch import *
+
+if TYPE_CHECKING:
+    from asyncio import StreamReader
+    from .dedup import DedupCache, DedupData
+    from .memory import MemoryWriter
+    from .metrics import BuildMetrics
+    from .template import ZipTemplate
 
 
 __all__ = (
@@ -17,6 +25,10 @@ __all__ = (
     "walk_ignore_default",
     "walk_no_compress_default",
     "get_version_system",
+    "WalkEntry",
+    "walk_entries",
+    "read_paths",
+    "list_entries",
     "ZipContext",
     "BuilderCallableContext",
     "ZipBuilder",
@@ -40,26 +52,55 @@ def get_version_system(name: str) -> int:
     return MADE_BY_WINDOWS if name == "nt" else MADE_BY_UNIX
 
 
-@dataclass
-class ZipContext(object):
-    path: bytes
+class WalkEntry(NamedTuple):
+    src: str
+    dest: str
+    folder: bool
+    stat: stat_result
     compression: int
-    compressor: CompressorBase
-    compressor_ctx: CompressorContext
-    flag: int
-    time: int
-    date: int
-    version: int
-    external_attributes: int
-    comment: bytes
-    relative_offset: int
-
-
-@dataclass
+
+
+class ZipContext(object):
+    __slots__ = (
+        "path",
+        "compression",
+        "compressor",
+        "compressor_ctx",
+        "flag",
+        "time",
+        "date",
+        "version",
+        "external_attributes",
+        "comment",
+        "relative_offset",
+    )
+
+    def __init__(self, path: bytes, compression: int, compressor: CompressorBase, compressor_ctx: CompressorContext, flag: int, time: int, date: int,
+                 version: int, external_attributes: int, comment: bytes, relative_offset: int) -> None:
+        self.path = path
+        self.compression = compression
+        self.compressor = compressor
+        self.compressor_ctx = compressor_ctx
+        self.flag = flag
+        self.time = time
+        self.date = date
+        self.version = version
+        self.external_attributes = external_attributes
+        self.comment = comment
+        self.relative_offset = relative_offset
+
+
 class BuilderCallableContext(object):
-    done: bool = False
-    ctx: Optional[ZipContext] = None
-    folderPath: Optional[bytes] = None
+    __slots__ = (
+        "done",
+        "ctx",
+        "folderPath",
+    )
+
+    def __init__(self, done=False, ctx: Optional[ZipContext] = None, folderPath: Optional[bytes] = None) -> None:
+        self.done = done
+        self.ctx = ctx
+        self.folderPath = folderPath
 
     @property
     def is_folder(self) -> bool:
@@ -89,6 +130,125 @@ WalkNoCompressCallable = Callable[[AnyStr, AnyStr, stat_result], bool]
 WalkIgnoreCallable = Callable[[AnyStr, AnyStr, bool, stat_result], bool]
 
 
+def walk_entries(src: AnyStr, dest: AnyStr, compression=COMPRESSION_STORED,
+                 ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default) -> Generator[WalkEntry, None, None]:
+    """Generates the files and empty folders from src directory which are not ignored."""
+    src_abs = abspath(src)
+
+    for folder_abs, _, files in walk(src_abs, followlinks=False):
+        # Relative path
+        rel_path = relpath(folder_abs, src_abs)
+
+        # Create Folder
+        if len(files) == 0:
+            folder_stat = stat(folder_abs)
+
+            # On ignore skip
+            if ignore is not None and ignore(folder_abs, "", True, folder_stat):
+                continue
+
+            # Add folder
+            yield WalkEntry(folder_abs, join(dest, rel_path), True, folder_stat, COMPRESSION_STORED)
+
+            # Goto next
+            continue
+
+        # Write Files
+        for file in files:
+            # Absolute
+            file_abs = join(folder_abs, file)
+
+            # File extension
+            ext = splitext(file_abs)[1].lower()
+            file_stat = stat(file_abs)
+
+            # On ignore skip
+            if ignore is not None and ignore(file_abs, ext, False, file_stat):
+                continue
+
+            # Check if file needs to be compressed
+            file_compression = (
+                COMPRESSION_STORED
+                if no_compress is not None and no_compress(file_abs, ext, file_stat) else
+                compression
+            )
+
+            yield WalkEntry(file_abs, join(dest, rel_path, file), False, file_stat, file_compression)
+
+
+def read_paths(io: Union[BufferedIOBase, RawIOBase], separator=b"\n", buffer_size=65536) -> Generator[str, None, None]:
+    """Generates paths separated by separator such as newline or NUL from io. Paths are read lazily so memory does not grow with the list."""
+    read = getattr(io, "read1", io.read)
+    rest = b""
+
+    while True:
+        buf = read(buffer_size)
+        if not buf:
+            break
+
+        *paths, rest = (rest + buf).split(separator)
+
+        for path in paths:
+            # Lists written on Windows
+            if separator == b"\n":
+                path = path.rstrip(b"\r")
+
+            if path:
+                yield fsdecode(path)
+
+    if rest.rstrip(b"\r\n"):
+        yield fsdecode(rest.rstrip(b"\r\n") if separator == b"\n" else rest)
+
+
+def _list_dest(dest: str, path: str) -> str:
+    """Returns dest path of listed path. Drive, root and parent references are removed so entries stay under dest."""
+    parts = normpath(splitdrive(path)[1]).replace("\\", "/").split("/")
+    while parts and parts[0] in ("", ".", ".."):
+        del parts[0]
+
+    return join(dest, *parts)
+
+
+def list_entries(paths: Iterable[str], dest: str, compression=COMPRESSION_STORED,
+                 ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default,
+                 on_error: Optional[Callable[[str, OSError], None]] = None) -> Generator[WalkEntry, None, None]:
+    """Generates the listed files and folders which are not ignored. Folders are added without their contents.
+    Paths which can not be accessed are passed to on_error and skipped or raised if it is None."""
+    for path in paths:
+        try:
+            path_stat = stat(path)
+        except OSError as ex:
+            if on_error is None:
+                raise
+
+            on_error(path, ex)
+            continue
+
+        # Absolute
+        path_abs = abspath(path)
+        folder = S_ISDIR(path_stat.st_mode)
+
+        # File extension
+        ext = "" if folder else splitext(path_abs)[1].lower()
+
+        # On ignore skip
+        if ignore is not None and ignore(path_abs, ext, folder, path_stat):
+            continue
+
+        if folder:
+            yield WalkEntry(path_abs, _list_dest(dest, path), True, path_stat, COMPRESSION_STORED)
+            continue
+
+        # Check if file needs to be compressed
+        file_compression = (
+            COMPRESSION_STORED
+            if no_compress is not None and no_compress(path_abs, ext, path_stat) else
+            compression
+        )
+
+        yield WalkEntry(path_abs, _list_dest(dest, path), False, path_stat, file_compression)
+
+
 class ZipBuilder(object):
     __slots__ = (
         "buffer",
@@ -98,6 +258,9 @@ class ZipBuilder(object):
         "ctx",
         "offset",
         "callbacks",
+        "digests",
+        "manifest",
+        "metrics",
     )
 
     def __init__(self, buffer_size=65536, system=get_version_system(name)) -> None:
@@ -108,13 +271,17 @@ class ZipBuilder(object):
         self.ctx: Optional[ZipContext] = None
         self.offset: int = 0
         self.callbacks: Dict[BuilderCallable, Any] = {}
+        self.digests: Tuple[str, ...] = ()
+        self.manifest: List[bytes] = []
+        self.metrics: Optional["BuildMetrics"] = None
 
     def _clear_ctx(self) -> None:
         """Clear context."""
         self.ctx = None
 
-    def _new_file_ctx(self, path: AnyStr, io: Optional[Union[BufferedIOBase, RawIOBase]], utc_time: Optional[float], compression: int, comment: AnyStr) -> ZipContext:
-        """Adds file and returns generator which yields LocalFile header and data."""
+    def _new_file_ctx(self, path: AnyStr, io: Optional[Union[BufferedIOBase, RawIOBase]], utc_time: Optional[float], compression: int, comment: AnyStr,
+                      file_stat: Optional[stat_result] = None) -> ZipContext:
+        """Adds file and returns generator which yields LocalFile header and data. File attributes are taken from file_stat or io."""
         if self.ctx is not None:
             raise ValueError("File operation pending.")
 
@@ -138,7 +305,12 @@ class ZipBuilder(object):
         file_attr = (DEFAULT_EXTERNAL_ATTR, None,)
 
         # Try file attr from file
-        if io is not None:
+        if file_stat is not None:
+            file_attr = (
+                (file_stat.st_mode & 0xFFFF) << 16,  # File mode
+                file_stat.st_mtime,  # File modified time
+            )
+        elif io is not None:
             try:
                 file_stat = stat(io.fileno())
                 file_attr = (
@@ -161,11 +333,22 @@ class ZipBuilder(object):
         if extract_version >= self.version_extract:
             self.version_extract = extract_version
 
+        # Timed compressor and context only when metrics are enabled
+        compressor = get_compressor(compression)
+        compressor_ctx = CompressorContext(self.digests)
+        if self.metrics is not None:
+            from .metrics import TimedCompressor, TimedCompressorContext
+
+            entry = self.metrics.start_entry(path_bytes, compression)
+            if compression != COMPRESSION_STORED:
+                compressor = TimedCompressor(compressor, entry)
+            compressor_ctx = TimedCompressorContext(self.digests, entry)
+
         return ZipContext(
             path=path_bytes,
             compression=compression,
-            compressor=get_compressor(compression),
-            compressor_ctx=CompressorContext(),
+            compressor=compressor,
+            compressor_ctx=compressor_ctx,
             flag=FLAG_DEFAULT_LZMA_FILE if compression == COMPRESSION_LZMA else FLAG_DEFAULT_FILE,
             time=time,
             date=date,
@@ -185,7 +368,8 @@ class ZipBuilder(object):
         if self.ctx is None:
             raise ValueError("No current context.")
 
-        return self._write(pack_header_with_data(HEADER_LOCAL_FILE, LocalFile(
+        return self._write(STRUCT_LOCAL_FILE.pack(
+            HEADER_LOCAL_FILE[1],
             self.ctx.version,
             self.ctx.flag,
             self.ctx.compression,
@@ -196,42 +380,41 @@ class ZipBuilder(object):
             0,  # uncompressed size
             len(self.ctx.path),
             0  # extra len
-        ), self.ctx.path))
+        ) + self.ctx.path)
 
     def _write_data_descriptor(self) -> bytes:
         """Returns buffer containing DataDescriptor(64) header."""
         if self.ctx is None:
             raise ValueError("No current context.")
 
-        use_zip64 = self.ctx.compressor_ctx.compressed_size >= INT32_MAX
-        crc32 = self.ctx.compressor_ctx.crc32
-        comp_size = self.ctx.compressor_ctx.compressed_size
-        uncompsize = self.ctx.compressor_ctx.uncompressed_size
+        cctx = self.ctx.compressor_ctx
 
-        if use_zip64:
-            return self._write(pack_header(HEADER_DATA_DESCRIPTOR64, DataDescriptor64(crc32, comp_size, uncompsize)))
-        else:
-            return self._write(pack_header(HEADER_DATA_DESCRIPTOR64, DataDescriptor(crc32, comp_size, uncompsize)))
+        # Sizes are always 64-bit
+        return self._write(STRUCT_DATA_DESCRIPTOR64.pack(
+            HEADER_DATA_DESCRIPTOR64[1],
+            cctx.crc32,
+            cctx.compressed_size,
+            cctx.uncompressed_size,
+        ))
 
     def _write_end(self, comment: bytes) -> bytes:
         """Returns buffer containing End Of Central directory and zip64 headers if necessary."""
         try:
-            buf = bytearray()
             count = len(self.headers)
 
-            # Write all headers into bytearr
-            for header in self.headers.values():
-                buf += header
+            # All headers are joined once with end records
+            bufs = list(self.headers.values())
 
             # Check if offset past int32 max
-            size = len(buf)
+            size = sum(map(len, bufs))
             offset = self.offset + size
             use_zip64 = offset >= INT32_MAX or count >= 0xFFFF
 
             # Zip64 record and locator
             if use_zip64:
                 # Record
-                buf += pack_header(HEADER_CENTRAL_DIRECTORY_RECORD64, CentralDirectoryRecord64(
+                bufs.append(STRUCT_CENTRAL_DIRECTORY_RECORD64.pack(
+                    HEADER_CENTRAL_DIRECTORY_RECORD64[1],
                     SIZE_CENTRAL_DIRECTORY_RECORD64_REMAINING,
                     self.version_extract,
                     self.version_system,
@@ -245,14 +428,16 @@ class ZipBuilder(object):
                 ))
 
                 # Locator
-                buf += pack_header(HEADER_CENTRAL_DIRECTORY_LOCATOR64, CentralDirectoryLocator64(
+                bufs.append(STRUCT_CENTRAL_DIRECTORY_LOCATOR64.pack(
+                    HEADER_CENTRAL_DIRECTORY_LOCATOR64[1],
                     0,  # Disk number
                     offset,
                     1,  # Total disks
                 ))
 
             # End of Central Directory
-            buf += pack_header_with_data(HEADER_END_OF_CENTRAL_DIRECTORY, EndOfCentralDirectory(
+            bufs.append(STRUCT_END_OF_CENTRAL_DIRECTORY.pack(
+                HEADER_END_OF_CENTRAL_DIRECTORY[1],
                 0,  # Disk number
                 0,  # Disk start
                 0xFFFF if use_zip64 else count,
@@ -260,51 +445,91 @@ class ZipBuilder(object):
                 0xFFFFFFFF if use_zip64 else size,
                 0xFFFFFFFF if use_zip64 else self.offset,
                 len(comment),
-            ), comment)
+            ))
+            bufs.append(comment)
 
-            return bytes(buf)
+            return b"".join(bufs)
         finally:
             # Reset
             self.offset = 0
             self.headers.clear()
+            self.manifest.clear()
 
-    def _set_header(self) -> None:
-        """Sets headers key to context"s path which point to CentralDirectory bytes."""
-        if self.ctx is None:
-            raise ValueError("No current context.")
-
-        cctx = self.ctx.compressor_ctx
-        use_zip64 = cctx.compressed_size >= INT32_MAX or self.ctx.relative_offset >= INT32_MAX
+    def _set_central_directory(self, path: bytes, version: int, flag: int, compression: int, time: int, date: int, crc32: int,
+                               compressed_size: int, uncompressed_size: int, external_attributes: int, comment: bytes, relative_offset: int) -> None:
+        """Sets headers key to path which point to CentralDirectory bytes."""
+        use_zip64 = compressed_size >= INT32_MAX or relative_offset >= INT32_MAX
 
         # Extended information for zip64
-        extra = pack_header(TAG_EXTENDED_INFORMATION64, ExtendedInformation64(
+        extra = STRUCT_EXTENDED_INFORMATION64.pack(
+            TAG_EXTENDED_INFORMATION64[1],
             SIZE_EXTENDED_INFORMATION,  # Size of extended information.
-            cctx.uncompressed_size,
-            cctx.compressed_size,
-            self.ctx.relative_offset,
+            uncompressed_size,
+            compressed_size,
+            relative_offset,
             0,  # Disk start number
-        )) if use_zip64 else b""
+        ) if use_zip64 else b""
 
         # Store header bytes.
-        self.headers[self.ctx.path] = pack_header_with_data(HEADER_CENTRAL_DIRECTORY, CentralDirectory(
-            self.ctx.version,
+        self.headers[path] = STRUCT_CENTRAL_DIRECTORY.pack(
+            HEADER_CENTRAL_DIRECTORY[1],
+            version,
             self.version_system,
+            version,
+            flag,
+            compression,
+            time,
+            date,
+            crc32,
+            0xFFFFFFFF if use_zip64 else compressed_size,
+            0xFFFFFFFF if use_zip64 else uncompressed_size,
+            len(path),
+            len(extra),
+            len(comment),
+            0,  # Disk start
+            0,  # Internal Attributes
+            external_attributes,
+            0xFFFFFFFF if use_zip64 else relative_offset,
+        ) + path + extra + comment
+
+    def _add_manifest(self, path: bytes, size: int, crc32: int, digests: Dict[str, str]) -> None:
+        """Adds JSON line of file's size and digests into manifest."""
+        from json import dumps
+
+        self.manifest.append(dumps({
+            "path": path.decode("utf8", "replace"),
+            "size": size,
+            "crc32": f"{crc32:08x}",
+            **digests,
+        }).encode("utf8") + b"\n")
+
+    def _set_header(self) -> None:
+        """Sets headers key to context"s path which point to CentralDirectory bytes."""
+        if self.ctx is None:
+            raise ValueError("No current context.")
+
+        cctx = self.ctx.compressor_ctx
+        if self.metrics is not None:
+            from .metrics import TimedCompressorContext
+
+            if isinstance(cctx, TimedCompressorContext):
+                self.metrics.finish_entry(cctx.entry, cctx)
+        if self.digests:
+            self._add_manifest(self.ctx.path, cctx.uncompressed_size, cctx.crc32, cctx.hexdigests())
+        self._set_central_directory(
+            self.ctx.path,
             self.ctx.version,
             self.ctx.flag,
             self.ctx.compression,
             self.ctx.time,
             self.ctx.date,
             cctx.crc32,
-            0xFFFFFFFF if use_zip64 else cctx.compressed_size,
-            0xFFFFFFFF if use_zip64 else cctx.uncompressed_size,
-            len(self.ctx.path),
-            len(extra),
-            len(self.ctx.comment),
-            0,  # Disk start
-            0,  # Internal Attributes
+            cctx.compressed_size,
+            cctx.uncompressed_size,
             self.ctx.external_attributes,
-            0xFFFFFFFF if use_zip64 else self.ctx.relative_offset,
-        ), self.ctx.path, extra, self.ctx.comment)
+            self.ctx.comment,
+            self.ctx.relative_offset,
+        )
 
     def _call(self, done: bool = False, ctx: Optional[ZipContext] = None, folderPath: Optional[bytes] = None) -> None:
         """Calls builder's all callbacks."""
@@ -318,6 +543,131 @@ class ZipBuilder(object):
         """Adds callback for watching events."""
         self.callbacks[cb] = extra
 
+    def set_metrics(self, metrics: Optional["BuildMetrics"]) -> None:
+        """Sets metrics collected for files added after. Files are not timed when metrics is None."""
+        if self.ctx is not None:
+            raise ValueError("File operation pending.")
+
+        self.metrics = metrics
+
+    def set_digests(self, *digests: str) -> None:
+        """Sets hashlib digests calculated for files added after into manifest."""
+        from hashlib import new as new_hash
+
+        for digest in digests:
+            new_hash(digest)
+
+        self.digests = digests
+
+    def get_manifest(self) -> bytes:
+        """Returns JSON lines of path, size, crc32 and digests for all added files."""
+        return b"".join(self.manifest)
+
+    def get_index(self, fmt=INDEX_JSON) -> bytes:
+        """Returns JSON or binary index of header offset, data offset, sizes, compression and crc32 for all added files."""
+        from .index import get_index, pack_index
+
+        return pack_index(get_index(self.headers.values()), fmt)
+
+    def add_index(self, path: AnyStr = "INDEX.json", utc_time: Optional[float] = None, fmt=INDEX_JSON) -> Generator[bytes, None, None]:
+        """Adds the index of files added before as stored file and returns Generator of bytes object."""
+        for buf in self.add_buf(path, self.get_index(fmt), utc_time, COMPRESSION_STORED):
+            yield buf
+
+    def add_manifest(self, path: AnyStr = "MANIFEST.jsonl", utc_time: Optional[float] = None, compression=COMPRESSION_DEFLATED) -> Generator[bytes, None, None]:
+        """Adds the manifest of files added before and returns Generator of bytes object."""
+        manifest = self.get_manifest()
+        digests = self.digests
+
+        # Manifest is not part of itself
+        self.digests = ()
+        try:
+            for buf in self.add_buf(path, manifest, utc_time, compression):
+                yield buf
+        finally:
+            self.digests = digests
+
+    def _add_file_buf(self, path: AnyStr, buf: Union[bytes, bytearray, memoryview], file_stat: stat_result, utc_time: Optional[float], compression: int) -> Generator[bytes, None, None]:
+        """Adds the buffer read from file with file_stat and returns Generator of bytes object."""
+        # Create file context.
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, "", file_stat
+        )
+
+        # Yield file's header and content.
+        try:
+            self._call(done=False, ctx=self.ctx)
+            yield self._write_local_file()
+
+            for buf in compress_buf(self.ctx.compressor, self.ctx.compressor_ctx, buf, len(self.buffer)):
+                yield self._write(buf)
+
+            yield self._write_data_descriptor()
+        finally:
+            self._call(done=True, ctx=self.ctx)
+            self._set_header()
+            self._clear_ctx()
+
+    async def _add_file_buf_async(self, path: AnyStr, buf: Union[bytes, bytearray, memoryview], file_stat: stat_result, utc_time: Optional[float], compression: int) -> AsyncGenerator[bytes, None]:
+        """Adds the buffer read from file with file_stat and returns async Generator of bytes object. Buffer is compressed in the default executor."""
+        from asyncio import get_running_loop
+        loop = get_running_loop()
+
+        # Create file context.
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, "", file_stat
+        )
+
+        # Yield file's header and content.
+        try:
+            self._call(done=False, ctx=self.ctx)
+            yield self._write_local_file()
+
+            compressor, compressor_ctx = self.ctx.compressor, self.ctx.compressor_ctx
+            cbufs = await loop.run_in_executor(None, lambda: list(compress_buf(compressor, compressor_ctx, buf, len(self.buffer))))
+
+            for cbuf in cbufs:
+                yield self._write(cbuf)
+
+            yield self._write_data_descriptor()
+        finally:
+            self._call(done=True, ctx=self.ctx)
+            self._set_header()
+            self._clear_ctx()
+
+    def _set_compressed(self, ddata: "DedupData") -> None:
+        """Sets context's compressor context values from already compressed data."""
+        if self.ctx is None:
+            raise ValueError("No current context.")
+
+        cctx = self.ctx.compressor_ctx
+        cctx.crc32 = ddata.crc32
+        cctx.compressed_size = len(ddata.data)
+        cctx.uncompressed_size = ddata.uncompressed_size
+        cctx.hashes = ddata.hashes
+
+    def _add_file_compressed(self, path: AnyStr, ddata: "DedupData", file_stat: stat_result, utc_time: Optional[float], compression: int) -> Generator[bytes, None, None]:
+        """Adds the already compressed data of file with file_stat and returns Generator of bytes object."""
+        # Create file context.
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, "", file_stat
+        )
+
+        # Yield file's header and content.
+        try:
+            self._call(done=False, ctx=self.ctx)
+            yield self._write_local_file()
+
+            self._set_compressed(ddata)
+            if len(ddata.data) != 0:
+                yield self._write(ddata.data)
+
+            yield self._write_data_descriptor()
+        finally:
+            self._call(done=True, ctx=self.ctx)
+            self._set_header()
+            self._clear_ctx()
+
     def add_buf(self, path: AnyStr, buf: Union[bytes, bytearray, memoryview], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> Generator[bytes, None, None]:
         """Adds the buffer and returns Generator of bytes object."""
         # Create file context.
@@ -339,8 +689,10 @@ class ZipBuilder(object):
             self._set_header()
             self._clear_ctx()
 
-    def add_io(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> Generator[bytes, None, None]:
-        """Adds the io and returns Generator of bytes object."""
+    def add_io(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", pipelined=False,
+               use_mmap=False) -> Generator[bytes, None, None]:
+        """Adds the io and returns Generator of bytes object. Pipelined reads and calculates CRC32 on separate threads.
+        use_mmap maps large regular files which must not be truncated while added."""
         with io:
             # Create file context.
             self.ctx = self._new_file_ctx(
@@ -352,8 +704,17 @@ class ZipBuilder(object):
                 self._call(done=False, ctx=self.ctx)
                 yield self._write_local_file()
 
-                for buf in compress_io(self.ctx.compressor, self.ctx.compressor_ctx, io, self.buffer):
-                    yield self._write(buf)
+                if pipelined:
+                    from .pipeline import compress_io_pipelined
+                    io_gen = compress_io_pipelined(self.ctx.compressor, self.ctx.compressor_ctx, io, len(self.buffer))
+                else:
+                    io_gen = compress_io(self.ctx.compressor, self.ctx.compressor_ctx, io, self.buffer, use_mmap)
+
+                try:
+                    for buf in io_gen:
+                        yield self._write(buf)
+                finally:
+                    io_gen.close()
 
                 yield self._write_data_descriptor()
             finally:
@@ -361,8 +722,123 @@ class ZipBuilder(object):
                 self._set_header()
                 self._clear_ctx()
 
-    async def add_io_async(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> AsyncGenerator[bytes, None]:
-        """Adds the io and returns async Generator of bytes object."""
+    def _bufs_into(self, writer: "MemoryWriter", items: Iterable[Tuple[AnyStr, Union[bytes, bytearray, memoryview], Optional[float]]],
+                   compression: int, batch_size: int) -> Generator[None, None, None]:
+        """Packs headers and data of buffers directly into writer. Yields when batch_size bytes have been written unless it is 0."""
+        # Shared values for all files
+        flag = FLAG_DEFAULT_LZMA_FILE if compression == COMPRESSION_LZMA else FLAG_DEFAULT_FILE
+        version = get_extract_version(compression, False)
+        now = dos_time()
+
+        if version >= self.version_extract:
+            self.version_extract = version
+
+        for path, buf, utc_time in items:
+            # Path
+            path_bytes = norm_path(path, False)
+            if path_bytes in self.headers:
+                raise ValueError("Path already in headers.")
+
+            # Time and date
+            time, date = now if utc_time is None else dos_time_cached(utc_time)
+
+            # Compress
+            cbuf: Union[bytes, bytearray, memoryview]
+            if compression == COMPRESSION_STORED:
+                cbuf = buf
+            elif compression == COMPRESSION_DEFLATED:
+                compressor = compressobj(4, 8, -15, 9)
+                cbuf = compressor.compress(buf) + compressor.flush()
+            else:
+                compressor = get_compressor(compression)
+                cbuf = compressor.compress(buf) + compressor.flush()
+
+            crc = crc32(buf) & 0xFFFFFFFF
+            offset = self.offset
+            start = writer.size
+
+            # LocalFile, data and DataDescriptor
+            writer.pack(
+                STRUCT_LOCAL_FILE,
+                HEADER_LOCAL_FILE[1],
+                version,
+                flag,
+                compression,
+                time,
+                date,
+                0,  # crc32
+                0,  # compressed size
+                0,  # uncompressed size
+                len(path_bytes),
+                0,  # extra len
+                data=path_bytes,
+            )
+            writer.write(cbuf)
+            writer.pack(STRUCT_DATA_DESCRIPTOR64, HEADER_DATA_DESCRIPTOR64[1], crc, len(cbuf), len(buf))
+            self.offset += writer.size - start
+
+            self._set_central_directory(
+                path_bytes, version, flag, compression, time, date, crc, len(cbuf), len(buf),
+                DEFAULT_EXTERNAL_ATTR, b"", offset,
+            )
+
+            if self.digests:
+                from hashlib import new as new_hash
+                self._add_manifest(path_bytes, len(buf), crc, {
+                    digest: new_hash(digest, buf).hexdigest() for digest in self.digests
+                })
+
+            # Batch full
+            if batch_size != 0 and writer.size >= batch_size:
+                yield
+
+    def add_bufs(self, items: Iterable[Tuple[AnyStr, Union[bytes, bytearray, memoryview], Optional[float]]], compression=COMPRESSION_STORED) -> Generator[bytes, None, None]:
+        """Adds small buffers of (path, buf, utc_time) items in batches and returns Generator of bytes object."""
+        if self.ctx is not None:
+            raise ValueError("File operation pending.")
+
+        # Callbacks and metrics require context for each file
+        if self.callbacks or self.metrics is not None:
+            for path, buf, utc_time in items:
+                for cbuf in self.add_buf(path, buf, utc_time, compression):
+                    yield cbuf
+            return
+
+        from .memory import MemoryWriter
+
+        batch_size = len(self.buffer)
+        batch = MemoryWriter(batch_size * 2)
+
+        # Yield full batch
+        try:
+            for _ in self._bufs_into(batch, items, compression, batch_size):
+                yield batch.detach()
+        except Exception:
+            # Items before the rejected one are already in headers so their data must be yielded
+            if batch.size != 0:
+                yield batch.detach()
+            raise
+
+        # Yield remaining
+        if batch.size != 0:
+            yield batch.detach()
+
+    def write_bufs_into(self, writer: "MemoryWriter", items: Iterable[Tuple[AnyStr, Union[bytes, bytearray, memoryview], Optional[float]]], compression=COMPRESSION_STORED) -> None:
+        """Writes small buffers of (path, buf, utc_time) items directly into writer's buffer."""
+        if self.ctx is not None:
+            raise ValueError("File operation pending.")
+
+        # Callbacks and metrics require context for each file
+        if self.callbacks or self.metrics is not None:
+            for path, buf, utc_time in items:
+                self.write_buf_to(writer.write, path, buf, utc_time, compression)
+            return
+
+        for _ in self._bufs_into(writer, items, compression, 0):
+            pass
+
+    async def add_io_async(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", pipelined=False) -> AsyncGenerator[bytes, None]:
+        """Adds the io and returns async Generator of bytes object. Pipelined reads and calculates CRC32 on separate threads."""
         with io:
             # Create file context.
             self.ctx = self._new_file_ctx(
@@ -374,8 +850,12 @@ class ZipBuilder(object):
                 self._call(done=False, ctx=self.ctx)
                 yield self._write_local_file()
 
-                async for buf in compress_io_async(self.ctx.compressor, self.ctx.compressor_ctx, io, self.buffer):
-                    yield self._write(buf)
+                io_gen = compress_io_async(self.ctx.compressor, self.ctx.compressor_ctx, io, self.buffer, pipelined)
+                try:
+                    async for buf in io_gen:
+                        yield self._write(buf)
+                finally:
+                    await io_gen.aclose()
 
                 yield self._write_data_descriptor()
             finally:
@@ -403,6 +883,93 @@ class ZipBuilder(object):
             self._set_header()
             self._clear_ctx()
 
+    def _write_file_to(self, sink: CompressorSink, write: Callable[[CompressorBase, CompressorContext], None]) -> None:
+        """Writes current context's file header, content written by write and data descriptor to sink."""
+        if self.ctx is None:
+            raise ValueError("No current context.")
+
+        try:
+            self._call(done=False, ctx=self.ctx)
+            sink(self._write_local_file())
+
+            cctx = self.ctx.compressor_ctx
+            try:
+                write(self.ctx.compressor, cctx)
+            finally:
+                self.offset += cctx.compressed_size
+
+            sink(self._write_data_descriptor())
+        finally:
+            self._call(done=True, ctx=self.ctx)
+            self._set_header()
+            self._clear_ctx()
+
+    def _write_file_buf_to(self, sink: CompressorSink, path: AnyStr, buf: Union[bytes, bytearray, memoryview], file_stat: stat_result, utc_time: Optional[float], compression: int) -> None:
+        """Writes the buffer read from file with file_stat to sink."""
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, "", file_stat
+        )
+
+        buf_size = len(self.buffer)
+        self._write_file_to(sink, lambda compressor, cctx: compress_buf_to(
+            compressor, cctx, buf, buf_size, sink
+        ))
+
+    def _write_file_compressed_to(self, sink: CompressorSink, path: AnyStr, ddata: "DedupData", file_stat: stat_result, utc_time: Optional[float], compression: int) -> None:
+        """Writes the already compressed data of file with file_stat to sink."""
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, "", file_stat
+        )
+
+        def write(compressor: CompressorBase, cctx: CompressorContext) -> None:
+            self._set_compressed(ddata)
+            if len(ddata.data) != 0:
+                sink(ddata.data)
+
+        self._write_file_to(sink, write)
+
+    def write_buf_to(self, sink: CompressorSink, path: AnyStr, buf: Union[bytes, bytearray, memoryview], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
+        """Writes the buffer to sink."""
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, comment
+        )
+
+        buf_size = len(self.buffer)
+        self._write_file_to(sink, lambda compressor, cctx: compress_buf_to(
+            compressor, cctx, buf, buf_size, sink
+        ))
+
+    def write_io_to(self, sink: CompressorSink, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", pipelined=False,
+                    use_mmap=False) -> None:
+        """Writes the io to sink. Pipelined reads and calculates CRC32 on separate threads.
+        use_mmap maps large regular files which must not be truncated while written."""
+        with io:
+            self.ctx = self._new_file_ctx(
+                path, io, utc_time, compression, comment
+            )
+
+            if pipelined:
+                from .pipeline import compress_io_pipelined_to
+
+                buffer_size = len(self.buffer)
+                self._write_file_to(sink, lambda compressor, cctx: compress_io_pipelined_to(
+                    compressor, cctx, io, buffer_size, sink
+                ))
+            else:
+                self._write_file_to(sink, lambda compressor, cctx: compress_io_to(
+                    compressor, cctx, io, self.buffer, sink, use_mmap
+                ))
+
+    def write_gen_to(self, sink: CompressorSink, path: AnyStr, gen: Generator[bytes, None, None], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
+        """Writes the generator to sink."""
+        self.ctx = self._new_file_ctx(
+            path, None, utc_time, compression, comment
+        )
+
+        self._write_file_to(sink, lambda compressor, cctx: compress_gen_to(
+            compressor, cctx, gen, sink
+        ))
+
     async def add_gen_async(self, path: AnyStr, gen: AsyncGenerator[bytes, None], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> AsyncGenerator[bytes, None]:
         """Adds the async generator and returns async Generator of bytes object."""
         self.ctx = self._new_file_ctx(
@@ -423,7 +990,7 @@ class ZipBuilder(object):
             self._set_header()
             self._clear_ctx()
 
-    async def add_stream_async(self, path: AnyStr, reader: StreamReader, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", buf_size=4096) -> AsyncGenerator[bytes, None]:
+    async def add_stream_async(self, path: AnyStr, reader: "StreamReader", utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", buf_size=4096) -> AsyncGenerator[bytes, None]:
         """Adds the stream and returns async Generator of bytes object."""
         # Create file context.
         self.ctx = self._new_file_ctx(
@@ -467,7 +1034,8 @@ class ZipBuilder(object):
         use_zip64 = offset >= INT32_MAX
 
         # LocalFile
-        buf = self._write(pack_header_with_data(HEADER_LOCAL_FILE, LocalFile(
+        buf = self._write(STRUCT_LOCAL_FILE.pack(
+            HEADER_LOCAL_FILE[1],
             self.version_extract,
             0,  # Flag
             0,  # Compression
@@ -478,19 +1046,21 @@ class ZipBuilder(object):
             0,  # Uncompressed size
             len(path_bytes),
             0,  # Len extra
-        ), path_bytes))
+        ) + path_bytes)
 
         # Extended information for zip64
-        extra = pack_header(TAG_EXTENDED_INFORMATION64, ExtendedInformation64(
+        extra = STRUCT_EXTENDED_INFORMATION64.pack(
+            TAG_EXTENDED_INFORMATION64[1],
             SIZE_EXTENDED_INFORMATION,  # Size of extended information.
             0,
             0,
             offset,
             0,  # Disk start number
-        )) if use_zip64 else b""
+        ) if use_zip64 else b""
 
         # CentralDirectory
-        self.headers[path_bytes] = pack_header_with_data(HEADER_CENTRAL_DIRECTORY, CentralDirectory(
+        self.headers[path_bytes] = STRUCT_CENTRAL_DIRECTORY.pack(
+            HEADER_CENTRAL_DIRECTORY[1],
             self.version_extract,
             self.version_system,
             self.version_extract,
@@ -508,111 +1078,161 @@ class ZipBuilder(object):
             0,  # Internal attr
             DEFAULT_EXTERNAL_DIR_ATTR,  # External attr
             0xFFFFFFFF if use_zip64 else offset,
-        ), path_bytes, extra, comment_bytes,)
+        ) + path_bytes + extra + comment_bytes
 
         self._call(done=True, folderPath=path_bytes)
 
+        if self.metrics is not None:
+            self.metrics.folders += 1
+
         return buf
 
-    def walk(self, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
-             ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default) -> Generator[bytes, None, None]:
-        """Generates the file headers and contents from src directory."""
-        src_abs = abspath(src)
-
-        for folder_abs, _, files in walk(src_abs, followlinks=False):
-            # Relative path
-            rel_path = relpath(folder_abs, src_abs)
-
-            # Create Folder
-            if len(files) == 0:
-                # On ignore skip
-                if ignore is not None and ignore(folder_abs, "", True, stat(folder_abs)):
-                    continue
+    def get_template(self, data: Union[bytes, bytearray, memoryview]) -> "ZipTemplate":
+        """Returns template of all files added before. Data has to be all bytes generated by the builder."""
+        if self.ctx is not None:
+            raise ValueError("File operation pending.")
 
-                # Add folder
-                dest_path = join(dest, rel_path)
-                yield self.add_folder(dest_path, utc_time)
+        if len(data) != self.offset:
+            raise ValueError("Data has to be all generated bytes.")
 
-                # Goto next
-                continue
+        from .template import ZipTemplate
+
+        return ZipTemplate(bytes(data), dict(self.headers), self.manifest, self.version_extract)
 
-            # Write Files
-            for file in files:
-                # Absolute
-                file_abs = join(folder_abs, file)
+    def add_template(self, template: "ZipTemplate") -> bytes:
+        """Adds files of the template at current offset and returns template data."""
+        if self.ctx is not None:
+            raise ValueError("File operation pending.")
 
-                # File extension
-                ext = splitext(file_abs)[1].lower()
-                file_stat = stat(file_abs)
+        for path in template.headers:
+            if path in self.headers:
+                raise ValueError("Path already in headers.")
 
-                # On ignore skip
-                if ignore is not None and ignore(file_abs, ext, False, file_stat):
-                    continue
+        from .template import relocate_central_directory
 
-                # Check if file needs to be compressed
-                file_compression = (
-                    COMPRESSION_STORED
-                    if no_compress is not None and no_compress(file_abs, ext, file_stat) else
-                    compression
-                )
+        # Headers relative to current offset
+        for path, header in template.headers.items():
+            self.headers[path] = relocate_central_directory(header, self.offset)
 
-                # Open file
-                fs = cast(RawIOBase, open(file_abs, "rb", buffering=False))
+        self.manifest += template.manifest
 
-                # Yield file contents
-                dest_path = join(dest, rel_path, file)
-                for buf in self.add_io(dest_path, fs, utc_time, file_compression):
+        if template.version_extract >= self.version_extract:
+            self.version_extract = template.version_extract
+
+        return self._write(template.data)
+
+    def _filter_entries(self, entries: Iterable[WalkEntry], skip_existing: bool) -> Iterable[WalkEntry]:
+        """Returns entries without the ones already in headers if skip_existing is true."""
+        if not skip_existing:
+            return entries
+
+        return (entry for entry in entries if norm_path(entry.dest, entry.folder) not in self.headers)
+
+    def add_entries(self, entries: Iterable[WalkEntry], utc_time: Optional[float] = None, prefetch=0, dedup: Optional["DedupCache"] = None,
+                    skip_existing=False) -> Generator[bytes, None, None]:
+        """Generates the file headers and contents of walk entries. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        for entry, data in prefetch_entries(self._filter_entries(entries, skip_existing), prefetch):
+            if entry.folder:
+                yield self.add_folder(entry.dest, utc_time)
+                continue
+
+            # Yield deduplicated file contents
+            ddata = dedup.get(entry, data and data.result(), len(self.buffer), self.digests) if dedup is not None else None
+            if ddata is not None:
+                for buf in self._add_file_compressed(entry.dest, ddata, entry.stat, utc_time, entry.compression):
                     yield buf
+                continue
 
-    async def walk_async(self, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
-                         ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default) -> AsyncGenerator[bytes, None]:
-        """Generates the file headers and contents from src directory asyncnorously."""
-        src_abs = abspath(src)
+            # Yield prefetched file contents
+            if data is not None:
+                for buf in self._add_file_buf(entry.dest, data.result(), entry.stat, utc_time, entry.compression):
+                    yield buf
+                continue
 
-        for folder_abs, _, files in walk(src_abs, followlinks=False):
-            # Relative path
-            rel_path = relpath(folder_abs, src_abs)
+            # Open file
+            fs = cast(RawIOBase, open(entry.src, "rb", buffering=False))
 
-            # Create Folder
-            if len(files) == 0:
-                # On ignore skip
-                if ignore is not None and ignore(folder_abs, "", True, stat(folder_abs)):
-                    continue
+            # Yield file contents
+            for buf in self.add_io(entry.dest, fs, utc_time, entry.compression):
+                yield buf
+
+    def write_entries_to(self, sink: CompressorSink, entries: Iterable[WalkEntry], utc_time: Optional[float] = None, prefetch=0, dedup: Optional["DedupCache"] = None,
+                         skip_existing=False) -> None:
+        """Writes the file headers and contents of walk entries to sink. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        for entry, data in prefetch_entries(self._filter_entries(entries, skip_existing), prefetch):
+            if entry.folder:
+                sink(self.add_folder(entry.dest, utc_time))
+                continue
 
-                # Add folder
-                dest_path = join(dest, rel_path)
-                yield self.add_folder(dest_path, utc_time)
+            # Write deduplicated file contents
+            ddata = dedup.get(entry, data and data.result(), len(self.buffer), self.digests) if dedup is not None else None
+            if ddata is not None:
+                self._write_file_compressed_to(sink, entry.dest, ddata, entry.stat, utc_time, entry.compression)
+                continue
 
-                # Goto next
+            # Write prefetched file contents
+            if data is not None:
+                self._write_file_buf_to(sink, entry.dest, data.result(), entry.stat, utc_time, entry.compression)
                 continue
 
-            # Write Files
-            for file in files:
-                # Absolute
-                file_abs = join(folder_abs, file)
+            # Open file
+            fs = cast(RawIOBase, open(entry.src, "rb", buffering=False))
 
-                # File extension
-                ext = splitext(file_abs)[1].lower()
-                file_stat = stat(file_abs)
+            # Write file contents
+            self.write_io_to(sink, entry.dest, fs, utc_time, entry.compression)
 
-                # On ignore skip
-                if ignore is not None and ignore(file_abs, ext, False, file_stat):
-                    continue
+    async def add_entries_async(self, entries: Iterable[WalkEntry], utc_time: Optional[float] = None, prefetch=0, dedup: Optional["DedupCache"] = None,
+                                skip_existing=False) -> AsyncGenerator[bytes, None]:
+        """Generates the file headers and contents of walk entries asyncnorously. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        from asyncio import get_running_loop, wrap_future
+        loop = get_running_loop()
+
+        for entry, data in prefetch_entries(self._filter_entries(entries, skip_existing), prefetch):
+            if entry.folder:
+                yield self.add_folder(entry.dest, utc_time)
+                continue
 
-                # Check if file needs to be compressed
-                file_compression = (
-                    COMPRESSION_STORED
-                    if no_compress is not None and no_compress(file_abs, ext, file_stat) else
-                    compression
+            # Yield deduplicated file contents
+            if dedup is not None:
+                ddata = await loop.run_in_executor(
+                    None, dedup.get, entry, data and await wrap_future(data), len(self.buffer), self.digests
                 )
 
-                # Open file
-                fs = cast(RawIOBase, open(file_abs, "rb", buffering=False))
+                if ddata is not None:
+                    for buf in self._add_file_compressed(entry.dest, ddata, entry.stat, utc_time, entry.compression):
+                        yield buf
+                    continue
 
-                # Yield file contents
-                dest_path = join(dest, rel_path, file)
-                async for buf in self.add_io_async(dest_path, fs, utc_time, file_compression):
+            # Yield prefetched file contents
+            if data is not None:
+                async for buf in self._add_file_buf_async(entry.dest, await wrap_future(data), entry.stat, utc_time, entry.compression):
                     yield buf
+                continue
+
+            # Open file
+            fs = cast(RawIOBase, open(entry.src, "rb", buffering=False))
+
+            # Yield file contents
+            async for buf in self.add_io_async(entry.dest, fs, utc_time, entry.compression):
+                yield buf
+
+    def walk(self, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
+             ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default, prefetch=0,
+             dedup: Optional["DedupCache"] = None, skip_existing=False) -> Generator[bytes, None, None]:
+        """Generates the file headers and contents from src directory. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        return self.add_entries(walk_entries(src, dest, compression, ignore, no_compress), utc_time, prefetch, dedup, skip_existing)
+
+    def walk_to(self, sink: CompressorSink, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
+                ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default, prefetch=0,
+                dedup: Optional["DedupCache"] = None, skip_existing=False) -> None:
+        """Writes the file headers and contents from src directory to sink. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        self.write_entries_to(sink, walk_entries(src, dest, compression, ignore, no_compress), utc_time, prefetch, dedup, skip_existing)
+
+    def walk_async(self, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
+                   ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default, prefetch=0,
+                   dedup: Optional["DedupCache"] = None, skip_existing=False) -> AsyncGenerator[bytes, None]:
+        """Generates the file headers and contents from src directory asyncnorously. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        return self.add_entries_async(walk_entries(src, dest, compression, ignore, no_compress), utc_time, prefetch, dedup, skip_existing)
 
     def end(self, comment: AnyStr = None) -> bytes:
         """Returns EOCD bytes which contains headers for all added files."""
@@ -625,4 +1245,7 @@ class ZipBuilder(object):
         else:
             raise ValueError("Comment has to be bytes, bytearray or str.")
 
+        if self.metrics is not None:
+            self.metrics.stop()
+
         return self._write_end(comment_bytes)
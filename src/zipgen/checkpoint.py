@@ -0,0 +1,153 @@
+from itertools import islice
+from os import fsync
+from struct import calcsize, pack, unpack_from
+from time import monotonic
+from typing import IO, Dict, List, Optional, Tuple
+
+from .build import ZipBuilder
+from .constant import CHECKPOINT_ENTRIES, CHECKPOINT_INTERVAL, HEADER_CENTRAL_DIRECTORY
+
+
+__all__ = (
+    "Checkpoint",
+)
+
+
+# Checkpoint frames.
+FRAME = b"<BI"
+FRAME_HEADER = 1
+FRAME_MANIFEST = 2
+FRAME_COMMIT = 3
+FRAME_COMMIT_DATA = b"<QHQ"
+
+SIZE_FRAME = calcsize(FRAME)
+SIZE_CENTRAL_DIRECTORY = calcsize(HEADER_CENTRAL_DIRECTORY[0])
+
+
+def _header_path(header: bytes) -> bytes:
+    """Returns path of CentralDirectory bytes."""
+    len_path = unpack_from(b"<H", header, 28)[0]
+    return header[SIZE_CENTRAL_DIRECTORY:SIZE_CENTRAL_DIRECTORY+len_path]
+
+
+class Checkpoint(object):
+    __slots__ = (
+        "path",
+        "entries",
+        "interval",
+        "file",
+        "headers_count",
+        "manifest_count",
+        "time",
+    )
+
+    def __init__(self, path: str, entries=CHECKPOINT_ENTRIES, interval=CHECKPOINT_INTERVAL) -> None:
+        self.path = path
+        self.entries = entries
+        self.interval = interval
+        self.file: Optional[IO[bytes]] = None
+        self.headers_count = 0
+        self.manifest_count = 0
+        self.time = monotonic()
+
+    def _open(self) -> IO[bytes]:
+        """Opens checkpoint file for appending."""
+        if self.file is None:
+            self.file = open(self.path, "ab")
+
+        return self.file
+
+    def close(self) -> None:
+        """Closes checkpoint file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def due(self, builder: ZipBuilder) -> bool:
+        """Returns true if entries have been added or interval has passed since last save."""
+        return len(builder.headers) - self.headers_count >= self.entries or monotonic() - self.time >= self.interval
+
+    def save(self, builder: ZipBuilder, offset: int) -> None:
+        """Durably appends completed entries of builder and offset where they end."""
+        frames = bytearray()
+
+        # Central directory headers
+        for header in islice(builder.headers.values(), self.headers_count, None):
+            frames += pack(FRAME, FRAME_HEADER, len(header))
+            frames += header
+
+        # Manifest lines
+        for line in builder.manifest[self.manifest_count:]:
+            frames += pack(FRAME, FRAME_MANIFEST, len(line))
+            frames += line
+
+        # Commit
+        frames += pack(FRAME, FRAME_COMMIT, calcsize(FRAME_COMMIT_DATA))
+        frames += pack(FRAME_COMMIT_DATA, offset, builder.version_extract, len(builder.headers))
+
+        file = self._open()
+        file.write(frames)
+        file.flush()
+        fsync(file.fileno())
+
+        self.headers_count = len(builder.headers)
+        self.manifest_count = len(builder.manifest)
+        self.time = monotonic()
+
+    def load(self, builder: ZipBuilder) -> int:
+        """Restores builder to last saved entries and returns offset where they end."""
+        self.close()
+
+        headers: Dict[bytes, bytes] = {}
+        manifest: List[bytes] = []
+        committed: Tuple[int, int, int, int, int] = (0, builder.version_extract, 0, 0, 0)
+
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            data = b""
+
+        pos = 0
+        while pos + SIZE_FRAME <= len(data):
+            frame, size = unpack_from(FRAME, data, pos)
+            payload = data[pos+SIZE_FRAME:pos+SIZE_FRAME+size]
+            pos += SIZE_FRAME + size
+
+            # Incomplete frame
+            if len(payload) != size:
+                break
+
+            if frame == FRAME_HEADER:
+                headers[_header_path(payload)] = payload
+            elif frame == FRAME_MANIFEST:
+                manifest.append(payload)
+            elif frame == FRAME_COMMIT:
+                offset, version_extract, count = unpack_from(FRAME_COMMIT_DATA, payload)
+                if count != len(headers):
+                    raise ValueError("Checkpoint is corrupted.")
+
+                committed = (offset, version_extract, count, len(manifest), pos,)
+            else:
+                raise ValueError("Checkpoint is corrupted.")
+
+        offset, version_extract, headers_count, manifest_count, end = committed
+
+        # Entries after last commit were not saved
+        for path in list(headers)[headers_count:]:
+            del headers[path]
+
+        builder.headers = headers
+        builder.manifest = manifest[:manifest_count]
+        builder.offset = offset
+        builder.version_extract = version_extract
+
+        # Drop uncommitted frames
+        with open(self.path, "ab") as file:
+            file.truncate(end)
+
+        self.headers_count = headers_count
+        self.manifest_count = manifest_count
+        self.time = monotonic()
+
+        return offset
@@ -1,11 +1,14 @@
-from asyncio import get_running_loop, StreamReader
-from io import BufferedIOBase, RawIOBase
+from io import BufferedIOBase, BytesIO, RawIOBase, UnsupportedOperation, SEEK_END
+from os import fstat
+from stat import S_ISREG
 from zlib import compressobj, crc32
-from bz2 import BZ2Compressor
-from lzma import LZMACompressor, FORMAT_RAW
-from typing import AsyncGenerator, Generator, Optional, Union, cast
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Dict, Generator, Iterable, Optional, Union
 
-from .constant import COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA, CREATE_BZIP2, CREATE_DEFAULT, CREATE_LZMA, CREATE_ZIP64
+from .constant import COMPRESSION_STORED, COMPRESSION_DEFLATED, COMPRESSION_BZIP2, COMPRESSION_LZMA, CREATE_BZIP2, CREATE_DEFAULT, CREATE_LZMA, CREATE_ZIP64, MMAP_MIN_SIZE
+
+if TYPE_CHECKING:
+    from asyncio import StreamReader
+    from mmap import mmap
 
 
 __all__ = (
@@ -17,10 +20,15 @@ __all__ = (
     "get_compressor",
     "get_extract_version",
     "CompressorContext",
+    "CompressorSink",
+    "read_io_views",
     "compress_buf",
+    "compress_buf_to",
     "compress_io",
+    "compress_io_to",
     "compress_io_async",
     "compress_gen",
+    "compress_gen_to",
     "compress_gen_async",
     "compress_stream_async",
 )
@@ -69,6 +77,8 @@ class CompressorBZ2(CompressorBase):
     __slots__ = ("compressor",)
 
     def __init__(self) -> None:
+        # Codec is imported on first use to keep import of zipgen fast
+        from bz2 import BZ2Compressor
         self.compressor = BZ2Compressor()
 
     def compress(self, data: bytes) -> bytes:
@@ -84,10 +94,11 @@ class CompressorLZMA(CompressorBase):
     __slots__ = ("compressor",)
 
     def __init__(self) -> None:
-        self.compressor: Optional[LZMACompressor] = None
+        self.compressor: Optional[Any] = None
 
     def _init(self) -> bytes:
         """Initializes compressor with encode and decode props."""
+        from lzma import LZMACompressor, FORMAT_RAW
         self.compressor = LZMACompressor(FORMAT_RAW, filters=[
             {"id": 4611686018427387905, "lc": 3,
              "lp": 0, "pb": 2, "dict_size": 8388608}
@@ -98,13 +109,13 @@ class CompressorLZMA(CompressorBase):
     def compress(self, data: bytes) -> bytes:
         """Returns LZMA compressed data."""
         if self.compressor is None:
-            return self._init() + cast(LZMACompressor, self.compressor).compress(data)
+            return self._init() + self.compressor.compress(data)
         return self.compressor.compress(data)
 
     def flush(self) -> bytes:
         """Returns remaning data."""
         if self.compressor is None:
-            return self._init() + cast(LZMACompressor, self.compressor).flush()
+            return self._init() + self.compressor.flush()
         return self.compressor.flush()
 
 
@@ -139,23 +150,112 @@ class CompressorContext(object):
         "crc32",
         "compressed_size",
         "uncompressed_size",
+        "hashes",
     )
 
-    def __init__(self) -> None:
+    def __init__(self, digests: Iterable[str] = ()) -> None:
         self.crc32 = 0
         self.compressed_size = 0
         self.uncompressed_size = 0
+        self.hashes: Dict[str, Any] = {}
+
+        if digests:
+            from hashlib import new as new_hash
+            self.hashes = {name: new_hash(name) for name in digests}
 
     def update(self, rbuf: bytes, cbuf: bytes) -> None:
         """Updates context values."""
-        self.crc32 = crc32(rbuf, self.crc32) & 0xFFFFFFFF
+        self.update_checks(rbuf)
         self.compressed_size += len(cbuf)
         self.uncompressed_size += len(rbuf)
 
+    def update_checks(self, rbuf: bytes) -> None:
+        """Updates CRC32 and extra digests with uncompressed data. Pipelined io calls this on its own thread."""
+        self.crc32 = crc32(rbuf, self.crc32) & 0xFFFFFFFF
+
+        if self.hashes:
+            self.update_hashes(rbuf)
+
+    def update_hashes(self, rbuf: bytes) -> None:
+        """Updates extra digests with uncompressed data."""
+        for value in self.hashes.values():
+            value.update(rbuf)
+
+    def hexdigests(self) -> Dict[str, str]:
+        """Returns extra digests of uncompressed data."""
+        return {name: value.hexdigest() for name, value in self.hashes.items()}
+
     def flush(self, buf: bytes) -> None:
         """Update compressed size with flushed buffer."""
         self.compressed_size += len(buf)
 
+    def read_views(self, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray], use_mmap=False) -> Generator[memoryview, None, None]:
+        """Returns views of io's remaining data."""
+        return read_io_views(io, buffer, use_mmap)
+
+
+# Sink receiving compressed data. Memoryviews are only valid during the call.
+CompressorSink = Callable[[Union[bytes, memoryview]], Any]
+
+
+def _mmap_io(io: Union[BufferedIOBase, RawIOBase]) -> Optional["mmap"]:
+    """Returns read only mapping of io if it is a regular file of at least MMAP_MIN_SIZE bytes."""
+    try:
+        fd = io.fileno()
+    except (AttributeError, UnsupportedOperation):
+        return None
+
+    io_stat = fstat(fd)
+    if not S_ISREG(io_stat.st_mode) or io_stat.st_size < MMAP_MIN_SIZE:
+        return None
+
+    from mmap import mmap, ACCESS_READ
+
+    try:
+        return mmap(fd, 0, access=ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def _iter_views(io: Union[BufferedIOBase, RawIOBase], view: memoryview, buf_size: int) -> Generator[memoryview, None, None]:
+    """Yields views of view starting from io's position and moves io to the end."""
+    for pos in range(io.tell(), len(view), buf_size):
+        with view[pos:pos+buf_size] as rbuf:
+            yield rbuf
+
+    io.seek(0, SEEK_END)
+
+
+def read_io_views(io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray], use_mmap=False) -> Generator[memoryview, None, None]:
+    """Yields views of io's remaining data. BytesIO's buffer is read without copying. Large regular files are mapped when use_mmap is true
+    which must only be used for files which are not truncated while read as that raises SIGBUS. Views are released on next item."""
+    buf_size = len(buffer)
+
+    # BytesIO data is already in memory
+    if isinstance(io, BytesIO):
+        with io.getbuffer() as view:
+            for rbuf in _iter_views(io, view, buf_size):
+                yield rbuf
+        return
+
+    # Map large regular files
+    mapping = _mmap_io(io) if use_mmap else None
+    if mapping is not None:
+        with mapping, memoryview(mapping) as view:
+            for rbuf in _iter_views(io, view, buf_size):
+                yield rbuf
+        return
+
+    # Read into buffer
+    with memoryview(buffer) as buffer_view:
+        while True:
+            count = io.readinto(buffer_view)
+            if count is None or count <= 0:
+                break
+
+            with buffer_view[:count] as rbuf:
+                yield rbuf
+
 
 def compress_buf(compressor: CompressorBase, context: CompressorContext, buf: Union[bytes, bytearray, memoryview], buf_size: int) -> Generator[bytes, None, None]:
     """Compresses, updates context and yields compressed buf data."""
@@ -183,18 +283,18 @@ def compress_buf(compressor: CompressorBase, context: CompressorContext, buf: Un
         yield cbuf
 
 
-def compress_io(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray]) -> Generator[bytes, None, None]:
+def compress_io(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray], use_mmap=False) -> Generator[bytes, None, None]:
     """Compresses, updates context and yields compressed io data."""
-    # Read all data
-    while True:
-        count = io.readinto(buffer)
-        if count is None or count <= 0:
-            break
+    views = context.read_views(io, buffer, use_mmap)
 
-        rbuf = buffer[:count]
-        cbuf = compressor.compress(rbuf)
-        context.update(rbuf, cbuf)
-        yield cbuf
+    # Read all data. Views are closed on error so BytesIO's buffer is not left exported.
+    try:
+        for rbuf in views:
+            cbuf = compressor.compress(rbuf)
+            context.update(rbuf, cbuf)
+            yield cbuf
+    finally:
+        views.close()
 
     # Flush
     cbuf = compressor.flush()
@@ -205,22 +305,103 @@ def compress_io(compressor: CompressorBase, context: CompressorContext, io: Unio
         yield cbuf
 
 
-async def compress_io_async(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray]) -> AsyncGenerator[bytes, None]:
+def compress_buf_to(compressor: CompressorBase, context: CompressorContext, buf: Union[bytes, bytearray, memoryview], buf_size: int, sink: CompressorSink) -> None:
+    """Compresses, updates context and writes compressed buf data to sink."""
+    with memoryview(buf) as buf_view:
+        # Stored data is written as is
+        if isinstance(compressor, CompressorStored):
+            context.update(buf_view, buf_view)
+            if len(buf_view) != 0:
+                sink(buf_view)
+            return
+
+        for buf_pos in range(0, len(buf_view), buf_size):
+            rbuf = buf_view[buf_pos:buf_pos+buf_size]
+            cbuf = compressor.compress(rbuf)
+            context.update(rbuf, cbuf)
+
+            if len(cbuf) != 0:
+                sink(cbuf)
+
+    # Flush
+    cbuf = compressor.flush()
+
+    # Write remaining
+    if len(cbuf) != 0:
+        context.flush(cbuf)
+        sink(cbuf)
+
+
+def compress_io_to(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray], sink: CompressorSink, use_mmap=False) -> None:
+    """Compresses, updates context and writes compressed io data to sink."""
+    stored = isinstance(compressor, CompressorStored)
+    views = context.read_views(io, buffer, use_mmap)
+
+    # Read all data. Views are closed on error so BytesIO's buffer is not left exported.
+    try:
+        for rbuf in views:
+            # Stored data is written from the read view without copying
+            if stored:
+                context.update(rbuf, rbuf)
+                sink(rbuf)
+                continue
+
+            cbuf = compressor.compress(rbuf)
+            context.update(rbuf, cbuf)
+
+            if len(cbuf) != 0:
+                sink(cbuf)
+    finally:
+        views.close()
+
+    # Flush
+    cbuf = compressor.flush()
+
+    # Write remaining
+    if len(cbuf) != 0:
+        context.flush(cbuf)
+        sink(cbuf)
+
+
+async def compress_io_async(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray], pipelined=False) -> AsyncGenerator[bytes, None]:
     """Compresses, updates context and yields compressed io data asynchronously."""
+    from asyncio import get_running_loop
+    from threading import Lock
     loop = get_running_loop()
-    gen = compress_io(compressor, context, io, buffer)
 
-    def try_get_next() -> Optional[bytes]:
-        try:
-            return gen.__next__()
-        except StopIteration:
-            return None
+    if pipelined:
+        from .pipeline import compress_io_pipelined
+        gen = compress_io_pipelined(compressor, context, io, len(buffer))
+    else:
+        gen = compress_io(compressor, context, io, buffer)
 
-    while True:
-        cbuf = await loop.run_in_executor(None, try_get_next)
-        if cbuf is None:
-            break
-        yield cbuf
+    # Generator may still run in executor when this is closed. Whichever side holds the lock last closes it.
+    lock = Lock()
+    closed = False
+
+    def try_get_next() -> Optional[bytes]:
+        with lock:
+            try:
+                return gen.__next__()
+            except StopIteration:
+                return None
+            finally:
+                if closed:
+                    gen.close()
+
+    try:
+        while True:
+            cbuf = await loop.run_in_executor(None, try_get_next)
+            if cbuf is None:
+                break
+            yield cbuf
+    finally:
+        closed = True
+        if lock.acquire(blocking=False):
+            try:
+                gen.close()
+            finally:
+                lock.release()
 
 
 def compress_gen(compressor: CompressorBase, context: CompressorContext, gen: Generator[bytes, None, None]) -> Generator[bytes, None, None]:
@@ -236,6 +417,21 @@ def compress_gen(compressor: CompressorBase, context: CompressorContext, gen: Ge
         yield cbuf
 
 
+def compress_gen_to(compressor: CompressorBase, context: CompressorContext, gen: Generator[bytes, None, None], sink: CompressorSink) -> None:
+    """Compresses, updates context and writes compressed gen data to sink."""
+    for rbuf in gen:
+        cbuf = compressor.compress(rbuf)
+        context.update(rbuf, cbuf)
+
+        if len(cbuf) != 0:
+            sink(cbuf)
+
+    cbuf = compressor.flush()
+    if len(cbuf) != 0:
+        context.flush(cbuf)
+        sink(cbuf)
+
+
 async def compress_gen_async(compressor: CompressorBase, context: CompressorContext, gen: AsyncGenerator[bytes, None]) -> AsyncGenerator[bytes, None]:
     """Compresses, updates context and yields compressed gen data asynchronously."""
     async for rbuf in gen:
@@ -249,7 +445,7 @@ async def compress_gen_async(compressor: CompressorBase, context: CompressorCont
         yield cbuf
 
 
-async def compress_stream_async(compressor: CompressorBase, context: CompressorContext, reader: StreamReader, buf_size: int) -> AsyncGenerator[bytes, None]:
+async def compress_stream_async(compressor: CompressorBase, context: CompressorContext, reader: "StreamReader", buf_size: int) -> AsyncGenerator[bytes, None]:
     """Compresses, updates context and yields compressed stream data asynchronously."""
     # Read all data
     while True:
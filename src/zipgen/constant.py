@@ -48,6 +48,39 @@ SIZE_CENTRAL_DIRECTORY_RECORD64_REMAINING = 44
 # Size = sizeof(struct ExtendedInformation64 - 4) = 28
 SIZE_EXTENDED_INFORMATION = 28
 
+# Regular files of at least this size are memory mapped instead of read.
+MMAP_MIN_SIZE = 1048576
+
+# Buffers used by pipelined reading.
+PIPELINE_DEPTH = 3
+
+# Files under this size are read ahead by walk's prefetch threads.
+PREFETCH_MAX_SIZE = 1048576
+
+# Max bytes read ahead by walk's prefetch threads.
+PREFETCH_MEMORY = 67108864
+
+# Files up to this size are deduplicated by content.
+DEDUP_MAX_SIZE = 16777216
+
+# Max bytes of compressed data kept for deduplication.
+DEDUP_MEMORY = 268435456
+
+# Index formats.
+INDEX_JSON = "json"
+INDEX_BINARY = "binary"
+
+# Entries and seconds between checkpoints.
+CHECKPOINT_ENTRIES = 1000
+CHECKPOINT_INTERVAL = 60.0
+
+# Seconds TeeWriter waits for drain of sinks which do not block.
+TEE_TIMEOUT = 1.0
+
+# Size of parts cut by PartWriter and max parts being uploaded.
+PART_SIZE = 8388608
+PART_MAX_PENDING = 4
+
 # No compression types
 DEFAULT_NO_COMPRESS_FILE_EXTENSIONS = (
     ".rar", ".7z", ".zip", ".bz", ".gz", ".tar.gz", ".tar.gz2", ".tar.lzma", "tar.bz",
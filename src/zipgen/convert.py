@@ -1,3 +1,4 @@
+from functools import lru_cache
 from time import localtime
 from posixpath import normpath
 from typing import Tuple, Optional, AnyStr
@@ -5,6 +6,7 @@ from typing import Tuple, Optional, AnyStr
 
 __all__ = (
     "dos_time",
+    "dos_time_cached",
     "norm_path",
 )
 
@@ -18,6 +20,20 @@ def dos_time(utc_time: Optional[float] = None) -> Tuple[int, int]:
     return (time, date,)
 
 
+@lru_cache(maxsize=4096)
+def _dos_time_seconds(utc_time: int) -> Tuple[int, int]:
+    """Converts whole second UTC timestamp to DOS time and date."""
+    return dos_time(utc_time)
+
+
+def dos_time_cached(utc_time: Optional[float] = None) -> Tuple[int, int]:
+    """Converts UTC timestamp to DOS time and date caching results per second."""
+    if utc_time is None:
+        return dos_time(None)
+
+    return _dos_time_seconds(int(utc_time // 1))
+
+
 def norm_path(path: AnyStr, folder: bool) -> bytes:
     """Converts path by normalizing it for a file or a folder. Path must be UTF-8 encoded bytes or str."""
     if isinstance(path, str):
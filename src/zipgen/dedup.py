@@ -0,0 +1,119 @@
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .compress import CompressorContext, get_compressor, compress_buf
+from .constant import DEDUP_MAX_SIZE, DEDUP_MEMORY
+from .prefetch import read_file
+
+if TYPE_CHECKING:
+    from .build import WalkEntry
+
+
+__all__ = (
+    "DedupData",
+    "DedupCache",
+)
+
+
+# Approximate memory of an inode entry. Its data is shared with the content entry but key and slot are not.
+INODE_ENTRY_SIZE = 256
+
+
+class DedupData(NamedTuple):
+    crc32: int
+    data: bytes
+    uncompressed_size: int
+    compress_time: float
+    hashes: Dict[str, Any]
+
+
+class DedupCache(object):
+    __slots__ = (
+        "max_size",
+        "memory",
+        "used",
+        "inodes",
+        "contents",
+        "inode_hits",
+        "content_hits",
+        "saved_read",
+        "saved_compress",
+        "saved_time",
+    )
+
+    def __init__(self, max_size=DEDUP_MAX_SIZE, memory=DEDUP_MEMORY) -> None:
+        self.max_size = max_size
+        self.memory = memory
+        self.used = 0
+        self.inodes: Dict[Tuple[int, int, int, int, int], DedupData] = {}
+        self.contents: Dict[Tuple[int, int, bytes], DedupData] = {}
+        self.inode_hits = 0
+        self.content_hits = 0
+        self.saved_read = 0
+        self.saved_compress = 0
+        self.saved_time = 0.0
+
+    @property
+    def hits(self) -> int:
+        """Returns count of files which were not compressed again."""
+        return self.inode_hits + self.content_hits
+
+    def _put(self, inode_key: Optional[Tuple[int, int, int, int, int]], content_key: Tuple[int, int, bytes], ddata: DedupData) -> None:
+        """Stores compressed data and inode entry if memory allows."""
+        if content_key not in self.contents:
+            if self.used + len(ddata.data) > self.memory:
+                return
+
+            self.used += len(ddata.data)
+            self.contents[content_key] = ddata
+
+        if inode_key is not None and inode_key not in self.inodes:
+            if self.used + INODE_ENTRY_SIZE > self.memory:
+                return
+
+            self.used += INODE_ENTRY_SIZE
+            self.inodes[inode_key] = ddata
+
+    def get(self, entry: "WalkEntry", data: Optional[bytes], buf_size: int, digests: Iterable[str] = ()) -> Optional[DedupData]:
+        """Returns compressed data and digests of entry. Data is read unless given. Returns None if entry is larger than max_size."""
+        file_stat = entry.stat
+        if file_stat.st_size > self.max_size:
+            return None
+
+        # Hard links share inode
+        inode_key = (
+            (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, entry.compression,)
+            if file_stat.st_nlink > 1 else
+            None
+        )
+
+        if inode_key is not None:
+            ddata = self.inodes.get(inode_key)
+            if ddata is not None:
+                self.inode_hits += 1
+                self.saved_read += ddata.uncompressed_size
+                self.saved_compress += ddata.uncompressed_size
+                self.saved_time += ddata.compress_time
+                return ddata
+
+        # Same content
+        if data is None:
+            data = read_file(entry.src)
+
+        from hashlib import sha256
+        content_key = (entry.compression, len(data), sha256(data).digest(),)
+        ddata = self.contents.get(content_key)
+
+        if ddata is not None:
+            self.content_hits += 1
+            self.saved_compress += ddata.uncompressed_size
+            self.saved_time += ddata.compress_time
+        else:
+            # Compress new content
+            start = perf_counter()
+            cctx = CompressorContext(digests)
+            cbuf = b"".join(compress_buf(get_compressor(entry.compression), cctx, data, buf_size))
+            ddata = DedupData(cctx.crc32, cbuf, cctx.uncompressed_size, perf_counter() - start, cctx.hashes)
+
+        self._put(inode_key, content_key, ddata)
+        return ddata
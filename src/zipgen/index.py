@@ -0,0 +1,149 @@
+from json import dumps, loads
+from struct import calcsize, pack, unpack_from
+from typing import Dict, Iterable, List, NamedTuple
+
+from .constant import HEADER_CENTRAL_DIRECTORY, HEADER_LOCAL_FILE, INDEX_BINARY, INDEX_JSON, TAG_EXTENDED_INFORMATION64
+
+
+__all__ = (
+    "INDEX_JSON",
+    "INDEX_BINARY",
+    "IndexEntry",
+    "get_index",
+    "pack_index",
+    "unpack_index",
+)
+
+
+# Binary index header and entry structs.
+INDEX_SIGNATURE = b"ZGIX"
+INDEX_VERSION = 1
+INDEX_HEADER = b"<4sHI"
+INDEX_ENTRY = b"<4Q2HIH"
+
+SIZE_CENTRAL_DIRECTORY = calcsize(HEADER_CENTRAL_DIRECTORY[0])
+SIZE_LOCAL_FILE = calcsize(HEADER_LOCAL_FILE[0])
+
+
+class IndexEntry(NamedTuple):
+    path: bytes
+    header_offset: int
+    data_offset: int
+    compressed_size: int
+    uncompressed_size: int
+    compression: int
+    flag: int
+    crc32: int
+
+
+def _parse_central_directory(header: bytes) -> IndexEntry:
+    """Parses CentralDirectory bytes created by ZipBuilder into IndexEntry."""
+    fields = unpack_from(HEADER_CENTRAL_DIRECTORY[0], header)
+    flag, compression = fields[4], fields[5]
+    crc32, compressed_size, uncompressed_size = fields[8], fields[9], fields[10]
+    len_path, len_extra = fields[11], fields[12]
+    header_offset = fields[17]
+
+    path = header[SIZE_CENTRAL_DIRECTORY:SIZE_CENTRAL_DIRECTORY+len_path]
+
+    # Zip64 values are in extended information
+    if len_extra != 0:
+        tag = unpack_from(TAG_EXTENDED_INFORMATION64[0], header, SIZE_CENTRAL_DIRECTORY+len_path)
+        uncompressed_size, compressed_size, header_offset = tag[2], tag[3], tag[4]
+
+    return IndexEntry(
+        path,
+        header_offset,
+        header_offset + SIZE_LOCAL_FILE + len_path,  # LocalFile has no extra
+        compressed_size,
+        uncompressed_size,
+        compression,
+        flag,
+        crc32,
+    )
+
+
+def get_index(headers: Iterable[bytes]) -> List[IndexEntry]:
+    """Returns index entries of CentralDirectory headers."""
+    return [_parse_central_directory(header) for header in headers]
+
+
+def pack_index(entries: Iterable[IndexEntry], fmt=INDEX_JSON) -> bytes:
+    """Packs index entries as JSON or binary."""
+    if fmt == INDEX_JSON:
+        index: Dict[str, Dict[str, int]] = {}
+
+        for entry in entries:
+            index[entry.path.decode("utf8", "replace")] = {
+                "offset": entry.header_offset,
+                "data_offset": entry.data_offset,
+                "compressed_size": entry.compressed_size,
+                "size": entry.uncompressed_size,
+                "compression": entry.compression,
+                "flag": entry.flag,
+                "crc32": entry.crc32,
+            }
+
+        return dumps({"version": INDEX_VERSION, "entries": index}).encode("utf8")
+    elif fmt == INDEX_BINARY:
+        entries = list(entries)
+        buf = bytearray(pack(INDEX_HEADER, INDEX_SIGNATURE, INDEX_VERSION, len(entries)))
+
+        for entry in entries:
+            buf += pack(
+                INDEX_ENTRY,
+                entry.header_offset,
+                entry.data_offset,
+                entry.compressed_size,
+                entry.uncompressed_size,
+                entry.compression,
+                entry.flag,
+                entry.crc32,
+                len(entry.path),
+            )
+            buf += entry.path
+
+        return bytes(buf)
+    else:
+        raise ValueError("Index format has to be json or binary.")
+
+
+def unpack_index(buf: bytes) -> List[IndexEntry]:
+    """Unpacks JSON or binary index into index entries."""
+    # JSON
+    if not buf.startswith(INDEX_SIGNATURE):
+        index = loads(buf)
+
+        return [
+            IndexEntry(
+                path.encode("utf8"),
+                value["offset"],
+                value["data_offset"],
+                value["compressed_size"],
+                value["size"],
+                value["compression"],
+                value["flag"],
+                value["crc32"],
+            )
+            for path, value in index["entries"].items()
+        ]
+
+    # Binary
+    _, version, count = unpack_from(INDEX_HEADER, buf)
+    if version != INDEX_VERSION:
+        raise ValueError("Index version not supported.")
+
+    entries: List[IndexEntry] = []
+    pos = calcsize(INDEX_HEADER)
+    entry_size = calcsize(INDEX_ENTRY)
+
+    for _ in range(count):
+        fields = unpack_from(INDEX_ENTRY, buf, pos)
+        pos += entry_size
+
+        path = bytes(buf[pos:pos+fields[7]])
+        pos += fields[7]
+
+        entries.append(IndexEntry(path, *fields[:7]))
+
+    return entries
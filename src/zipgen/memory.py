@@ -0,0 +1,123 @@
+from mmap import mmap
+from struct import Struct, calcsize
+from typing import AnyStr, Iterable, Optional, Tuple, Union
+
+from .constant import *
+from .convert import norm_path
+
+
+__all__ = (
+    "MemoryWriter",
+    "estimate_size",
+    "build_bufs",
+)
+
+
+SIZE_LOCAL_FILE = calcsize(HEADER_LOCAL_FILE[0])
+SIZE_DATA_DESCRIPTOR = calcsize(HEADER_DATA_DESCRIPTOR64[0])
+SIZE_CENTRAL_DIRECTORY = calcsize(HEADER_CENTRAL_DIRECTORY[0])
+SIZE_END_OF_CENTRAL_DIRECTORY = calcsize(HEADER_END_OF_CENTRAL_DIRECTORY[0])
+
+
+class MemoryWriter(object):
+    __slots__ = (
+        "buffer",
+        "size",
+    )
+
+    def __init__(self, capacity=65536, use_mmap=False) -> None:
+        self.buffer: Union[bytearray, mmap] = mmap(-1, max(capacity, 1)) if use_mmap else bytearray(capacity)
+        self.size = 0
+
+    def reserve(self, size: int) -> None:
+        """Grows the buffer to hold at least size more bytes."""
+        required = self.size + size
+        capacity = len(self.buffer)
+
+        if required <= capacity:
+            return
+
+        capacity = max(required, capacity * 2)
+
+        if isinstance(self.buffer, mmap):
+            buffer = mmap(-1, capacity)
+            buffer[:self.size] = self.buffer[:self.size]
+            self.buffer.close()
+            self.buffer = buffer
+        else:
+            self.buffer.extend(bytes(capacity - len(self.buffer)))
+
+    def write(self, buf: Union[bytes, bytearray, memoryview]) -> int:
+        """Copies the buffer after written data."""
+        size = len(buf)
+        if self.size + size > len(self.buffer):
+            self.reserve(size)
+
+        self.buffer[self.size:self.size+size] = buf
+        self.size += size
+        return size
+
+    def writelines(self, bufs: Iterable[Union[bytes, bytearray, memoryview]]) -> None:
+        """Copies the buffers after written data."""
+        for buf in bufs:
+            self.write(buf)
+
+    def pack(self, struct: Struct, *values: int, data=b"") -> None:
+        """Packs header values with given data on end directly after written data."""
+        size = struct.size + len(data)
+        if self.size + size > len(self.buffer):
+            self.reserve(size)
+
+        struct.pack_into(self.buffer, self.size, *values)
+        self.size += struct.size
+
+        if len(data) != 0:
+            self.buffer[self.size:self.size+len(data)] = data
+            self.size += len(data)
+
+    def getbuffer(self) -> memoryview:
+        """Returns view of written data. The buffer can not grow while the view is used."""
+        return memoryview(self.buffer)[:self.size]
+
+    def detach(self) -> bytearray:
+        """Returns written data without copying and starts a new buffer of same capacity."""
+        if isinstance(self.buffer, mmap):
+            raise ValueError("Memory map can not be detached.")
+
+        buffer = self.buffer
+        capacity = len(buffer)
+        del buffer[self.size:]
+
+        self.buffer = bytearray(capacity)
+        self.size = 0
+        return buffer
+
+
+def estimate_size(items: Iterable[Tuple[AnyStr, int]], compression=COMPRESSION_STORED, comment_size=0) -> int:
+    """Returns size of archive for paths and sizes of files. Size is exact for stored files with normalized paths and an upper bound for compressed."""
+    size = SIZE_END_OF_CENTRAL_DIRECTORY + comment_size
+
+    for path, data_size in items:
+        if compression != COMPRESSION_STORED:
+            # Bound of deflate which also covers bzip2 and lzma with their headers
+            data_size += (data_size >> 6) + 1024
+
+        path_size = len(path.encode("utf8")) if isinstance(path, str) else len(path)
+        size += 2 * path_size + SIZE_LOCAL_FILE + SIZE_DATA_DESCRIPTOR + SIZE_CENTRAL_DIRECTORY + data_size
+
+    return size
+
+
+def build_bufs(items: Iterable[Tuple[AnyStr, Union[bytes, bytearray, memoryview], Optional[float]]], compression=COMPRESSION_STORED, comment: AnyStr = None,
+               use_mmap=False) -> memoryview:
+    """Builds archive of buffers into a single buffer preallocated from estimated size and returns view of it."""
+    from .build import ZipBuilder
+
+    items = list(items)
+    writer = MemoryWriter(estimate_size(((path, len(buf),) for path, buf, _ in items), compression), use_mmap)
+    builder = ZipBuilder()
+
+    builder.write_bufs_into(writer, items, compression)
+    writer.write(builder.end(comment))
+
+    return writer.getbuffer()
@@ -0,0 +1,222 @@
+from io import BufferedIOBase, RawIOBase
+from time import perf_counter
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Union
+
+from .compress import CompressorBase, CompressorContext
+
+
+__all__ = (
+    "EntryMetrics",
+    "BuildMetrics",
+    "EntryMetricsCallable",
+    "TimedCompressor",
+    "TimedCompressorContext",
+)
+
+
+class EntryMetrics(object):
+    __slots__ = (
+        "path",
+        "compression",
+        "bytes_in",
+        "bytes_out",
+        "chunks",
+        "read_time",
+        "crc_time",
+        "compress_time",
+        "write_time",
+        "drain_time",
+        "start",
+        "elapsed",
+    )
+
+    def __init__(self, path: bytes, compression: int) -> None:
+        self.path = path
+        self.compression = compression
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks = 0
+        self.read_time = 0.0
+        self.crc_time = 0.0
+        self.compress_time = 0.0
+        self.write_time = 0.0
+        self.drain_time = 0.0
+        self.start = perf_counter()
+        self.elapsed = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns metrics as JSON serializable dict."""
+        values = {name: getattr(self, name) for name in self.__slots__ if name != "start"}
+        values["path"] = self.path.decode("utf8", "replace")
+        return values
+
+
+# Callback receiving metrics of each finished entry.
+EntryMetricsCallable = Callable[[EntryMetrics], None]
+
+
+class BuildMetrics(object):
+    __slots__ = (
+        "entries",
+        "keep_entries",
+        "on_entry",
+        "current",
+        "files",
+        "folders",
+        "bytes_in",
+        "bytes_out",
+        "chunks",
+        "read_time",
+        "crc_time",
+        "compress_time",
+        "write_time",
+        "drain_time",
+        "writes",
+        "drains",
+        "start",
+        "stop_time",
+    )
+
+    def __init__(self, keep_entries=True, on_entry: Optional[EntryMetricsCallable] = None) -> None:
+        self.entries: List[EntryMetrics] = []
+        self.keep_entries = keep_entries
+        self.on_entry = on_entry
+        self.current: Optional[EntryMetrics] = None
+        self.files = 0
+        self.folders = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks = 0
+        self.read_time = 0.0
+        self.crc_time = 0.0
+        self.compress_time = 0.0
+        self.write_time = 0.0
+        self.drain_time = 0.0
+        self.writes = 0
+        self.drains = 0
+        self.start = perf_counter()
+        self.stop_time: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        """Returns seconds from creation until stop or now."""
+        return (self.stop_time or perf_counter()) - self.start
+
+    def start_entry(self, path: bytes, compression: int) -> EntryMetrics:
+        """Returns metrics of a started file."""
+        self.current = EntryMetrics(path, compression)
+        return self.current
+
+    def finish_entry(self, entry: EntryMetrics, context: CompressorContext) -> None:
+        """Adds finished file to totals. Sizes are taken from context as data may not pass through compressor."""
+        entry.bytes_in = context.uncompressed_size
+        entry.bytes_out = context.compressed_size
+        entry.elapsed = perf_counter() - entry.start
+
+        self.files += 1
+        self.bytes_in += entry.bytes_in
+        self.bytes_out += entry.bytes_out
+        self.chunks += entry.chunks
+        self.read_time += entry.read_time
+        self.crc_time += entry.crc_time
+        self.compress_time += entry.compress_time
+
+        if self.keep_entries:
+            self.entries.append(entry)
+
+        if self.current is entry:
+            self.current = None
+
+        if self.on_entry is not None:
+            self.on_entry(entry)
+
+    def add_write(self, seconds: float) -> None:
+        """Adds time spent writing to the sink."""
+        self.writes += 1
+        self.write_time += seconds
+
+        if self.current is not None:
+            self.current.write_time += seconds
+
+    def add_drain(self, seconds: float) -> None:
+        """Adds time spent waiting for the sink to drain."""
+        self.drains += 1
+        self.drain_time += seconds
+
+        if self.current is not None:
+            self.current.drain_time += seconds
+
+    def stop(self) -> None:
+        """Stops elapsed time."""
+        self.stop_time = perf_counter()
+
+    def as_dict(self, entries=True) -> Dict[str, Any]:
+        """Returns totals and optionally metrics of each file as JSON serializable dict."""
+        values: Dict[str, Any] = {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if name not in ("entries", "keep_entries", "on_entry", "current", "start", "stop_time")
+        }
+        values["elapsed"] = self.elapsed
+
+        if entries:
+            values["entries"] = [entry.as_dict() for entry in self.entries]
+
+        return values
+
+
+class TimedCompressor(CompressorBase):
+    __slots__ = (
+        "compressor",
+        "entry",
+    )
+
+    def __init__(self, compressor: CompressorBase, entry: EntryMetrics) -> None:
+        self.compressor = compressor
+        self.entry = entry
+
+    def compress(self, data: bytes) -> bytes:
+        start = perf_counter()
+        try:
+            return self.compressor.compress(data)
+        finally:
+            self.entry.compress_time += perf_counter() - start
+
+    def flush(self) -> bytes:
+        start = perf_counter()
+        try:
+            return self.compressor.flush()
+        finally:
+            self.entry.compress_time += perf_counter() - start
+
+
+class TimedCompressorContext(CompressorContext):
+    __slots__ = (
+        "entry",
+    )
+
+    def __init__(self, digests: Iterable[str], entry: EntryMetrics) -> None:
+        super().__init__(digests)
+        self.entry = entry
+
+    def update_checks(self, rbuf: bytes) -> None:
+        start = perf_counter()
+        super().update_checks(rbuf)
+        self.entry.crc_time += perf_counter() - start
+        self.entry.chunks += 1
+
+    def read_views(self, io: Union[BufferedIOBase, RawIOBase], buffer: Union[memoryview, bytearray], use_mmap=False) -> Generator[memoryview, None, None]:
+        views = super().read_views(io, buffer, use_mmap)
+
+        try:
+            while True:
+                start = perf_counter()
+                rbuf = next(views, None)
+                self.entry.read_time += perf_counter() - start
+
+                if rbuf is None:
+                    return
+
+                yield rbuf
+        finally:
+            views.close()
@@ -1,8 +1,17 @@
-from struct import pack
+from struct import Struct, pack
 from typing import NamedTuple, Tuple, Union
 
+from .constant import *
+
 
 __all__ = (
+    "STRUCT_LOCAL_FILE",
+    "STRUCT_DATA_DESCRIPTOR64",
+    "STRUCT_CENTRAL_DIRECTORY",
+    "STRUCT_CENTRAL_DIRECTORY_RECORD64",
+    "STRUCT_CENTRAL_DIRECTORY_LOCATOR64",
+    "STRUCT_END_OF_CENTRAL_DIRECTORY",
+    "STRUCT_EXTENDED_INFORMATION64",
     "LocalFile",
     "ExtendedInformation64",
     "DataDescriptor",
@@ -17,6 +26,16 @@ __all__ = (
 )
 
 
+# Precompiled header structs.
+STRUCT_LOCAL_FILE = Struct(HEADER_LOCAL_FILE[0])
+STRUCT_DATA_DESCRIPTOR64 = Struct(HEADER_DATA_DESCRIPTOR64[0])
+STRUCT_CENTRAL_DIRECTORY = Struct(HEADER_CENTRAL_DIRECTORY[0])
+STRUCT_CENTRAL_DIRECTORY_RECORD64 = Struct(HEADER_CENTRAL_DIRECTORY_RECORD64[0])
+STRUCT_CENTRAL_DIRECTORY_LOCATOR64 = Struct(HEADER_CENTRAL_DIRECTORY_LOCATOR64[0])
+STRUCT_END_OF_CENTRAL_DIRECTORY = Struct(HEADER_END_OF_CENTRAL_DIRECTORY[0])
+STRUCT_EXTENDED_INFORMATION64 = Struct(TAG_EXTENDED_INFORMATION64[0])
+
+
 class LocalFile(NamedTuple):
     version: int
     flag: int
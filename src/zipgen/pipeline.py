@@ -0,0 +1,110 @@
+from io import BufferedIOBase, RawIOBase
+from queue import Queue
+from threading import Event, Thread
+from typing import Generator, Union
+
+from .compress import CompressorBase, CompressorContext, CompressorSink
+from .constant import PIPELINE_DEPTH
+
+
+__all__ = (
+    "compress_io_pipelined",
+    "compress_io_pipelined_to",
+)
+
+
+def compress_io_pipelined(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer_size: int, depth=PIPELINE_DEPTH) -> Generator[bytes, None, None]:
+    """Compresses, updates context and yields compressed io data. Reading and CRC32 with extra digests run on separate threads using depth buffers."""
+    # Each queue holds at most the depth buffers plus error and end markers
+    free: Queue = Queue(depth + 2)
+    read: Queue = Queue(depth + 2)
+    checked: Queue = Queue(depth + 2)
+    stop = Event()
+
+    # Buffers which can be read into
+    for _ in range(depth):
+        free.put(bytearray(buffer_size))
+
+    def read_stage() -> None:
+        """Reads io into free buffers until EOF or stop."""
+        try:
+            while not stop.is_set():
+                buf = free.get()
+                if buf is None:
+                    break
+
+                count = io.readinto(buf)
+                if count is None or count <= 0:
+                    break
+
+                read.put((buf, count,))
+        except BaseException as ex:
+            read.put(ex)
+        finally:
+            read.put(None)
+
+    def crc_stage() -> None:
+        """Updates CRC32 and extra digests of read buffers in order and passes them on."""
+        try:
+            while True:
+                item = read.get()
+                if item is None:
+                    break
+
+                if isinstance(item, tuple):
+                    buf, count = item
+                    with memoryview(buf) as view, view[:count] as rbuf:
+                        context.update_checks(rbuf)
+
+                checked.put(item)
+        except BaseException as ex:
+            checked.put(ex)
+        finally:
+            checked.put(None)
+
+    threads = (
+        Thread(target=read_stage, daemon=True),
+        Thread(target=crc_stage, daemon=True),
+    )
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        # Compress checked buffers and return them for reading
+        while True:
+            item = checked.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            buf, count = item
+            with memoryview(buf) as view, view[:count] as rbuf:
+                cbuf = compressor.compress(rbuf)
+
+            free.put(buf)
+            context.uncompressed_size += count
+            context.compressed_size += len(cbuf)
+            yield cbuf
+    finally:
+        stop.set()
+        free.put(None)
+
+        for thread in threads:
+            thread.join()
+
+    # Flush
+    cbuf = compressor.flush()
+
+    # Yield remaining
+    if len(cbuf) != 0:
+        context.flush(cbuf)
+        yield cbuf
+
+
+def compress_io_pipelined_to(compressor: CompressorBase, context: CompressorContext, io: Union[BufferedIOBase, RawIOBase], buffer_size: int, sink: CompressorSink, depth=PIPELINE_DEPTH) -> None:
+    """Compresses, updates context and writes compressed io data to sink. Reading and CRC32 run on separate threads using depth buffers."""
+    for cbuf in compress_io_pipelined(compressor, context, io, buffer_size, depth):
+        if len(cbuf) != 0:
+            sink(cbuf)
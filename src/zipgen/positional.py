@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import O_CREAT, O_TRUNC, O_WRONLY, close, cpu_count, ftruncate, name
+from os import open as open_fd
+from typing import AnyStr, Iterable, List, NamedTuple, Optional, Tuple
+from zlib import crc32
+
+from .build import *
+from .constant import *
+from .pack import STRUCT_DATA_DESCRIPTOR64
+
+try:
+    from os import posix_fallocate
+except ImportError:  # Not available on Windows and macOS
+    posix_fallocate = None  # type: ignore
+
+try:
+    from os import pwrite
+except ImportError:  # Not available on Windows
+    pwrite = None  # type: ignore
+
+
+__all__ = (
+    "StoredSlot",
+    "write_stored_entries",
+    "write_stored",
+)
+
+
+SIZE_DATA_DESCRIPTOR = STRUCT_DATA_DESCRIPTOR64.size
+
+
+class StoredSlot(NamedTuple):
+    src: str
+    ctx: ZipContext
+    data_offset: int
+
+
+def _write_at(fd: int, buf: bytes, offset: int) -> None:
+    """Writes whole buffer to file descriptor at offset."""
+    with memoryview(buf) as view:
+        while len(view) != 0:
+            count = pwrite(fd, view, offset)
+            view = view[count:]
+            offset += count
+
+
+def _copy_slot(fd: int, slot: StoredSlot, buffer_size: int) -> int:
+    """Copies file into its slot and returns its CRC32."""
+    offset = slot.data_offset
+    end = offset + slot.ctx.compressor_ctx.uncompressed_size
+    value = 0
+    buf = bytearray(min(buffer_size, end - offset) or 1)
+
+    with open(slot.src, "rb", buffering=0) as fs, memoryview(buf) as view:
+        # Read one more byte than planned to detect growing files
+        while offset <= end:
+            with view[:min(len(view), end - offset + 1)] as rview:
+                count = fs.readinto(rview)
+
+            if not count:
+                break
+
+            with view[:count] as rbuf:
+                value = crc32(rbuf, value)
+                _write_at(fd, rbuf, offset)
+
+            offset += count
+
+    if offset != end:
+        raise ValueError("File size changed.")
+
+    return value & 0xFFFFFFFF
+
+
+def write_stored_entries(path: str, entries: Iterable[WalkEntry], utc_time: Optional[float] = None, workers: Optional[int] = None,
+                         buffer_size=1048576, system=get_version_system(name)) -> int:
+    """Writes stored archive of entries to path by copying files into preallocated slots on worker threads. Returns size of the archive."""
+    if pwrite is None:
+        raise OSError("Positional writes are not supported.")
+
+    builder = ZipBuilder(system=system)
+    writes: List[Tuple[int, bytes]] = []
+    slots: List[StoredSlot] = []
+
+    # Plan layout
+    for entry in entries:
+        if entry.folder:
+            writes.append((builder.offset, builder.add_folder(entry.dest, utc_time),))
+            continue
+
+        if entry.compression != COMPRESSION_STORED:
+            raise ValueError("Only stored entries can be written positionally.")
+
+        ctx = builder._new_file_ctx(entry.dest, None, utc_time, COMPRESSION_STORED, "", entry.stat)
+        ctx.compressor_ctx.compressed_size = entry.stat.st_size
+        ctx.compressor_ctx.uncompressed_size = entry.stat.st_size
+        builder.ctx = ctx
+
+        writes.append((builder.offset, builder._write_local_file(),))
+        slots.append(StoredSlot(entry.src, ctx, builder.offset))
+        builder.offset += entry.stat.st_size + SIZE_DATA_DESCRIPTOR
+        builder.headers[ctx.path] = b""  # Keep order of headers
+        builder._clear_ctx()
+
+    fd = open_fd(path, O_WRONLY | O_CREAT | O_TRUNC, 0o644)
+    try:
+        # Preallocate files
+        if posix_fallocate is not None and builder.offset != 0:
+            try:
+                posix_fallocate(fd, 0, builder.offset)
+            except OSError:
+                pass
+
+        # Copy files and calculate CRC32 in parallel
+        with ThreadPoolExecutor(workers or cpu_count() or 1) as executor:
+            crcs = list(executor.map(lambda slot: _copy_slot(fd, slot, buffer_size), slots))
+
+        for offset, buf in writes:
+            _write_at(fd, buf, offset)
+
+        # Data descriptors and headers
+        for slot, value in zip(slots, crcs):
+            cctx = slot.ctx.compressor_ctx
+            cctx.crc32 = value
+            _write_at(fd, STRUCT_DATA_DESCRIPTOR64.pack(HEADER_DATA_DESCRIPTOR64[1], value, cctx.compressed_size, cctx.uncompressed_size),
+                      slot.data_offset + cctx.compressed_size)
+
+            builder.ctx = slot.ctx
+            builder._set_header()
+            builder._clear_ctx()
+
+        # Central directory
+        offset = builder.offset
+        buf = builder.end()
+        _write_at(fd, buf, offset)
+        ftruncate(fd, offset + len(buf))
+
+        return offset + len(buf)
+    finally:
+        close(fd)
+
+
+def write_stored(path: str, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, ignore: Optional[WalkIgnoreCallable] = walk_ignore_default,
+                 workers: Optional[int] = None, buffer_size=1048576) -> int:
+    """Writes stored archive of files from src directory to path using worker threads. Output is same as ZipBuilder.walk. Returns size of the archive."""
+    return write_stored_entries(path, walk_entries(src, dest, COMPRESSION_STORED, ignore, None), utc_time, workers, buffer_size)
@@ -0,0 +1,60 @@
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Generator, Iterable, Optional, Tuple
+
+from .constant import PREFETCH_MAX_SIZE, PREFETCH_MEMORY
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from .build import WalkEntry
+
+
+__all__ = (
+    "read_file",
+    "prefetch_entries",
+)
+
+
+def read_file(path: str) -> bytes:
+    """Returns all data of the file."""
+    with open(path, "rb", buffering=False) as fs:
+        return fs.read()
+
+
+def prefetch_entries(entries: Iterable["WalkEntry"], workers: int, max_size=PREFETCH_MAX_SIZE, memory=PREFETCH_MEMORY) -> Generator[Tuple["WalkEntry", Optional["Future[bytes]"]], None, None]:
+    """Yields entries in order with futures of their data. Files under max_size are read ahead by workers threads within memory bytes."""
+    # Nothing to prefetch
+    if workers <= 0:
+        for entry in entries:
+            yield entry, None
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(workers) as executor:
+        window: Deque[Tuple["WalkEntry", Optional["Future[bytes]"]]] = deque()
+        entries_iter = iter(entries)
+        used = 0
+
+        while True:
+            # Read ahead while memory is left
+            while used < memory and len(window) < workers * 4:
+                entry = next(entries_iter, None)
+                if entry is None:
+                    break
+
+                # Folders and large files are not prefetched
+                if entry.folder or entry.stat.st_size >= max_size:
+                    window.append((entry, None,))
+                    continue
+
+                used += entry.stat.st_size
+                window.append((entry, executor.submit(read_file, entry.src),))
+
+            if not window:
+                break
+
+            entry, data = window.popleft()
+            if data is not None:
+                used -= entry.stat.st_size
+
+            yield entry, data
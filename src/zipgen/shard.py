@@ -0,0 +1,105 @@
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from heapq import heapify, heappop, heappush
+from json import dumps
+from os import cpu_count, stat
+from typing import Any, AnyStr, Dict, Iterable, List, Optional, Tuple
+
+from .build import WalkEntry, WalkIgnoreCallable, WalkNoCompressCallable, walk_entries, walk_ignore_default, walk_no_compress_default
+from .constant import COMPRESSION_STORED
+from .convert import norm_path
+from .stream import ZipStreamWriter
+
+
+__all__ = (
+    "SHARD_GREEDY",
+    "SHARD_HASH",
+    "partition_entries",
+    "build_shard",
+    "build_shards",
+)
+
+
+# Partitioning methods.
+SHARD_GREEDY = "greedy"
+SHARD_HASH = "hash"
+
+
+def _entry_size(entry: WalkEntry) -> int:
+    """Returns bytes entry adds to a shard."""
+    return 0 if entry.folder else entry.stat.st_size
+
+
+def partition_entries(entries: Iterable[WalkEntry], shards: int, method=SHARD_GREEDY) -> List[List[WalkEntry]]:
+    """Partitions entries into shards keeping their order. Greedy balances total bytes by adding largest files to smallest shard first. Hash keeps path in the same shard between runs."""
+    if shards <= 0:
+        raise ValueError("Shards has to be positive.")
+
+    indexed = list(enumerate(entries))
+    partitions: List[List[Tuple[int, WalkEntry]]] = [[] for _ in range(shards)]
+
+    if method == SHARD_GREEDY:
+        heap = [(0, shard,) for shard in range(shards)]
+        heapify(heap)
+
+        for index, entry in sorted(indexed, key=lambda item: _entry_size(item[1]), reverse=True):
+            size, shard = heappop(heap)
+            partitions[shard].append((index, entry,))
+            heappush(heap, (size + _entry_size(entry), shard,))
+    elif method == SHARD_HASH:
+        for index, entry in indexed:
+            digest = sha256(norm_path(entry.dest, entry.folder)).digest()
+            partitions[int.from_bytes(digest[:8], "little") % shards].append((index, entry,))
+    else:
+        raise ValueError("Shard method has to be greedy or hash.")
+
+    return [[entry for _, entry in sorted(partition, key=lambda item: item[0])] for partition in partitions]
+
+
+def build_shard(entries: List[WalkEntry], path: str, utc_time: Optional[float] = None, buffer_size=65536) -> Tuple[str, int, int]:
+    """Writes archive of entries to path. Returns path, count of entries and size of archive."""
+    with open(path, "wb", buffering=0) as fs:
+        with ZipStreamWriter(fs, buffer_size) as stream:
+            stream.add_entries(entries, utc_time)
+
+    return path, len(entries), stat(path).st_size
+
+
+def build_shards(src: AnyStr, dest: AnyStr, output="archive-{shard}.zip", shards: Optional[int] = None, method=SHARD_GREEDY, utc_time: Optional[float] = None,
+                 compression=COMPRESSION_STORED, ignore: Optional[WalkIgnoreCallable] = walk_ignore_default,
+                 no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default, manifest: Optional[str] = None, buffer_size=65536) -> Dict[str, Any]:
+    """Writes files from src directory into independent archives built by worker processes. Output is formatted with shard number.
+    Returns manifest of archives and which archive holds each path, which is also written as JSON to manifest if given."""
+    if shards is None:
+        shards = cpu_count() or 1
+
+    partitions = partition_entries(walk_entries(src, dest, compression, ignore, no_compress), shards, method)
+    paths = [output.format(shard=shard) for shard in range(shards)]
+
+    with ProcessPoolExecutor(shards) as executor:
+        futures = [
+            executor.submit(build_shard, partition, path, utc_time, buffer_size)
+            for partition, path in zip(partitions, paths)
+        ]
+
+        results = [future.result() for future in futures]
+
+    shard_manifest: Dict[str, Any] = {
+        "version": 1,
+        "method": method,
+        "shards": [
+            {"path": path, "files": count, "size": size}
+            for path, count, size in results
+        ],
+        "paths": {
+            norm_path(entry.dest, entry.folder).decode("utf8", "replace"): shard
+            for shard, partition in enumerate(partitions)
+            for entry in partition
+        },
+    }
+
+    if manifest is not None:
+        with open(manifest, "w") as fs:
+            fs.write(dumps(shard_manifest))
+
+    return shard_manifest
@@ -0,0 +1,341 @@
+from asyncio import FIRST_COMPLETED, Future, Semaphore, ensure_future, gather, wait
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import new as new_hash
+from inspect import iscoroutinefunction
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union, cast
+
+from .constant import PART_MAX_PENDING, PART_SIZE, TEE_TIMEOUT
+from .stream import copies_buffers
+
+
+__all__ = (
+    "TEE_BLOCK",
+    "TEE_DROP",
+    "TEE_DETACH",
+    "TeeSink",
+    "TeeWriter",
+    "HashWriter",
+    "PartUploadCallable",
+    "PartWriter",
+)
+
+
+# Policies for slow or failed sinks.
+TEE_BLOCK = "block"
+TEE_DROP = "drop"
+TEE_DETACH = "detach"
+
+
+class TeeSink(object):
+    __slots__ = (
+        "stream",
+        "drain",
+        "policy",
+        "task",
+        "error",
+        "dropped",
+        "detached",
+    )
+
+    def __init__(self, stream: Any, policy=TEE_BLOCK) -> None:
+        if policy not in (TEE_BLOCK, TEE_DROP, TEE_DETACH,):
+            raise ValueError("Policy has to be block, drop or detach.")
+
+        self.stream = stream
+        self.drain: Optional[Callable[[], Awaitable[None]]] = getattr(stream, "drain", None)
+        self.policy = policy
+        self.task: Optional[Future] = None
+        self.error: Optional[BaseException] = None
+        self.dropped = 0
+        self.detached = False
+
+    @property
+    def slow(self) -> bool:
+        """Returns true if previous drain has not completed."""
+        return self.task is not None and not self.task.done()
+
+    def fail(self, error: Optional[BaseException], size=0) -> None:
+        """Drops size bytes or detaches the sink by its policy."""
+        if error is not None:
+            self.error = error
+
+        if self.policy == TEE_BLOCK and error is not None:
+            raise error
+
+        if self.policy == TEE_DETACH:
+            self.detached = True
+
+            if self.task is not None:
+                self.task.cancel()
+                self.task = None
+        else:
+            self.dropped += size
+
+
+class TeeWriter(object):
+    __slots__ = (
+        "sinks",
+        "timeout",
+    )
+
+    def __init__(self, streams: Iterable[Any] = (), policy=TEE_BLOCK, timeout=TEE_TIMEOUT) -> None:
+        self.sinks: List[TeeSink] = []
+        self.timeout = timeout
+
+        for stream in streams:
+            self.add_sink(stream, policy)
+
+    @property
+    def active(self) -> List[TeeSink]:
+        """Returns sinks which have not been detached."""
+        return [sink for sink in self.sinks if not sink.detached]
+
+    @property
+    def copies_buffers(self) -> bool:
+        """Returns true if every active sink consumes or copies buffers so borrowed memoryviews can be written without copying."""
+        return all(copies_buffers(sink.stream) for sink in self.sinks if not sink.detached)
+
+    def add_sink(self, stream: Any, policy=TEE_BLOCK) -> TeeSink:
+        """Adds stream which receives every written buffer. Policy decides what happens when it fails or is slow to drain."""
+        sink = TeeSink(stream, policy)
+        self.sinks.append(sink)
+        return sink
+
+    def write(self, buf: Union[bytes, memoryview]) -> int:
+        """Writes the same buffer to all sinks."""
+        for sink in self.sinks:
+            if sink.detached:
+                continue
+
+            # Slow sinks lose the buffer
+            if sink.policy == TEE_DROP and sink.slow:
+                sink.fail(None, len(buf))
+                continue
+
+            try:
+                sink.stream.write(buf)
+            except Exception as ex:
+                sink.fail(ex, len(buf))
+
+        return len(buf)
+
+    def writelines(self, bufs: List[Union[bytes, memoryview]]) -> None:
+        """Writes the same buffers to all sinks."""
+        for sink in self.sinks:
+            if sink.detached:
+                continue
+
+            # Slow sinks lose the buffers
+            if sink.policy == TEE_DROP and sink.slow:
+                sink.fail(None, sum(len(buf) for buf in bufs))
+                continue
+
+            try:
+                if hasattr(sink.stream, "writelines"):
+                    sink.stream.writelines(bufs)
+                else:
+                    for buf in bufs:
+                        sink.stream.write(buf)
+            except Exception as ex:
+                sink.fail(ex, sum(len(buf) for buf in bufs))
+
+    def flush(self) -> None:
+        """Flushes all sinks which can be flushed."""
+        for sink in self.sinks:
+            if sink.detached or not hasattr(sink.stream, "flush"):
+                continue
+
+            try:
+                sink.stream.flush()
+            except Exception as ex:
+                sink.fail(ex)
+
+    async def drain(self) -> None:
+        """Drains all sinks concurrently. Blocking sinks are waited for, others at most timeout seconds."""
+        block: List[Future] = []
+        other: List[Tuple[TeeSink, Future]] = []
+
+        for sink in self.sinks:
+            if sink.detached or sink.drain is None:
+                continue
+
+            if sink.task is None:
+                sink.task = ensure_future(sink.drain())
+
+            if sink.policy == TEE_BLOCK:
+                block.append(sink.task)
+                sink.task = None
+            else:
+                other.append((sink, sink.task,))
+
+        if other:
+            await wait([task for _, task in other], timeout=self.timeout)
+
+        if block:
+            await gather(*block)
+
+        for sink, task in other:
+            # Still draining
+            if not task.done():
+                if sink.policy == TEE_DETACH:
+                    sink.fail(None)
+                continue
+
+            sink.task = None
+
+            if not task.cancelled() and task.exception() is not None:
+                sink.fail(task.exception())
+
+
+class HashWriter(object):
+    __slots__ = (
+        "hash",
+    )
+
+    # Buffers are hashed before write returns
+    copies_buffers = True
+
+    def __init__(self, name="sha256") -> None:
+        self.hash = new_hash(name)
+
+    def write(self, buf: Union[bytes, memoryview]) -> int:
+        """Updates hash with the buffer."""
+        self.hash.update(buf)
+        return len(buf)
+
+    def hexdigest(self) -> str:
+        """Returns hex digest of written data."""
+        return self.hash.hexdigest()
+
+
+# Callable which uploads part number and its data.
+PartUploadCallable = Callable[[int, bytearray], Any]
+
+
+class PartWriter(object):
+    __slots__ = (
+        "upload",
+        "part_size",
+        "max_pending",
+        "is_async",
+        "executor",
+        "part",
+        "part_len",
+        "part_number",
+        "pending",
+        "results",
+        "semaphore",
+    )
+
+    # Buffers are copied into parts before write returns
+    copies_buffers = True
+
+    def __init__(self, upload: PartUploadCallable, part_size=PART_SIZE, max_pending=PART_MAX_PENDING, workers=0) -> None:
+        self.upload = upload
+        self.part_size = part_size
+        self.max_pending = max_pending
+        self.is_async = iscoroutinefunction(upload)
+        self.executor = ThreadPoolExecutor(workers) if workers > 0 and not self.is_async else None
+        self.part = bytearray(part_size)
+        self.part_len = 0
+        self.part_number = 0
+        self.pending: Deque[Any] = deque()
+        self.results: Dict[int, Any] = {}
+        self.semaphore: Optional[Semaphore] = None
+
+    def _upload(self, number: int, part: bytearray) -> None:
+        """Uploads the part and stores its result."""
+        self.results[number] = self.upload(number, part)
+
+    async def _upload_async(self, number: int, part: bytearray) -> None:
+        """Uploads the part asynchronously and stores its result. Single write may send several parts so uploads wait for the semaphore."""
+        async with cast(Semaphore, self.semaphore):
+            self.results[number] = await self.upload(number, part)
+
+    def _send(self, part: bytearray) -> None:
+        """Hands the part to upload. Waits for uploads on threads when max_pending are in flight."""
+        self.part_number += 1
+
+        if self.is_async:
+            # Created in running loop
+            if self.semaphore is None:
+                self.semaphore = Semaphore(self.max_pending)
+
+            self.pending.append(ensure_future(self._upload_async(self.part_number, part)))
+        elif self.executor is not None:
+            while len(self.pending) >= self.max_pending:
+                self.pending.popleft().result()
+
+            self.pending.append(self.executor.submit(self._upload, self.part_number, part))
+        else:
+            self._upload(self.part_number, part)
+
+    def write(self, buf: Union[bytes, bytearray, memoryview]) -> int:
+        """Copies the buffer into parts. Full parts are uploaded."""
+        with memoryview(buf) as view:
+            size = len(view)
+            pos = 0
+
+            while pos < size:
+                count = min(size - pos, self.part_size - self.part_len)
+                self.part[self.part_len:self.part_len+count] = view[pos:pos+count]
+                self.part_len += count
+                pos += count
+
+                if self.part_len == self.part_size:
+                    part = self.part
+                    self.part = bytearray(self.part_size)
+                    self.part_len = 0
+                    self._send(part)
+
+        return size
+
+    def writelines(self, bufs: List[Union[bytes, memoryview]]) -> None:
+        """Copies the buffers into parts. Full parts are uploaded."""
+        for buf in bufs:
+            self.write(buf)
+
+    async def drain(self) -> None:
+        """Waits until less than max_pending parts are being uploaded. Parts of a single large write are all held until then."""
+        while len(self.pending) >= self.max_pending:
+            done, _ = await wait(self.pending, return_when=FIRST_COMPLETED)
+
+            for task in done:
+                self.pending.remove(task)
+                task.result()
+
+    def _send_last(self) -> None:
+        """Hands the last part which may be smaller to upload."""
+        if self.part_len != 0 or self.part_number == 0:
+            part = self.part
+            del part[self.part_len:]
+            self.part = bytearray()
+            self.part_len = 0
+            self._send(part)
+
+    def close(self) -> Dict[int, Any]:
+        """Uploads the last part and waits for all uploads. Returns results of uploads by part number."""
+        if self.is_async:
+            raise ValueError("Upload is a coroutine function. Use close_async.")
+
+        self._send_last()
+
+        try:
+            while self.pending:
+                self.pending.popleft().result()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+
+        return self.results
+
+    async def close_async(self) -> Dict[int, Any]:
+        """Uploads the last part and waits for all uploads asynchronously. Returns results of uploads by part number."""
+        self._send_last()
+
+        pending = list(self.pending)
+        self.pending.clear()
+
+        await gather(*pending)
+        return self.results
@@ -1,9 +1,9 @@
-from asyncio import StreamReader
-from os import name
-from io import BufferedIOBase, RawIOBase
+from os import fsync, name
+from io import BufferedIOBase, BufferedWriter, BytesIO, RawIOBase, FileIO, UnsupportedOperation
+from time import perf_counter
 
 try:
-    from typing import AnyStr, Awaitable, Optional, Generator, AsyncGenerator, Union, cast
+    from typing import TYPE_CHECKING, AnyStr, Awaitable, Optional, Generator, AsyncGenerator, Iterable, List, Tuple, Union, cast
     from typing import Protocol, runtime_checkable  # >= Python 3.8
 except ImportError:
     from typing_extensions import Protocol, runtime_checkable  # type: ignore
@@ -11,6 +11,18 @@ except ImportError:
 from .build import *
 from .constant import *
 
+try:
+    from os import writev
+except ImportError:  # Not available on Windows
+    writev = None  # type: ignore
+
+if TYPE_CHECKING:
+    from asyncio import StreamReader
+    from .checkpoint import Checkpoint
+    from .dedup import DedupCache
+    from .metrics import BuildMetrics
+    from .template import ZipTemplate
+
 
 __all__ = (
     "StreamWriter",
@@ -33,15 +45,32 @@ class AsyncStreamWriter(Protocol):
         ...
 
 
+# Max buffers passed to a single writev call.
+IOV_MAX = 1024
+
+# Streams which copy written data. Other streams may keep references so borrowed memoryviews are copied first.
+COPYING_STREAMS = (FileIO, BufferedWriter, BytesIO)
+
+
+def copies_buffers(stream: object) -> bool:
+    """Returns true if stream consumes or copies buffers before write returns. Streams opt in with a true copies_buffers attribute."""
+    return type(stream) in COPYING_STREAMS or getattr(stream, "copies_buffers", False) is True
+
+
 class ZipStreamWriter(object):
     __slots__ = (
         "stream",
         "builder",
         "drain",
         "comment",
+        "write_size",
+        "pending",
+        "pending_size",
+        "checkpoint",
+        "metrics",
     )
 
-    def __init__(self, stream: Union[StreamWriter, AsyncStreamWriter], buffer_size=65536, system=get_version_system(name)) -> None:
+    def __init__(self, stream: Union[StreamWriter, AsyncStreamWriter], buffer_size=65536, system=get_version_system(name), write_size=65536) -> None:
         self.stream = stream
         self.builder = ZipBuilder(buffer_size, system)
         self.comment: Union[bytes, str, bytearray, None] = None
@@ -50,6 +79,11 @@ class ZipStreamWriter(object):
             if isinstance(stream, AsyncStreamWriter) else
             None
         )
+        self.write_size = write_size
+        self.pending: List[Union[bytes, memoryview]] = []
+        self.pending_size = 0
+        self.checkpoint: Optional["Checkpoint"] = None
+        self.metrics: Optional["BuildMetrics"] = None
 
     def __enter__(self) -> 'ZipStreamWriter':
         return self
@@ -63,6 +97,126 @@ class ZipStreamWriter(object):
     async def __aexit__(self, *_) -> None:
         await self.end_async()
 
+    def _write(self, buf: Union[bytes, memoryview]) -> bool:
+        """Queues buffer for writing. Returns true if queued buffers were written to the stream."""
+        self.pending_size += len(buf)
+
+        if self.pending_size >= self.write_size:
+            self.pending.append(bytes(buf) if isinstance(buf, memoryview) and not copies_buffers(self.stream) else buf)
+            self.flush()
+            return True
+
+        # Memoryviews are only valid during the call
+        self.pending.append(bytes(buf) if isinstance(buf, memoryview) else buf)
+
+        return False
+
+    async def _write_async(self, buf: bytes) -> None:
+        """Queues buffer for writing and drains the stream if queued buffers were written."""
+        if self._write(buf) and self.drain is not None:
+            await self.drain()
+
+    def _writev(self, fd: int) -> None:
+        """Writes pending buffers to file descriptor using vectored writes."""
+        bufs = self.pending
+
+        while bufs:
+            count = writev(fd, bufs[:IOV_MAX])
+
+            # Drop fully written buffers and slice partially written one
+            while count > 0:
+                size = len(bufs[0])
+                if count < size:
+                    bufs[0] = memoryview(bufs[0])[count:]
+                    break
+
+                count -= size
+                del bufs[0]
+
+    def flush(self) -> None:
+        """Writes queued buffers to the stream."""
+        if not self.pending:
+            return
+
+        start = perf_counter() if self.metrics is not None else 0.0
+
+        try:
+            if len(self.pending) == 1:
+                self.stream.write(self.pending[0])
+            elif writev is not None and isinstance(self.stream, FileIO):
+                self._writev(self.stream.fileno())
+            elif hasattr(self.stream, "writelines"):
+                self.stream.writelines(self.pending)  # type: ignore
+            else:
+                self.stream.write(b"".join(self.pending))
+        finally:
+            self.pending.clear()
+            self.pending_size = 0
+
+            if self.metrics is not None:
+                self.metrics.add_write(perf_counter() - start)
+
+    async def flush_async(self) -> None:
+        """Writes queued buffers to the stream and drains it."""
+        if not self.pending:
+            return
+
+        self.flush()
+
+        if self.drain is not None:
+            await self.drain()
+
+    def sync(self) -> None:
+        """Writes queued buffers and flushes the stream to disk if possible."""
+        self.flush()
+
+        if hasattr(self.stream, "flush"):
+            self.stream.flush()  # type: ignore
+
+        try:
+            fsync(self.stream.fileno())  # type: ignore
+        except (AttributeError, UnsupportedOperation):
+            pass
+
+    def _cb_checkpoint(self, bctx: BuilderCallableContext, checkpoint: "Checkpoint") -> None:
+        """Saves checkpoint before a file is started if it is due. All previous entries have been written at that point."""
+        if bctx.done or bctx.ctx is None or not checkpoint.due(self.builder):
+            return
+
+        self.sync()
+        checkpoint.save(self.builder, bctx.ctx.relative_offset)
+
+    def set_metrics(self, metrics: "BuildMetrics") -> None:
+        """Collects metrics of files added after including time spent writing and draining the stream."""
+        self.builder.set_metrics(metrics)
+        self.metrics = metrics
+
+        # Drain is timed by wrapping it
+        drain = self.drain
+        if drain is not None:
+            async def timed_drain() -> None:
+                start = perf_counter()
+                await drain()
+                metrics.add_drain(perf_counter() - start)
+
+            self.drain = timed_drain
+
+    def set_checkpoint(self, checkpoint: "Checkpoint") -> None:
+        """Sets checkpoint which periodically saves completed entries. Stream has to be seekable for resuming."""
+        self.checkpoint = checkpoint
+        self.builder.set_callback(self._cb_checkpoint, checkpoint)
+
+    def resume(self, checkpoint: "Checkpoint") -> None:
+        """Restores entries saved in checkpoint and truncates the stream after them. Use skip_existing with walk to continue."""
+        offset = checkpoint.load(self.builder)
+
+        self.pending.clear()
+        self.pending_size = 0
+        self.stream.seek(offset)  # type: ignore
+        self.stream.truncate()  # type: ignore
+
+        self.set_checkpoint(checkpoint)
+
     def set_comment(self, comment: AnyStr) -> None:
         """Sets comment for the zip. Applied on end."""
         self.comment = comment
@@ -70,87 +224,122 @@ class ZipStreamWriter(object):
     def add_folder(self, path: AnyStr, utc_time: Optional[float] = None, comment: AnyStr = None) -> None:
         """Writes the folder to the stream."""
         buf = self.builder.add_folder(path, utc_time, comment)
-        self.stream.write(buf)
+        self._write(buf)
 
     def add_buf(self, path: AnyStr, buf: Union[bytes, bytearray, memoryview], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
         """Writes the buf to the stream."""
-        for buf in self.builder.add_buf(path, buf, utc_time, compression, comment):
-            self.stream.write(buf)
+        self.builder.write_buf_to(self._write, path, buf, utc_time, compression, comment)
+
+    def add_bufs(self, items: Iterable[Tuple[AnyStr, Union[bytes, bytearray, memoryview], Optional[float]]], compression=COMPRESSION_STORED) -> None:
+        """Writes the small buffers to the stream in batches."""
+        for buf in self.builder.add_bufs(items, compression):
+            self._write(buf)
 
     def add_gen(self, path: AnyStr, gen: Generator[bytes, None, None], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
         """Writes the generator to the stream."""
-        for buf in self.builder.add_gen(path, gen, utc_time, compression, comment):
-            self.stream.write(buf)
+        self.builder.write_gen_to(self._write, path, gen, utc_time, compression, comment)
 
-    def add_io(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
-        """Writes the io to the stream."""
-        for buf in self.builder.add_io(path, io, utc_time, compression, comment):
-            self.stream.write(buf)
+    def add_io(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", pipelined=False,
+               use_mmap=False) -> None:
+        """Writes the io to the stream. Pipelined reads and calculates CRC32 on separate threads.
+        use_mmap maps large regular files which must not be truncated while written."""
+        self.builder.write_io_to(self._write, path, io, utc_time, compression, comment, pipelined, use_mmap)
+
+    def add_entries(self, entries: Iterable[WalkEntry], utc_time: Optional[float] = None, prefetch=0, dedup: Optional["DedupCache"] = None, skip_existing=False) -> None:
+        """Writes the file headers and contents of walk entries to the stream."""
+        self.builder.write_entries_to(self._write, entries, utc_time, prefetch, dedup, skip_existing)
 
     def walk(self, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
-             ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default) -> None:
-        """Generates the file headers and contents from src directory."""
-        for buf in self.builder.walk(src, dest, utc_time, compression, comment, ignore, no_compress):
-            self.stream.write(buf)
+             ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default, prefetch=0,
+             dedup: Optional["DedupCache"] = None, skip_existing=False) -> None:
+        """Generates the file headers and contents from src directory. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        self.builder.walk_to(self._write, src, dest, utc_time, compression, comment, ignore, no_compress, prefetch, dedup, skip_existing)
+
+    def add_index(self, path: AnyStr = "INDEX.json", utc_time: Optional[float] = None, fmt=INDEX_JSON) -> None:
+        """Writes the index of files added before to the stream."""
+        for buf in self.builder.add_index(path, utc_time, fmt):
+            self._write(buf)
+
+    def add_manifest(self, path: AnyStr = "MANIFEST.jsonl", utc_time: Optional[float] = None, compression=COMPRESSION_DEFLATED) -> None:
+        """Writes the manifest of files added before to the stream."""
+        for buf in self.builder.add_manifest(path, utc_time, compression):
+            self._write(buf)
+
+    def add_template(self, template: "ZipTemplate") -> None:
+        """Writes the prebuilt files of the template to the stream."""
+        self._write(self.builder.add_template(template))
 
     def end(self, comment: AnyStr = None) -> None:
         """Writes EOCD which contains headers for all added files."""
         buf = self.builder.end(comment or cast(AnyStr, self.comment))
-        self.stream.write(buf)
+        self._write(buf)
+        self.flush()
+
+        if self.checkpoint is not None:
+            self.checkpoint.close()
 
     async def add_folder_async(self, path: AnyStr, utc_time: Optional[float] = None, comment: AnyStr = None) -> None:
         """Writes the folder to the stream asyncnorously."""
         buf = self.builder.add_folder(path, utc_time, comment)
-        self.stream.write(buf)
-
-        if self.drain is not None:
-            await self.drain()
+        await self._write_async(buf)
 
     async def add_buf_async(self, path: AnyStr, buf: Union[bytes, bytearray, memoryview], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
         """Writes the buf to the stream."""
         for buf in self.builder.add_buf(path, buf, utc_time, compression, comment):
-            self.stream.write(buf)
+            await self._write_async(buf)
 
-            if self.drain is not None:
-                await self.drain()
+    async def add_bufs_async(self, items: Iterable[Tuple[AnyStr, Union[bytes, bytearray, memoryview], Optional[float]]], compression=COMPRESSION_STORED) -> None:
+        """Writes the small buffers to the stream in batches asyncnorously."""
+        for buf in self.builder.add_bufs(items, compression):
+            await self._write_async(buf)
 
     async def add_gen_async(self, path: AnyStr, gen: AsyncGenerator[bytes, None], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
         """Writes the generator to the stream asyncnorously."""
         async for buf in self.builder.add_gen_async(path, gen, utc_time, compression, comment):
-            self.stream.write(buf)
+            await self._write_async(buf)
 
-            if self.drain is not None:
-                await self.drain()
+    async def add_io_async(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", pipelined=False) -> None:
+        """Writes the file to the stream asyncnorously. Pipelined reads and calculates CRC32 on separate threads."""
+        async for buf in self.builder.add_io_async(path, io, utc_time, compression, comment, pipelined):
+            await self._write_async(buf)
 
-    async def add_io_async(self, path: AnyStr, io: Union[BufferedIOBase, RawIOBase], utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="") -> None:
-        """Writes the file to the stream asyncnorously."""
-        async for buf in self.builder.add_io_async(path, io, utc_time, compression, comment):
-            self.stream.write(buf)
-
-            if self.drain is not None:
-                await self.drain()
-
-    async def add_stream_async(self, path: AnyStr, reader: StreamReader, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", buf_size=4096) -> None:
+    async def add_stream_async(self, path: AnyStr, reader: "StreamReader", utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment="", buf_size=4096) -> None:
         """Writes the stream to the stream asyncnorously."""
         async for buf in self.builder.add_stream_async(path, reader, utc_time, compression, comment):
-            self.stream.write(buf)
+            await self._write_async(buf)
 
-            if self.drain is not None:
-                await self.drain()
+    async def add_entries_async(self, entries: Iterable[WalkEntry], utc_time: Optional[float] = None, prefetch=0, dedup: Optional["DedupCache"] = None,
+                                skip_existing=False) -> None:
+        """Writes the file headers and contents of walk entries to the stream asyncnorously."""
+        async for buf in self.builder.add_entries_async(entries, utc_time, prefetch, dedup, skip_existing):
+            await self._write_async(buf)
 
     async def walk_async(self, src: AnyStr, dest: AnyStr, utc_time: Optional[float] = None, compression=COMPRESSION_STORED, comment: AnyStr = None,
-                         ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default) -> None:
-        """Generates the file headers and contents from src directory asyncnorously asyncnorously."""
-        async for buf in self.builder.walk_async(src, dest, utc_time, compression, comment, ignore, no_compress):
-            self.stream.write(buf)
-
-            if self.drain is not None:
-                await self.drain()
+                         ignore: Optional[WalkIgnoreCallable] = walk_ignore_default, no_compress: Optional[WalkNoCompressCallable] = walk_no_compress_default, prefetch=0,
+                         dedup: Optional["DedupCache"] = None, skip_existing=False) -> None:
+        """Generates the file headers and contents from src directory asyncnorously asyncnorously. Small files are read ahead by prefetch threads. Files with same content are compressed once using dedup."""
+        async for buf in self.builder.walk_async(src, dest, utc_time, compression, comment, ignore, no_compress, prefetch, dedup, skip_existing):
+            await self._write_async(buf)
+
+    async def add_index_async(self, path: AnyStr = "INDEX.json", utc_time: Optional[float] = None, fmt=INDEX_JSON) -> None:
+        """Writes the index of files added before to the stream asyncnorously."""
+        for buf in self.builder.add_index(path, utc_time, fmt):
+            await self._write_async(buf)
+
+    async def add_manifest_async(self, path: AnyStr = "MANIFEST.jsonl", utc_time: Optional[float] = None, compression=COMPRESSION_DEFLATED) -> None:
+        """Writes the manifest of files added before to the stream asyncnorously."""
+        for buf in self.builder.add_manifest(path, utc_time, compression):
+            await self._write_async(buf)
+
+    async def add_template_async(self, template: "ZipTemplate") -> None:
+        """Writes the prebuilt files of the template to the stream asyncnorously."""
+        await self._write_async(self.builder.add_template(template))
 
     async def end_async(self, comment: AnyStr = None) -> None:
         """Writes EOCD which contains headers for all added files asyncnorously."""
         buf = self.builder.end(comment or cast(AnyStr, self.comment))
-        self.stream.write(buf)
+        self._write(buf)
+        await self.flush_async()
 
-        if self.drain is not None:
-            await self.drain()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
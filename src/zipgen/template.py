@@ -0,0 +1,84 @@
+from struct import calcsize, pack, pack_into, unpack_from
+from typing import Dict, Iterable, List
+
+from .constant import CREATE_DEFAULT, HEADER_CENTRAL_DIRECTORY, INT32_MAX, SIZE_EXTENDED_INFORMATION, TAG_EXTENDED_INFORMATION64
+
+
+__all__ = (
+    "ZipTemplate",
+    "relocate_central_directory",
+)
+
+
+SIZE_CENTRAL_DIRECTORY = calcsize(HEADER_CENTRAL_DIRECTORY[0])
+
+# Offset of relative offset field in CentralDirectory.
+OFFSET_RELATIVE_OFFSET = SIZE_CENTRAL_DIRECTORY - 4
+
+
+class ZipTemplate(object):
+    __slots__ = (
+        "data",
+        "headers",
+        "manifest",
+        "version_extract",
+    )
+
+    def __init__(self, data: bytes, headers: Dict[bytes, bytes], manifest: Iterable[bytes] = (), version_extract=CREATE_DEFAULT) -> None:
+        self.data = data
+        self.headers = headers
+        self.manifest: List[bytes] = list(manifest)
+        self.version_extract = version_extract
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+def relocate_central_directory(header: bytes, base: int) -> bytes:
+    """Returns CentralDirectory bytes with relative offset moved by base. Zip64 extended information is added when needed."""
+    if base == 0:
+        return header
+
+    fields = unpack_from(HEADER_CENTRAL_DIRECTORY[0], header)
+    compressed_size, uncompressed_size = fields[9], fields[10]
+    len_path, len_extra, len_comment = fields[11], fields[12], fields[13]
+    relative_offset = fields[17]
+
+    # Zip64 values are in extended information
+    if len_extra != 0:
+        tag = unpack_from(TAG_EXTENDED_INFORMATION64[0], header, SIZE_CENTRAL_DIRECTORY+len_path)
+        uncompressed_size, compressed_size, relative_offset = tag[2], tag[3], tag[4]
+
+    relative_offset += base
+
+    # Offset fits in place
+    if len_extra == 0 and relative_offset < INT32_MAX:
+        buf = bytearray(header)
+        pack_into(b"<I", buf, OFFSET_RELATIVE_OFFSET, relative_offset)
+        return bytes(buf)
+
+    # Extended information for zip64
+    extra = pack(
+        *TAG_EXTENDED_INFORMATION64,
+        SIZE_EXTENDED_INFORMATION,
+        uncompressed_size,
+        compressed_size,
+        relative_offset,
+        0,  # Disk start number
+    )
+
+    return b"".join((
+        pack(
+            HEADER_CENTRAL_DIRECTORY[0],
+            *fields[:9],
+            0xFFFFFFFF,
+            0xFFFFFFFF,
+            len_path,
+            len(extra),
+            *fields[13:17],
+            0xFFFFFFFF,
+        ),
+        header[SIZE_CENTRAL_DIRECTORY:SIZE_CENTRAL_DIRECTORY+len_path],
+        extra,
+        header[SIZE_CENTRAL_DIRECTORY+len_path+len_extra:SIZE_CENTRAL_DIRECTORY+len_path+len_extra+len_comment],
+    ))